@@ -1,14 +1,19 @@
 from rest_framework.authentication import BaseAuthentication, SessionAuthentication
 from rest_framework import exceptions
-from firebase_admin import auth
 from django.conf import settings
 
 # Import your CustomUser model
 from users.models import CustomUser
+from .token_cache import get_token_cache
+from .user_resolver import resolve_user
+from .verifiers import ExpiredTokenError, InvalidTokenError, get_verifier
 
 class FirebaseAuthentication(BaseAuthentication):
 
     def authenticate(self, request):
+        if getattr(settings, 'FIREBASE_AUTH_MODE', 'firebase') == 'disabled':
+            return None  # Firebase auth switched off, let SessionAuthentication try
+
         auth_header = request.headers.get('Authorization')
 
         if not auth_header:
@@ -20,8 +25,8 @@ class FirebaseAuthentication(BaseAuthentication):
             if prefix.lower() != 'bearer':
                 raise exceptions.AuthenticationFailed('Invalid Authorization header prefix.')
 
-            # Verify the Firebase ID token
-            decoded_token = auth.verify_id_token(token)
+            # Verify the Firebase ID token (served from the cache when possible)
+            decoded_token = self.verify_token(token)
             firebase_uid = decoded_token.get('uid')
 
             if not firebase_uid:
@@ -30,45 +35,13 @@ class FirebaseAuthentication(BaseAuthentication):
             # Get or create the user in Django's database
             # This links the Firebase user to a Django user
             firebase_email = decoded_token.get('email')
-            
-            # First try to find user by email (in case admin was created before Firebase login)
-            user = None
-            if firebase_email:
-                try:
-                    user = CustomUser.objects.get(email=firebase_email)
-                    # Link Firebase UID to existing user
-                    if not user.firebase_uid:
-                        user.firebase_uid = firebase_uid
-                        user.save()
-                    elif user.firebase_uid != firebase_uid:
-                        # Firebase UID changed, update it
-                        user.firebase_uid = firebase_uid
-                        user.save()
-                except CustomUser.DoesNotExist:
-                    pass
-            
-            # If no user found by email, try by firebase_uid
-            if not user:
-                try:
-                    user = CustomUser.objects.get(firebase_uid=firebase_uid)
-                    # Update email if it changed in Firebase
-                    if firebase_email and user.email != firebase_email:
-                        user.email = firebase_email
-                        user.save()
-                except CustomUser.DoesNotExist:
-                    # Create new user if none exists
-                    user = CustomUser.objects.create(
-                        email=firebase_email or f"user_{firebase_uid}@firebase.local",
-                        firebase_uid=firebase_uid,
-                        is_active=True,
-                        role='SEEKER'  # Default role for new users
-                    )
+            user = resolve_user(firebase_uid, firebase_email)
 
             return (user, decoded_token)
 
-        except auth.ExpiredIdTokenError:
+        except ExpiredTokenError:
             raise exceptions.AuthenticationFailed('Firebase token has expired.')
-        except auth.InvalidIdTokenError as e:
+        except InvalidTokenError as e:
             # Log more details about the error
             import logging
             logger = logging.getLogger(__name__)
@@ -83,4 +56,19 @@ class FirebaseAuthentication(BaseAuthentication):
             import logging
             logger = logging.getLogger(__name__)
             logger.error(f'Authentication error: {type(e).__name__}: {str(e)}')
-            raise exceptions.AuthenticationFailed(f'Authentication failed: {str(e)}')
\ No newline at end of file
+            raise exceptions.AuthenticationFailed(f'Authentication failed: {str(e)}')
+
+    def verify_token(self, token):
+        """
+        Return the decoded claims for an ID token.
+
+        Verified tokens are cached until their own expiry, so a client that
+        reuses its token only pays for signature verification once. Cache
+        misses go to the verifier selected by FIREBASE_TOKEN_VERIFIER.
+        """
+        token_cache = get_token_cache()
+        decoded_token = token_cache.get(token)
+        if decoded_token is None:
+            decoded_token = get_verifier().verify(token)
+            token_cache.set(token, decoded_token)
+        return decoded_token
@@ -0,0 +1,71 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks run against a throwaway test database so they never touch the
+development data, and report latency percentiles in a common format.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def bench_database(test_name=None):
+    """
+    Create a fresh test database for the duration of a benchmark.
+
+    The test environment is set up as well, so the test client can be used
+    and emails go to the in-memory outbox instead of SMTP. Benchmarks that
+    write from several threads pass a ``test_name`` (a file for SQLite):
+    threads sharing the default in-memory SQLite database fail on its table
+    locks instead of waiting for them.
+    """
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    if test_name is not None:
+        connection.settings_dict['TEST']['NAME'] = test_name
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=False)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+        teardown_test_environment()
+
+
+def measure(func, iterations):
+    """Call ``func`` ``iterations`` times and return per-call timings in seconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+UNITS = {'us': 1e6, 'ms': 1e3, 's': 1}
+
+
+def summarize(timings, unit='us'):
+    """Return mean / p50 / p99 latency in the given unit."""
+    scale = UNITS[unit]
+    ordered = sorted(timings)
+    p99_index = min(len(ordered) - 1, int(len(ordered) * 0.99))
+    return {
+        'calls': len(ordered),
+        'mean': statistics.fmean(ordered) * scale,
+        'p50': ordered[len(ordered) // 2] * scale,
+        'p99': ordered[p99_index] * scale,
+    }
+
+
+def format_summary(label, timings, unit='us'):
+    stats = summarize(timings, unit)
+    return (
+        f"{label:<28} calls={stats['calls']:<6} "
+        f"mean={stats['mean']:>10.1f}{unit}  p50={stats['p50']:>10.1f}{unit}  p99={stats['p99']:>10.1f}{unit}"
+    )
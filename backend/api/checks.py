@@ -0,0 +1,57 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+AUTH_MODES = ('firebase', 'fake', 'disabled')
+
+# Cache backends that keep their entries inside one process
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def check_firebase_auth(app_configs, **kwargs):
+    errors = []
+    mode = getattr(settings, 'FIREBASE_AUTH_MODE', 'firebase')
+
+    if mode not in AUTH_MODES:
+        errors.append(Error(
+            f"FIREBASE_AUTH_MODE must be one of {', '.join(AUTH_MODES)}; got {mode!r}.",
+            id='api.E002',
+        ))
+    elif mode != 'firebase' and not settings.DEBUG:
+        errors.append(Error(
+            f"FIREBASE_AUTH_MODE is {mode!r} while DEBUG is off.",
+            hint="The 'fake' and 'disabled' modes are for local development, tests and benchmarks only.",
+            id='api.E001',
+        ))
+    elif mode == 'firebase' and not os.path.exists(settings.SERVICE_ACCOUNT_KEY_PATH):
+        errors.append(Warning(
+            f"Firebase service account key not found at {settings.SERVICE_ACCOUNT_KEY_PATH}.",
+            hint="Download it from the Firebase console, or set FIREBASE_AUTH_MODE=fake for local development.",
+            id='api.W001',
+        ))
+    return errors
+
+
+@register()
+def check_query_budgets(app_configs, **kwargs):
+    action = getattr(settings, 'QUERY_BUDGET_ACTION', 'log')
+    if action not in ('log', 'raise'):
+        return [Error(f"QUERY_BUDGET_ACTION must be 'log' or 'raise'; got {action!r}.", id='api.E003')]
+    return []
+
+
+@register()
+def check_user_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'FIREBASE_USER_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if getattr(settings, 'WEB_CONCURRENCY', 1) > 1 and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"FIREBASE_USER_CACHE_ALIAS {alias!r} is a process-local cache but WEB_CONCURRENCY is "
+            f"{settings.WEB_CONCURRENCY}.",
+            hint="A user saved in one worker would stay cached in the others (e.g. with its old role) until "
+                 "FIREBASE_USER_CACHE_TIMEOUT; point FIREBASE_USER_CACHE_ALIAS at a shared cache such as Redis.",
+            id='api.E004',
+        )]
+    return []
@@ -0,0 +1,215 @@
+"""
+Streaming CSV / NDJSON exports of the admin datasets.
+
+``GET /api/admin/exports/<dataset>.<csv|ndjson>`` streams every matching row
+of one of the DATASETS below. Rows are read with ``values_list()`` and
+``.iterator(chunk_size=...)`` (a server-side cursor on PostgreSQL, chunked
+fetches on SQLite), written out a chunk at a time and never collected, so
+memory use stays flat however many rows are exported.
+
+Every dataset accepts ``from`` and ``to`` (ISO dates or datetimes; a date-only
+``to`` includes that whole day) on its date column, plus the filters listed
+in its definition. Rows come out in primary key order.
+"""
+import csv
+import datetime
+import io
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from services.models import Booking, Complaint, Review, Service
+from users.models import CustomUser
+from .models import AdminActionLog
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Dataset:
+    def __init__(self, model, columns, date_field, filters):
+        self.model = model
+        self.columns = columns  # (output name, field lookup) pairs
+        self.date_field = date_field
+        self.filters = filters  # query parameter -> field lookup
+
+    @property
+    def names(self):
+        return [name for name, _lookup in self.columns]
+
+    def queryset(self, params):
+        conditions = {}
+        for param, lookup in self.filters.items():
+            value = params.get(param)
+            if value not in (None, ''):
+                conditions[lookup] = value
+        start, end = params.get('from'), params.get('to')
+        if start:
+            conditions[f'{self.date_field}__gte'] = _parse_bound('from', start, end_of_day=False)
+        if end:
+            conditions[f'{self.date_field}__lt'] = _parse_bound('to', end, end_of_day=True)
+        try:
+            queryset = self.model._default_manager.filter(**conditions)
+        except (DjangoValidationError, ValueError, TypeError):
+            raise ValidationError({'detail': 'Invalid filter value.'})
+        return queryset.order_by('pk').values_list(*(lookup for _name, lookup in self.columns))
+
+
+DATASETS = {
+    'users': Dataset(
+        CustomUser,
+        [('id', 'id'), ('email', 'email'), ('first_name', 'first_name'), ('last_name', 'last_name'),
+         ('role', 'role'), ('is_active', 'is_active'), ('email_notifications', 'email_notifications'),
+         ('date_joined', 'date_joined'), ('last_login', 'last_login')],
+        'date_joined',
+        {'role': 'role', 'is_active': 'is_active'},
+    ),
+    'services': Dataset(
+        Service,
+        [('id', 'id'), ('title', 'title'), ('provider_id', 'provider_id'), ('provider_email', 'provider__email'),
+         ('category', 'category__name'), ('price', 'price'), ('review_count', 'review_count'),
+         ('rating_sum', 'rating_sum'), ('created_at', 'created_at'), ('updated_at', 'updated_at')],
+        'created_at',
+        {'provider': 'provider_id', 'category': 'category_id', 'min_price': 'price__gte', 'max_price': 'price__lte'},
+    ),
+    'bookings': Dataset(
+        Booking,
+        [('id', 'id'), ('service_id', 'service_id'), ('service_title', 'service__title'),
+         ('seeker_id', 'seeker_id'), ('seeker_email', 'seeker__email'), ('status', 'status'),
+         ('booking_date', 'booking_date'), ('created_at', 'created_at'), ('updated_at', 'updated_at')],
+        'created_at',
+        {'status': 'status', 'service': 'service_id', 'seeker': 'seeker_id', 'provider': 'provider_id'},
+    ),
+    'reviews': Dataset(
+        Review,
+        [('id', 'id'), ('service_id', 'service_id'), ('service_title', 'service__title'),
+         ('seeker_id', 'seeker_id'), ('seeker_email', 'seeker__email'), ('rating', 'rating'),
+         ('comment', 'comment'), ('created_at', 'created_at'), ('updated_at', 'updated_at')],
+        'created_at',
+        {'service': 'service_id', 'seeker': 'seeker_id', 'rating': 'rating', 'provider': 'service__provider_id'},
+    ),
+    'complaints': Dataset(
+        Complaint,
+        [('id', 'id'), ('user_id', 'user_id'), ('user_email', 'user__email'), ('service_id', 'service_id'),
+         ('booking_id', 'booking_id'), ('complaint_type', 'complaint_type'), ('status', 'status'),
+         ('description', 'description'), ('admin_response', 'admin_response'),
+         ('created_at', 'created_at'), ('resolved_at', 'resolved_at')],
+        'created_at',
+        {'status': 'status', 'complaint_type': 'complaint_type', 'user': 'user_id', 'service': 'service_id'},
+    ),
+    'action-logs': Dataset(
+        AdminActionLog,
+        [('id', 'id'), ('admin_user_id', 'admin_user_id'), ('admin_user_email', 'admin_user__email'),
+         ('action_type', 'action_type'), ('resource_type', 'resource_type'), ('resource_id', 'resource_id'),
+         ('description', 'description'), ('changes', 'changes'), ('ip_address', 'ip_address'),
+         ('created_at', 'created_at')],
+        'created_at',
+        {'action_type': 'action_type', 'resource_type': 'resource_type', 'admin_id': 'admin_user_id'},
+    ),
+}
+
+
+def _parse_bound(param, value, end_of_day):
+    try:
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value.replace(' ', '+'))  # an unescaped '+' arrives as a space
+    except ValueError:
+        moment = day = None
+    if moment is None and day is None:
+        raise ValidationError({param: 'Must be an ISO 8601 date or date and time.'})
+    if moment is None:
+        moment = datetime.datetime.combine(day + datetime.timedelta(days=1 if end_of_day else 0), datetime.time())
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+# Spreadsheet applications run cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _text_cell(value):
+    if value is None:
+        return ''
+    return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+
+
+def _iso_cell(value):
+    return '' if value is None else value.isoformat()
+
+
+def _bool_cell(value):
+    return '' if value is None else 'true' if value else 'false'
+
+
+def _json_cell(value):
+    return '' if value is None else json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def _plain_cell(value):
+    return '' if value is None else value
+
+
+_CELL_WRITERS = {
+    'CharField': _text_cell,
+    'TextField': _text_cell,
+    'EmailField': _text_cell,
+    'SlugField': _text_cell,
+    'GenericIPAddressField': _plain_cell,
+    'DateTimeField': _iso_cell,
+    'DateField': _iso_cell,
+    'TimeField': _iso_cell,
+    'BooleanField': _bool_cell,
+    'JSONField': _json_cell,
+}
+
+
+def _column_field(model, lookup):
+    *relations, name = lookup.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def stream_csv(dataset, rows):
+    cells = [
+        _CELL_WRITERS.get(_column_field(dataset.model, lookup).get_internal_type(), _plain_cell)
+        for _name, lookup in dataset.columns
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(dataset.names)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([cell(value) for cell, value in zip(cells, row)])
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(dataset, rows):
+    names = dataset.names
+    encoder = DjangoJSONEncoder()
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(names, row))))
+        if len(lines) == CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_rows(dataset, file_format, params):
+    """Validate the request and return an iterator over the encoded export."""
+    queryset = dataset.queryset(params)
+    # Evaluated lazily by the response, one CHUNK_SIZE fetch at a time
+    rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+    writer = stream_csv if file_format == 'csv' else stream_ndjson
+    return writer(dataset, rows)
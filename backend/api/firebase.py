@@ -0,0 +1,44 @@
+"""
+Lazy, thread-safe initialization of the Firebase Admin SDK.
+
+Nothing here runs at import time: the app is initialized the first time a
+token has to be verified through the SDK, so management commands, migrations,
+test runs and worker boots neither pay for it nor need the service account file.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def get_firebase_app():
+    """Return the default Firebase app, initializing it on first use."""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                _app = _initialize_app()
+    return _app
+
+
+def _initialize_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    try:
+        # Already initialized elsewhere in this process (e.g. a shell session)
+        return firebase_admin.get_app()
+    except ValueError:
+        pass
+
+    path = settings.SERVICE_ACCOUNT_KEY_PATH
+    if not os.path.exists(path):
+        raise ImproperlyConfigured(
+            f"Firebase service account key not found at {path}. "
+            "Please download it from the Firebase console and place it there."
+        )
+    return firebase_admin.initialize_app(credentials.Certificate(path))
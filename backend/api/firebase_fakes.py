@@ -0,0 +1,149 @@
+"""
+Local stand-ins for Firebase's token infrastructure.
+
+``issue_fake_token`` creates HS256 tokens accepted by ``FakeVerifier`` when
+FIREBASE_AUTH_MODE is 'fake'.
+
+``FakeTokenIssuer`` signs RS256 ID tokens with locally generated keys, and
+``FakeKeyServer`` publishes the matching certificates over HTTP in the same
+format (and with the same Cache-Control header) as Google's securetoken
+endpoint. Together they let LocalVerifier be exercised and benchmarked
+without network access or a real Firebase project.
+"""
+import datetime
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+
+from .verifiers import FAKE_PROJECT_ID, fake_signing_key
+
+
+def _claims(project_id, uid, email, expires_in, extra_claims):
+    now = int(time.time())
+    claims = {
+        'iss': f'https://securetoken.google.com/{project_id}',
+        'aud': project_id,
+        'sub': uid,
+        'user_id': uid,
+        'iat': now,
+        'auth_time': now,
+        'exp': now + expires_in,
+    }
+    if email:
+        claims['email'] = email
+        claims['email_verified'] = True
+    claims.update(extra_claims)
+    return claims
+
+
+def issue_fake_token(uid, email=None, expires_in=3600, **extra_claims):
+    """Return a token that FakeVerifier accepts in 'fake' auth mode."""
+    project_id = getattr(settings, 'FIREBASE_PROJECT_ID', None) or FAKE_PROJECT_ID
+    claims = _claims(project_id, uid, email, expires_in, extra_claims)
+    return jwt.encode(claims, fake_signing_key(), algorithm='HS256')
+
+
+class FakeTokenIssuer:
+    """Issue RS256-signed tokens that look like Firebase ID tokens."""
+
+    def __init__(self, project_id=FAKE_PROJECT_ID, key_count=1):
+        self.project_id = project_id
+        self._keys = {}  # kid -> (private_key, certificate_pem)
+        for _ in range(key_count):
+            self.add_key()
+
+    def add_key(self):
+        """Generate a new signing key and make it the one used for new tokens."""
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'securetoken.system.gserviceaccount.com')])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(private_key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=2))
+            .sign(private_key, hashes.SHA256())
+        )
+        kid = uuid.uuid4().hex
+        self._keys[kid] = (private_key, certificate.public_bytes(serialization.Encoding.PEM).decode('utf-8'))
+        self.current_kid = kid
+        return kid
+
+    def remove_key(self, kid):
+        del self._keys[kid]
+
+    def certificates(self):
+        """Return ``{kid: PEM certificate}`` as served by Google."""
+        return {kid: pem for kid, (_key, pem) in self._keys.items()}
+
+    def issue(self, uid, email=None, expires_in=3600, kid=None, **extra_claims):
+        claims = _claims(self.project_id, uid, email, expires_in, extra_claims)
+        kid = kid or self.current_kid
+        private_key, _pem = self._keys[kid]
+        return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+class FakeKeyServer:
+    """
+    Serve an issuer's certificates on ``127.0.0.1`` from a background thread.
+
+    Usable as a context manager; ``url`` is available once started.
+    """
+
+    def __init__(self, issuer, max_age=3600):
+        self.issuer = issuer
+        self.max_age = max_age
+        self.request_count = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/certs'
+
+    def start(self):
+        key_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                key_server.request_count += 1
+                body = json.dumps(key_server.issuer.certificates()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Cache-Control', f'public, max-age={key_server.max_age}, must-revalidate, no-transform')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
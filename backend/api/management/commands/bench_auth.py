@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import FirebaseAuthentication
+from api.benchmarking import bench_database, format_summary, measure
+from api.firebase_fakes import FakeKeyServer, FakeTokenIssuer
+from api.token_cache import get_token_cache
+from api.verifiers import LocalVerifier, SDKVerifier, get_verifier, set_verifier
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark FirebaseAuthentication.authenticate with a cold and a warm '
+        'token cache, using a local fake key server and token issuer (no network).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        issuer = FakeTokenIssuer(project_id='juakali-bench')
+        authenticator = FirebaseAuthentication()
+        factory = APIRequestFactory()
+        token_cache = get_token_cache()
+        previous_verifier = get_verifier()
+
+        with bench_database(), FakeKeyServer(issuer) as key_server:
+            verifier = LocalVerifier(project_id=issuer.project_id, certs_url=key_server.url, fallback=SDKVerifier())
+            set_verifier(verifier)
+            try:
+                CustomUser.objects.create(email='bench-user@bench.local', firebase_uid='bench-user')
+                token = issuer.issue('bench-user', email='bench-user@bench.local')
+                request = factory.get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+                def keys_on_request_thread():
+                    # What the SDK does whenever its certificate copy has expired.
+                    token_cache.clear()
+                    verifier.key_store.refresh()
+                    authenticator.authenticate(request)
+
+                def cold():
+                    token_cache.clear()
+                    authenticator.authenticate(request)
+
+                def warm():
+                    authenticator.authenticate(request)
+
+                authenticator.authenticate(request)  # prime keys, connections and imports
+                refresh_timings = measure(keys_on_request_thread, max(1, iterations // 10))
+                cold_timings = measure(cold, iterations)
+                token_cache.clear()
+                authenticator.authenticate(request)
+                warm_timings = measure(warm, iterations)
+                with CaptureQueriesContext(connection) as warm_queries:
+                    warm()
+            finally:
+                verifier.key_store.stop()
+                set_verifier(previous_verifier)
+                token_cache.clear()
+
+        self.stdout.write(format_summary('keys fetched per request', refresh_timings))
+        self.stdout.write(format_summary('authenticate (cold cache)', cold_timings))
+        self.stdout.write(format_summary('authenticate (warm cache)', warm_timings))
+        self.stdout.write(f'Key server requests: {key_server.request_count}')
+        self.stdout.write(f'Queries per warm request: {len(warm_queries)}')
+        speedup = sum(cold_timings) / sum(warm_timings)
+        self.stdout.write(self.style.SUCCESS(f'Warm cache is {speedup:.1f}x faster per request.'))
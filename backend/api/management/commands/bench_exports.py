@@ -0,0 +1,86 @@
+import gc
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database
+from api.models import AdminActionLog
+from users.models import CustomUser
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), else the peak so far."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Export a large audit log fixture through /api/admin/exports/ as CSV and NDJSON '
+        'and fail if resident memory grows by more than --max-growth-mb while streaming.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--max-growth-mb', type=float, default=64)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            admin = CustomUser.objects.create(email='admin@bench.local', role='ADMIN', firebase_uid='bench-admin')
+            self.seed(admin, options['rows'])
+            client = APIClient()
+            client.force_authenticate(admin)
+
+            failures = []
+            for file_format in ('csv', 'ndjson'):
+                growth = self.export(client, f'/api/admin/exports/action-logs.{file_format}', options['rows'])
+                if growth > options['max_growth_mb']:
+                    failures.append(f'{file_format}: +{growth:.1f} MB')
+
+        if failures:
+            raise CommandError(f'Memory grew more than {options["max_growth_mb"]} MB: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Memory stayed flat during every export.'))
+
+    def seed(self, admin, rows, batch_size=20000):
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            AdminActionLog.objects.bulk_create([
+                AdminActionLog(
+                    admin_user=admin, action_type='UPDATE', resource_type='SERVICE', resource_id=i,
+                    description=f'Bench action {i}, with "quotes" and a comma', changes={'after': {'price': i}},
+                    ip_address='127.0.0.1',
+                )
+                for i in range(offset, min(offset + batch_size, rows))
+            ])
+        self.stdout.write(f'Seeded {rows:,} audit log rows in {time.perf_counter() - start:.1f}s')
+
+    def export(self, client, path, rows):
+        gc.collect()
+        baseline = peak = current_rss_mb()
+        start = time.perf_counter()
+        response = client.get(path)
+        size = lines = 0
+        for chunk in response.streaming_content:
+            size += len(chunk)
+            lines += chunk.count(b'\n')
+            peak = max(peak, current_rss_mb())
+        response.close()
+        elapsed = time.perf_counter() - start
+
+        expected = rows + (1 if path.endswith('.csv') else 0)  # CSV header
+        if response.status_code != 200 or lines != expected:
+            raise CommandError(f'{path}: status {response.status_code}, {lines} lines instead of {expected}')
+        self.stdout.write(
+            f'{path:<40} {lines:>9,} lines  {size / 2**20:>7.1f} MB in {elapsed:>5.1f}s  '
+            f'RSS {baseline:.1f} MB -> peak {peak:.1f} MB (+{peak - baseline:.1f} MB)'
+        )
+        return peak - baseline
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from api.benchmarking import bench_database, measure, summarize
+from api.row_mappers import get_row_mapper
+from services.benchmarking import seed_activity, seed_catalog
+from services.models import Booking, Service
+from services.serializers import BookingSerializer, ServiceSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Report rows/sec for serializing service and booking lists through the DRF '
+        'serializers and through the compiled row mappers (api/row_mappers.py), both '
+        'for serialization alone and for full list requests.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=2000)
+        parser.add_argument('--seekers', type=int, default=10)
+        parser.add_argument('--rows', type=int, default=1000, help='Rows serialized per call.')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0, CATALOG_CACHE_TIMEOUT=0), bench_database():
+            providers, _categories = seed_catalog(options['services'], provider_count=5)
+            services = list(providers[0].services.all()[:100])
+            seekers = seed_activity(services, seeker_count=options['seekers'])
+            rows, iterations = options['rows'], options['iterations']
+
+            self.stdout.write(f'Serialization only, {rows} rows per call:')
+            self.compare_serialization(
+                'services', ServiceSerializer,
+                Service.objects.select_related('provider', 'category').order_by('-created_at', '-id'),
+                rows, iterations,
+            )
+            self.compare_serialization(
+                'bookings', BookingSerializer,
+                Booking.objects.select_related('seeker', 'service__provider', 'service__category').order_by('-created_at', '-id'),
+                rows, iterations,
+            )
+
+            self.stdout.write('Full list requests:')
+            self.compare_requests('services', None, '/api/services/?page_size=100', 100, iterations * 5)
+            self.compare_requests('bookings', seekers[0], '/api/bookings/?paginate=false', None, iterations * 5)
+
+    def compare_serialization(self, label, serializer_class, queryset, rows, iterations):
+        request = Request(APIRequestFactory().get('/'))
+        serializer = serializer_class(context={'request': request})
+        mapper = get_row_mapper(serializer, queryset.model)
+
+        def drf():
+            serializer_class(list(queryset[:rows]), many=True, context={'request': request}).data
+
+        def mapped():
+            mapper.map(mapper.rows(queryset)[:rows])
+
+        self.report(f'{label} serializer', measure(drf, iterations), rows)
+        self.report(f'{label} row mapper', measure(mapped, iterations), rows)
+
+    def compare_requests(self, label, user, path, rows, iterations):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        for fast in (False, True):
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                count = rows or len(client.get(path).json())
+                timings = measure(lambda: client.get(path), iterations)
+            self.report(f'{label} {"row mapper" if fast else "serializer"}', timings, count)
+
+    def report(self, label, timings, rows):
+        stats = summarize(timings, 'ms')
+        self.stdout.write(
+            f'  {label:<24} {rows / (stats["mean"] / 1000):>10,.0f} rows/s  '
+            f'mean={stats["mean"]:>8.2f}ms  p50={stats["p50"]:>8.2f}ms  p99={stats["p99"]:>8.2f}ms'
+        )
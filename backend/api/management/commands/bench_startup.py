@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import format_summary
+
+TARGETS = {
+    'manage.py check': [sys.executable, 'manage.py', 'check'],
+    'import core.wsgi': [sys.executable, '-c', 'import core.wsgi'],
+    'import core.asgi': [sys.executable, '-c', 'import core.asgi'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure cold process startup for manage.py check and the WSGI/ASGI application imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='core.settings')
+        for label, command in TARGETS.items():
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=settings.BASE_DIR, env=env, check=True, capture_output=True)
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(format_summary(label, timings, unit='ms'))
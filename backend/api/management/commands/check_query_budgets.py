@@ -0,0 +1,131 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database
+from api.query_budget import QueryBudgetMiddleware, QueryCounter
+from services.benchmarking import seed_activity, seed_catalog
+from services.models import Booking, Complaint, Review, Service
+from users.models import CustomUser
+from services import similarity
+from services.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every budgeted endpoint against a seeded throwaway database, reads '
+        'first and then the writes (creating, changing and moving bookings, reviews, '
+        'services and so on), and fail if any request exceeds its QUERY_BUDGETS '
+        'entry or repeats a query.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=40)
+        parser.add_argument('--seekers', type=int, default=10)
+
+    def handle(self, *args, **options):
+        # The command does its own counting; keep the middleware out of the way.
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            providers, _categories = seed_catalog(options['services'], provider_count=3)
+            get_search_backend().rebuild()
+            similarity.rebuild()
+            services = list(providers[0].services.all())
+            seekers = seed_activity(services, seeker_count=options['seekers'])
+            seeker, provider = seekers[0], providers[0]
+            service = services[0]
+            booking = Booking.objects.filter(seeker=seeker).first()
+            review = Review.objects.filter(seeker=seeker).first()
+            complaint = Complaint.objects.filter(user=seeker).first()
+            today = datetime.date.today()
+
+            requests = [
+                (None, '/api/categories/'),
+                (None, '/api/services/?page_size=50'),
+                (None, '/api/services/?page_size=50&ordering=rating&min_rating=2'),
+                (None, '/api/services/?page_size=50&ordering=top_rated'),
+                (None, '/api/services/?page_size=50&near=-1.2864,36.8172&radius_km=200'),
+                (None, '/api/services/search/?q=plumbing&page_size=50'),
+                (None, '/api/services/facets/?search=pipe&min_price=1000&min_rating=2'),
+                (None, '/api/services/autocomplete/?q=pip'),
+                (None, f'/api/services/{service.pk}/'),
+                (None, f'/api/services/{service.pk}/similar/'),
+                (None, f'/api/services/{service.pk}/slots/'),
+                (provider, '/api/availability/'),
+                (provider, '/api/services/my-services/'),
+                (seeker, '/api/bookings/'),
+                (provider, '/api/bookings/'),
+                (seeker, f'/api/bookings/{booking.pk}/'),
+                (provider, f'/api/bookings/calendar/?from={today}&to={today + datetime.timedelta(days=41)}'),
+                (provider, f'/api/bookings/calendar/?service={service.pk}'),
+                (None, f'/api/reviews/?service={service.pk}'),
+                (seeker, '/api/reviews/'),
+                (provider, '/api/reviews/provider/'),
+                (provider, '/api/reviews/provider/?since=2000-01-01T00:00:00Z'),
+                (None, f'/api/reviews/{review.pk}/'),
+                (seeker, '/api/complaints/'),
+                (seeker, f'/api/complaints/{complaint.pk}/'),
+                (seeker, '/api/users/me/'),
+            ]
+            # The writes, in an order that keeps each one valid
+            newcomer = CustomUser.objects.create(email='newcomer@bench.local', role='SEEKER', firebase_uid='bench-newcomer')
+            next_week = datetime.datetime.combine(
+                today + datetime.timedelta(days=7), datetime.time(10), tzinfo=datetime.timezone.utc,
+            )
+            pending = Booking.objects.create(service=service, seeker=seeker, booking_date=next_week)
+            others = [
+                Booking.objects.create(service=service, seeker=seeker, booking_date=next_week + datetime.timedelta(days=day))
+                for day in range(1, 4)
+            ]
+            category = service.category_id
+            item = {'title': 'Budget check', 'description': 'Pipes', 'price': '1500', 'category': category}
+            writes = [
+                (provider, 'post', '/api/categories/', {'name': 'Budget check'}),
+                (provider, 'post', '/api/services/', item),
+                (provider, 'patch', f'/api/services/{service.pk}/', {'title': 'Budget check plumbing'}),
+                (provider, 'post', '/api/services/bulk/', [item, {**item, 'title': 'Budget check two'}]),
+                (newcomer, 'post', '/api/bookings/', {
+                    'service': service.pk, 'booking_date': (next_week + datetime.timedelta(days=5)).isoformat(),
+                }),
+                (seeker, 'patch', f'/api/bookings/{pending.pk}/', {
+                    'booking_date': (next_week + datetime.timedelta(hours=2)).isoformat(),
+                }),
+                (provider, 'patch', f'/api/bookings/{pending.pk}/', {'status': 'CONFIRMED'}),
+                (provider, 'post', '/api/bookings/bulk-status/', {'ids': [b.pk for b in others], 'status': 'CONFIRMED'}),
+                (newcomer, 'post', '/api/reviews/', {'service': service.pk, 'rating': 4}),
+                (seeker, 'patch', f'/api/reviews/{review.pk}/', {'rating': 2}),
+                (seeker, 'post', '/api/complaints/', {
+                    'service': service.pk, 'complaint_type': 'SERVICE_ISSUE', 'description': 'Late',
+                }),
+                (provider, 'post', '/api/availability/', {'weekday': 0, 'start_time': '08:00', 'end_time': '18:00'}),
+            ]
+            failures = self.run_requests([(user, 'get', path, None) for user, path in requests] + writes)
+
+        if failures:
+            raise CommandError(f'{failures} request(s) broke their query budget.')
+        self.stdout.write(self.style.SUCCESS('All requests are within their query budgets.'))
+
+    def run_requests(self, requests):
+        budgets = QueryBudgetMiddleware(get_response=None)
+        failures = 0
+        for user, method, path, data in requests:
+            client = APIClient()
+            if user is not None:
+                client.force_authenticate(user)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = getattr(client, method)(path, data, format='json' if data is not None else None)
+            url_name = response.resolver_match.view_name
+            budget = budgets.budgets.get(url_name, budgets.default_budget)
+            problems = budgets.evaluate(url_name, counter)
+            line = f'{method.upper():<6} {path:<60} {response.status_code}  {counter.total:>3} queries (budget {budget})'
+            if response.status_code not in (200, 201):
+                problems = problems or f'unexpected status {response.status_code}: {response.data}'
+            if problems:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f'{line}  {problems}'))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.firebase_fakes import issue_fake_token
+
+
+class Command(BaseCommand):
+    help = "Print a bearer token accepted when FIREBASE_AUTH_MODE is 'fake'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('uid', help='Firebase UID to put in the token')
+        parser.add_argument('--email', help='Email claim (used to link existing users)')
+        parser.add_argument('--expires-in', type=int, default=3600, help='Lifetime in seconds')
+
+    def handle(self, *args, **options):
+        if settings.FIREBASE_AUTH_MODE != 'fake':
+            raise CommandError("Fake tokens are only accepted when FIREBASE_AUTH_MODE is 'fake'.")
+        self.stdout.write(issue_fake_token(options['uid'], email=options['email'], expires_in=options['expires_in']))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adminactionlog',
+            index=models.Index(fields=['-created_at', '-id'], name='adminlog_newest_idx'),
+        ),
+    ]
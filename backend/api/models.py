@@ -44,6 +44,7 @@ class AdminActionLog(models.Model):
         indexes = [
             models.Index(fields=['admin_user', '-created_at']),
             models.Index(fields=['resource_type', 'resource_id']),
+            models.Index(fields=['-created_at', '-id'], name='adminlog_newest_idx'),
         ]
     
     def __str__(self):
@@ -0,0 +1,210 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, replace_query_param, remove_query_param
+from rest_framework.response import Response
+
+
+def _legacy_unpaginated(request, param):
+    return request.query_params.get(param, '').lower() in ('false', '0', 'no')
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Page-number pagination (``?page=2&page_size=50``).
+
+    Clients written before pagination existed can pass ``?paginate=false`` to
+    get the complete, unwrapped list as before.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    legacy_query_param = 'paginate'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if _legacy_unpaginated(request, self.legacy_query_param):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on the queryset's ordering (``?cursor=...&page_size=50``).
+
+    Each page is fetched with a range condition on the ordering columns, e.g.
+    ``(created_at, id) < (last created_at, last id)`` for ``-created_at, -id``,
+    so deep pages cost the same as the first one and rows inserted while a
+    client is paging neither repeat nor go missing. Cursors are opaque.
+
+    The ordering comes from the queryset; ``id`` is appended as a tie-breaker
+    when it is missing, and ``ordering`` is used when the queryset is
+    unordered. Orderings that cannot be expressed as a range over concrete
+    non-null columns (annotations, related fields) fall back to an offset
+    kept inside the cursor, so clients see the same interface either way.
+
+    ``?paginate=false`` returns the complete, unwrapped list as before.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    legacy_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if _legacy_unpaginated(request, self.legacy_query_param):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+
+        if not queryset.ordered:
+            queryset = queryset.order_by(*self.ordering)
+        self.keys = self.get_keys(queryset)
+        if self.keys is not None:
+            queryset = queryset.order_by(*self.keys)
+
+        cursor = self.decode_cursor(request)
+        if self.keys is None:
+            return self.paginate_by_offset(queryset, cursor.get('o', 0))
+        return self.paginate_by_keys(queryset, cursor.get('p'), cursor.get('r', False))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_keys(self, queryset):
+        """Return the ordering as field names if it can be paged by range, else None."""
+        order_by = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not all(isinstance(key, str) for key in order_by):
+            return None
+        keys = ['-id' if key == '-pk' else 'id' if key == 'pk' else key for key in order_by]
+        if not any(key.lstrip('-') == 'id' for key in keys):
+            descending = keys and keys[-1].startswith('-')
+            keys.append('-id' if descending else 'id')
+        for key in keys:
+            name = key.lstrip('-')
+            if '__' in name or name in queryset.query.annotations:
+                return None
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.null or not field.concrete or field.is_relation:
+                return None
+        return keys
+
+    def paginate_by_keys(self, queryset, position, reverse):
+        if position is not None:
+            if not isinstance(position, list) or len(position) != len(self.keys):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(self.position_filter(position, reverse))
+            except (ValidationError, ValueError, TypeError):
+                # A tampered position that does not fit the column types
+                raise NotFound(self.invalid_cursor_message)
+        if reverse:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+
+        if reverse:
+            rows.reverse()
+            # Came back from a later page, so there is always a next one.
+            self.previous_cursor = {'p': self.position(rows[0]), 'r': True} if has_more else None
+            self.next_cursor = {'p': self.position(rows[-1])} if rows else {}
+        else:
+            self.next_cursor = {'p': self.position(rows[-1])} if has_more else None
+            if position is None:
+                self.previous_cursor = None
+            else:
+                self.previous_cursor = {'p': self.position(rows[0]) if rows else position, 'r': True}
+        return rows
+
+    def position_filter(self, position, reverse):
+        """Rows strictly after ``position`` in the ordering (before it when reverse)."""
+        condition = None
+        for index in reversed(range(len(self.keys))):
+            key = self.keys[index]
+            name = key.lstrip('-')
+            after = key.startswith('-') == reverse  # ascending forward, or descending backward
+            step = Q(**{f'{name}__gt' if after else f'{name}__lt': position[index]})
+            if condition is not None:
+                step |= Q(**{name: position[index]}) & condition
+            condition = step
+        # Lead with an inclusive range on the first column so it can use an index.
+        first = self.keys[0].lstrip('-')
+        after = self.keys[0].startswith('-') == reverse
+        return Q(**{f'{first}__gte' if after else f'{first}__lte': position[0]}) & condition
+
+    def position(self, row):
+        values = []
+        for key in self.keys:
+            # Model instances, or dicts from values() (see api/row_mappers.py)
+            value = row[key.lstrip('-')] if isinstance(row, dict) else getattr(row, key.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else
+                          value if isinstance(value, (int, float, str, bool)) else str(value))
+        return values
+
+    def paginate_by_offset(self, queryset, offset):
+        if not isinstance(offset, int) or offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+        rows = list(queryset[offset:offset + self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        self.next_cursor = {'o': offset + self.page_size_value} if has_more else None
+        self.previous_cursor = {'o': max(0, offset - self.page_size_value)} if offset else None
+        return rows[:self.page_size_value]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return {}
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, cursor):
+        if cursor is None:
+            return None
+        if not cursor:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii').rstrip('='))
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_cursor)
+
+    def get_previous_link(self):
+        return self.encode_cursor(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
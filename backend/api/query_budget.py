@@ -0,0 +1,115 @@
+"""
+Per-request database query budgets.
+
+QueryBudgetMiddleware counts the queries each request runs (through
+``connection.execute_wrapper``, so it works with DEBUG off) and compares the
+total against QUERY_BUDGETS, keyed by URL name. It also flags SQL statements
+executed more than QUERY_BUDGET_REPEAT_THRESHOLD times in one request, the
+usual signature of an N+1 pattern, whether or not the view has a budget.
+
+Violations are logged to the ``api.query_budget`` logger together with the
+offending query shapes, or raised as QueryBudgetExceeded when
+QUERY_BUDGET_ACTION is 'raise' (meant for development and tests).
+
+Only a fraction of requests (QUERY_BUDGET_SAMPLE_RATE) is inspected. For an
+unsampled request the middleware costs one random() call; for a sampled one,
+a dict increment per query; SQL is only normalized when a report is made.
+"""
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r'\s+')
+_COLUMNS_RE = re.compile(r'^SELECT (?:DISTINCT )?.*? FROM ', re.DOTALL)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_shape(sql):
+    """Reduce a statement to its shape: column list, literals and IN-list lengths removed."""
+    sql = _COLUMNS_RE.sub('SELECT ... FROM ', sql)
+    sql = _IN_LIST_RE.sub('(%s, ...)', sql)
+    sql = _LITERAL_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryCounter:
+    """Database execute wrapper that tallies statements by their SQL text."""
+
+    def __init__(self):
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements[sql] += 1
+        return execute(sql, params, many, context)
+
+    @property
+    def total(self):
+        return sum(self.statements.values())
+
+    def shapes(self):
+        """Statement counts grouped by query shape, most frequent first."""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[query_shape(sql)] += count
+        return shapes.most_common()
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.repeat_threshold = getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 10)
+        self.sample_rate = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 0.0)
+        self.action = getattr(settings, 'QUERY_BUDGET_ACTION', 'log')
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+
+        self.check(request, counter)
+        return response
+
+    def check(self, request, counter):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        problems = self.evaluate(url_name, counter)
+        if not problems:
+            return
+        message = f'{request.method} {request.path} [{url_name}]: {problems}'
+        if self.action == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+    def evaluate(self, url_name, counter):
+        """Describe how a request's queries break its budget, or return None."""
+        budget = self.budgets.get(url_name, self.default_budget)
+        problems = []
+        if budget is not None and counter.total > budget:
+            problems.append(f'{counter.total} queries (budget {budget})')
+        shapes = counter.shapes()
+        repeated = [(shape, count) for shape, count in shapes if count > self.repeat_threshold]
+        if repeated:
+            problems.append(f'{len(repeated)} statement(s) repeated more than {self.repeat_threshold} times')
+        if not problems:
+            return None
+        report = '\n'.join(f'  {count:>4} x {shape}' for shape, count in (repeated or shapes[:5]))
+        return f'{"; ".join(problems)}\n{report}'
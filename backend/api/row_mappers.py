@@ -0,0 +1,256 @@
+"""
+Read-only fast path for list endpoints.
+
+Serializing a list through DRF builds a model instance per row and then
+walks every field of every (nested) serializer for each of them.
+``get_row_mapper(serializer, model)`` instead compiles the serializer once
+into a plain Python function that turns one ``.values()`` row into the same
+dictionary the serializer would produce:
+
+- text, integer and boolean columns are copied (``None`` stays ``None``);
+- ISO 8601 datetimes and text choices are converted inline, the same way
+  DRF does; other fields (decimals, dates, ...) go through the field's own
+  ``to_representation``;
+- nested serializers over forward relations become nested dicts, or
+  ``None`` when the foreign key is empty;
+- model properties listed in ``Meta.property_sources`` are evaluated with
+  the model's own property code on just those columns;
+- queryset annotations listed in ``Meta.annotation_fields`` are fetched as
+  columns like any other.
+
+Serializers the compiler does not understand (method fields, ``source='*'``,
+many=True nesting, custom ``to_representation``) get no mapper, and the
+view falls back to the serializer. RowMapperConformanceTests in api/tests.py
+verifies that both paths produce identical output for every field.
+"""
+import copy
+import datetime
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import fields as drf_fields
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+_TEXT_COLUMNS = {'CharField', 'TextField', 'SlugField'}
+_INTEGER_COLUMNS = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField',
+    'SmallIntegerField', 'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+# Fields whose to_representation() returns values read from these columns
+# unchanged, so the compiled code can copy them directly.
+_PASSTHROUGH = (
+    (drf_fields.ChoiceField, set()),  # maps values, see _Compiler.convert()
+    (drf_fields.CharField, _TEXT_COLUMNS),  # and EmailField, SlugField, ...
+    (drf_fields.IntegerField, _INTEGER_COLUMNS),
+    (drf_fields.BooleanField, {'BooleanField'}),
+)
+
+_MAPPER_CACHE_SIZE = 256
+_mappers = {}
+
+
+class Unsupported(Exception):
+    pass
+
+
+class RowMapper:
+    """A compiled serializer: ``columns`` to fetch and ``map_row(row) -> dict``."""
+
+    def __init__(self, columns, map_row, source):
+        self.columns = columns
+        self.map_row = map_row
+        self.source = source  # generated code, for debugging
+
+    def rows(self, queryset, extra_columns=()):
+        columns = list(self.columns)
+        columns.extend(column for column in extra_columns if column not in columns)
+        return queryset.values(*columns)
+
+    def map(self, rows):
+        # What DateTimeField.enforce_timezone() looks up for every value
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        map_row = self.map_row
+        return [map_row(row, tz) for row in rows]
+
+
+class _Compiler:
+    def __init__(self):
+        self.columns = []
+        self.namespace = {'_ns': SimpleNamespace, '_none': _none, '_iso_datetime': _iso_datetime}
+
+    def column(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return f'r[{name!r}]'
+
+    def constant(self, value):
+        name = f'_c{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def serializer(self, serializer, model, prefix):
+        if isinstance(serializer, serializers.ListSerializer):
+            raise Unsupported('many=True')
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            raise Unsupported(f'{type(serializer).__name__}.to_representation')
+        meta = getattr(serializer, 'Meta', None)
+        property_sources = getattr(meta, 'property_sources', {})
+        # Queryset annotations the serializer reads, e.g. distance_km
+        annotations = getattr(meta, 'annotation_fields', ()) if not prefix else ()
+
+        items = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source in annotations:
+                value = self.convert(field, self.column(field.source), None)
+            else:
+                value = self.field(name, field, model, prefix, property_sources)
+            items.append(f'{name!r}: {value}')
+        return '{' + ', '.join(items) + '}'
+
+    def field(self, name, field, model, prefix, property_sources):
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            raise Unsupported(f'{name}: computed field')
+        attrs = field.source_attrs
+
+        # Walk forward relations in a dotted source ('admin_user.email')
+        for attr in attrs[:-1]:
+            relation = _model_field(model, attr)
+            if relation is None or not relation.concrete or not (relation.many_to_one or relation.one_to_one):
+                raise Unsupported(f'{name}: source {field.source}')
+            prefix = f'{prefix}{attr}__'
+            model = relation.related_model
+
+        attr = attrs[-1]
+        model_field = _model_field(model, attr)
+        if model_field is None:
+            if attr not in property_sources:
+                raise Unsupported(f'{name}: property without Meta.property_sources')
+            getter = self.constant(getattr(model, attr).fget)
+            arguments = ', '.join(f'{column}={self.column(prefix + column)}' for column in property_sources[attr])
+            return self.convert(field, f'{getter}(_ns({arguments}))', None)
+        if not model_field.concrete:
+            raise Unsupported(f'{name}: reverse relation')
+
+        value = self.column(prefix + attr)
+        if isinstance(field, serializers.BaseSerializer):
+            if not model_field.is_relation:
+                raise Unsupported(f'{name}: nested serializer over {attr}')
+            nested = self.serializer(field, model_field.related_model, f'{prefix}{attr}__')
+            return f'(None if {value} is None else {nested})'
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return value  # values() yields the key itself
+        if model_field.is_relation:
+            raise Unsupported(f'{name}: related field {type(field).__name__}')
+        return self.convert(field, value, model_field)
+
+    def convert(self, field, expression, model_field):
+        """Expression for ``field.to_representation(expression)``; ``model_field`` is its column."""
+        if type(field) is drf_fields.ReadOnlyField:
+            return expression
+        column_type = model_field.get_internal_type() if model_field is not None else None
+        for field_class, column_types in _PASSTHROUGH:
+            if isinstance(field, field_class):
+                if column_type in column_types:
+                    return expression
+                break
+        # An unbound copy, so the cached mapper holds no request or serializer
+        field = copy.deepcopy(field)
+        if isinstance(field, drf_fields.ChoiceField) and column_type in _TEXT_COLUMNS and not field.allow_blank:
+            # Text columns: the lookup to_representation() makes, minus str()
+            choices = self.constant(field.choice_strings_to_values)
+            return f'{choices}.get({expression}, {expression})'
+        if (type(field) is drf_fields.DateTimeField and not hasattr(field, 'timezone')
+                and str(getattr(field, 'format', api_settings.DATETIME_FORMAT)).lower() == ISO_8601):
+            return f'_iso_datetime({expression}, tz, {self.constant(field.to_representation)})'
+        return f'_none({self.constant(field.to_representation)}, {expression})'
+
+
+def _none(to_representation, value):
+    # Serializer.to_representation() never passes None to a field
+    return None if value is None else to_representation(value)
+
+
+def _iso_datetime(value, tz, to_representation):
+    # DateTimeField.to_representation() for aware values and the default format
+    if value.__class__ is not datetime.datetime or tz is None or value.tzinfo is None:
+        return None if value is None else to_representation(value)
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def compile_mapper(serializer, model):
+    """Compile ``serializer`` (bound, with its final field set) for ``model`` rows."""
+    compiler = _Compiler()
+    body = compiler.serializer(serializer, model, '')
+    source = f'def map_row(r, tz):\n    return {body}\n'
+    exec(compile(source, f'<row mapper {type(serializer).__name__}>', 'exec'), compiler.namespace)
+    return RowMapper(compiler.columns, compiler.namespace['map_row'], source)
+
+
+def get_row_mapper(serializer, model):
+    """Return a cached RowMapper for ``serializer``, or None if it cannot be compiled."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    selection = serializer.get_selection() if hasattr(serializer, 'get_selection') else None
+    key = (type(serializer), model, repr(selection))
+    try:
+        return _mappers[key]
+    except KeyError:
+        pass
+    try:
+        mapper = compile_mapper(serializer, model)
+    except Unsupported:
+        mapper = None
+    if len(_mappers) < _MAPPER_CACHE_SIZE:
+        _mappers[key] = mapper
+    return mapper
+
+
+def ordering_columns(queryset, paginator=None):
+    """Plain columns the queryset (or the paginator's default) orders by."""
+    ordering = queryset.query.order_by or getattr(paginator, 'ordering', ()) or queryset.model._meta.ordering
+    columns = ['id']
+    for key in ordering:
+        if isinstance(key, str):
+            name = key.lstrip('-')
+            if name != 'pk' and name not in queryset.query.annotations and _model_field(queryset.model, name):
+                columns.append(name)
+    return columns
+
+
+class FastListMixin:
+    """
+    List view mixin: GET fetches rows with ``.values()`` and serializes them
+    with the serializer's compiled RowMapper instead of building a model
+    instance per row. Falls back to the serializer when it cannot be
+    compiled, or everywhere when FAST_LIST_SERIALIZATION is off.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        mapper = None
+        if settings.FAST_LIST_SERIALIZATION and hasattr(queryset, 'values'):
+            mapper = get_row_mapper(self.get_serializer(), queryset.model)
+        if mapper is None:
+            return super().list(request, *args, **kwargs)
+
+        # The ordering columns let keyset pagination build its cursors.
+        rows = mapper.rows(queryset, ordering_columns(queryset, self.paginator))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(mapper.map(page))
+        return Response(mapper.map(rows))
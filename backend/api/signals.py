@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import CustomUser
+from . import token_cache, user_resolver
+
+
+@receiver(post_delete, sender=CustomUser)
+def forget_deleted_user(sender, instance, **kwargs):
+    """Cached tokens and user rows must not outlive the account they belong to."""
+    token_cache.invalidate_user(instance.firebase_uid)
+    user_resolver.invalidate_user(instance.firebase_uid, instance.loaded_firebase_uid)
+
+
+@receiver(post_save, sender=CustomUser)
+def forget_saved_user(sender, instance, created, **kwargs):
+    """
+    Drop the cached copy of a user on every save, under both the current UID
+    and the one it was loaded with (in case the UID itself changed).
+    Cached tokens are dropped as soon as an account is deactivated.
+    """
+    user_resolver.invalidate_user(instance.firebase_uid, instance.loaded_firebase_uid)
+    if not created and not instance.is_active:
+        token_cache.invalidate_user(instance.firebase_uid)
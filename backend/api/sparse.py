@@ -0,0 +1,224 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``).
+
+Serializers using SparseFieldsMixin trim their output on GET requests:
+
+- ``?fields=id,status,service_details.title`` keeps only the listed fields;
+  dotted names select inside nested serializers (a bare nested name keeps
+  all of its fields).
+- ``?expand=service_details,service_details.provider_details`` lists the
+  nested serializers to embed; any nested serializer not listed (or named
+  in ``fields``) is left out. Without ``expand`` every nested serializer is
+  embedded, which is what existing clients expect.
+
+A name that is not a field of the serializer (or, in ``expand``, not a
+nested serializer) is answered with 400, so a typo does not silently drop
+data the client expected.
+
+Views using SparseQuerysetMixin apply the same selection to their queryset:
+only the relations that will be serialized are joined (select_related) and
+only the columns that will be read are fetched (only()). Serializer fields
+backed by a model property declare the columns they read in
+``Meta.property_sources``; fields whose columns cannot be determined make
+the whole model load as usual.
+
+Writes (POST/PUT/PATCH) always validate and return the full representation.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.fields import HiddenField
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+_UNSET = object()
+
+
+def parse_selection(value):
+    """``'a,b.c,b.d'`` -> ``{'a': {}, 'b': {'c': {}, 'd': {}}}``; None when not given."""
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for part in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def request_selection(request):
+    """The (fields, expand) selection of a safe request, else (None, None)."""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None, None
+    params = request.query_params
+    return parse_selection(params.get(FIELDS_PARAM)), parse_selection(params.get(EXPAND_PARAM))
+
+
+def _nested_serializer(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+class SparseFieldsMixin:
+    """Serializer mixin that applies the request's ``fields`` / ``expand`` selection."""
+
+    def get_selection(self):
+        selection = getattr(self, '_sparse_selection', _UNSET)
+        if selection is _UNSET:
+            # Only the outermost serializer reads the request; nested ones are
+            # given their part of the selection by their parent, or everything.
+            outer = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+            selection = request_selection(self.context.get('request')) if outer.parent is None else (None, None)
+        return selection
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, expand = self.get_selection()
+        if only is None and expand is None:
+            return fields
+
+        prefix = getattr(self, '_sparse_prefix', '')
+        check_selection(fields, only, FIELDS_PARAM, prefix)
+        check_selection(fields, expand, EXPAND_PARAM, prefix, nested_only=True)
+
+        selected = {}
+        for name, field in fields.items():
+            nested = _nested_serializer(field)
+            if only is not None and name not in only:
+                continue
+            if nested is not None:
+                if expand is not None and name not in expand and not (only and name in only):
+                    continue
+                child_only = (only or {}).get(name) or None
+                child_expand = None if expand is None else expand.get(name, {})
+                nested._sparse_selection = (child_only, child_expand)
+                nested._sparse_prefix = f'{prefix}{name}.'
+                if child_only or child_expand:
+                    nested.fields  # checks the nested names now, even if no row is serialized
+            selected[name] = field
+        return selected
+
+
+def check_selection(fields, tree, param, prefix, nested_only=False):
+    """Raise a 400 ValidationError naming the entries of ``tree`` that ``fields`` lacks."""
+    if not tree:
+        return
+    unknown = []
+    for name, subtree in tree.items():
+        nested = _nested_serializer(fields[name]) if name in fields else None
+        if name not in fields or (nested_only and nested is None):
+            unknown.append(prefix + name)
+        elif subtree and nested is None:
+            # Dotted names below a plain field
+            unknown.extend(f'{prefix}{name}.{child}' for child in subtree)
+    if unknown:
+        raise serializers.ValidationError({param: f"Unknown field(s): {', '.join(unknown)}."})
+
+
+class _QueryPlan:
+    def __init__(self):
+        self.related = set()
+        self.columns = set()
+
+    def add_model(self, serializer, model, prefix):
+        """Collect what serializing ``model`` (reached through ``prefix``) reads."""
+        property_sources = getattr(getattr(serializer, 'Meta', None), 'property_sources', {})
+        for name in ('created_at', 'updated_at'):
+            if _concrete(model, name):
+                self.columns.add(prefix + name)
+
+        for name, field in serializer.fields.items():
+            if field.write_only or isinstance(field, HiddenField):
+                continue
+            if name in property_sources:
+                self.columns.update(prefix + column for column in property_sources[name])
+                continue
+            if field.source == '*':
+                self.add_all_columns(model, prefix)
+                continue
+            self.add_source(field, model, prefix, field.source_attrs)
+
+    def add_source(self, field, model, prefix, attrs):
+        for attr in attrs[:-1]:
+            relation = _forward_relation(model, attr)
+            if relation is None:
+                self.add_all_columns(model, prefix)
+                return
+            self.columns.add(prefix + attr)
+            prefix = f'{prefix}{attr}__'
+            self.related.add(prefix[:-2])
+            model = relation.related_model
+
+        attr = attrs[-1]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            # A property or method: no way to know which columns it reads.
+            self.add_all_columns(model, prefix)
+            return
+        if not model_field.concrete:
+            return  # Reverse relations are fetched by their own query anyway.
+
+        self.columns.add(prefix + attr)
+        nested = _nested_serializer(field)
+        if nested is not None and model_field.is_relation and not isinstance(field, serializers.ListSerializer):
+            path = prefix + attr
+            self.related.add(path)
+            self.add_model(nested, model_field.related_model, path + '__')
+
+    def add_all_columns(self, model, prefix):
+        self.columns.update(prefix + field.name for field in model._meta.concrete_fields)
+
+
+def _concrete(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+def _forward_relation(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if field.concrete and (field.many_to_one or field.one_to_one):
+        return field
+    return None
+
+
+def optimize_queryset(queryset, serializer):
+    """Restrict ``queryset`` to the joins and columns ``serializer`` will read."""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    only, expand = serializer.get_selection()
+    if only is None and expand is None:
+        return queryset
+
+    plan = _QueryPlan()
+    plan.add_model(serializer, queryset.model, '')
+    for ordering in queryset.query.order_by:
+        if isinstance(ordering, str) and _concrete(queryset.model, ordering.lstrip('-')):
+            plan.columns.add(ordering.lstrip('-'))
+    queryset = queryset.select_related(None)
+    if plan.related:
+        # select_related() without arguments would follow every relation
+        queryset = queryset.select_related(*sorted(plan.related))
+    return queryset.only(*sorted(plan.columns))
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin: on GET, fetch only what the requested fields need.
+
+    Hooks into filter_queryset(), which list() and get_object() both call,
+    so views keep overriding get_queryset() as usual.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in ('GET', 'HEAD') or not hasattr(queryset, 'query'):
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer())
@@ -1,3 +1,757 @@
-from django.test import TestCase
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.test import APIClient, APIRequestFactory
+
+from services import similarity
+from services.benchmarking import seed_activity, seed_catalog
+from services.models import Booking, Category, Complaint, Service
+from services.search import get_search_backend
+from users.models import CustomUser
+from . import exports, firebase
+from .authentication import FirebaseAuthentication
+from .checks import check_user_cache
+from .firebase_fakes import FakeKeyServer, FakeTokenIssuer, issue_fake_token
+from .models import AdminActionLog
+from .query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, query_shape
+from .row_mappers import FastListMixin, get_row_mapper
+from .token_cache import EXPIRY_LEEWAY_SECONDS, TokenCache, get_token_cache
+from .user_resolver import resolve_user
+from .verifiers import (
+    ExpiredTokenError, FakeVerifier, InvalidTokenError, LocalVerifier, get_verifier, set_verifier,
+)
+
+
+def decoded(uid='uid-1', expires_in=3600):
+    return {'uid': uid, 'sub': uid, 'exp': time.time() + expires_in}
+
+
+class TokenCacheTests(SimpleTestCase):
+
+    def test_hit_after_set(self):
+        token_cache = TokenCache()
+        self.assertIsNone(token_cache.get('token'))
+        token_cache.set('token', decoded())
+        self.assertEqual(token_cache.get('token')['uid'], 'uid-1')
+        self.assertEqual((token_cache.hits, token_cache.misses), (1, 1))
+
+    def test_expired_tokens_are_not_cached(self):
+        token_cache = TokenCache()
+        token_cache.set('expired', decoded(expires_in=-10))
+        token_cache.set('expiring', decoded(expires_in=EXPIRY_LEEWAY_SECONDS - 1))
+        self.assertIsNone(token_cache.get('expired'))
+        self.assertIsNone(token_cache.get('expiring'))
+        self.assertEqual(len(token_cache), 0)
+
+    def test_entries_end_at_the_token_expiry(self):
+        token_cache = TokenCache(local_ttl=None)
+        token_cache.set('token', decoded(expires_in=EXPIRY_LEEWAY_SECONDS + 0.2))
+        self.assertIsNotNone(token_cache.get('token'))
+        time.sleep(0.3)
+        self.assertIsNone(token_cache.get('token'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        token_cache = TokenCache(max_size=2)
+        token_cache.set('a', decoded('a'))
+        token_cache.set('b', decoded('b'))
+        token_cache.get('a')
+        token_cache.set('c', decoded('c'))
+        self.assertIsNone(token_cache.get('b'))
+        self.assertIsNotNone(token_cache.get('a'))
+
+    def test_invalidate_user_drops_their_tokens_only(self):
+        token_cache = TokenCache()
+        token_cache.set('first', decoded('uid-1'))
+        token_cache.set('second', decoded('uid-1'))
+        token_cache.set('other', decoded('uid-2'))
+        token_cache.invalidate_user('uid-1')
+        self.assertIsNone(token_cache.get('first'))
+        self.assertIsNone(token_cache.get('second'))
+        self.assertIsNotNone(token_cache.get('other'))
+
+    def test_shared_tier_is_revoked_for_other_processes(self):
+        shared = caches['default']
+        shared.clear()
+        this_process, other_process = TokenCache(shared_alias='default'), TokenCache(shared_alias='default')
+        this_process.set('token', decoded())
+        self.assertIsNotNone(other_process.get('token'))
+
+        other_process.clear()
+        time.sleep(0.01)
+        this_process.invalidate_user('uid-1')
+        self.assertIsNone(other_process.get('token'))
+        shared.clear()
+
+
+class CountingVerifier:
+    """Wraps a verifier and counts the tokens it is asked to verify."""
+
+    def __init__(self, verifier):
+        self.verifier = verifier
+        self.calls = 0
+
+    def verify(self, token):
+        self.calls += 1
+        return self.verifier.verify(token)
+
+
+@override_settings(FIREBASE_AUTH_MODE='fake')
+class CachedAuthenticationTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        get_token_cache().clear()
+        self.verifier = CountingVerifier(FakeVerifier())
+        set_verifier(self.verifier)
+        self.addCleanup(set_verifier, None)
+        self.addCleanup(get_token_cache().clear)
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return FirebaseAuthentication().authenticate(request)
+
+    def test_token_is_verified_once(self):
+        token = issue_fake_token('uid-1', email='one@example.com')
+        first_user, _claims = self.authenticate(token)
+        second_user, claims = self.authenticate(token)
+        self.assertEqual(first_user.pk, second_user.pk)
+        self.assertEqual(claims['uid'], 'uid-1')
+        self.assertEqual(self.verifier.calls, 1)
+
+    def test_expired_token_is_refused(self):
+        token = issue_fake_token('uid-1', expires_in=-60)
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, 'expired'):
+            self.authenticate(token)
+        self.assertEqual(len(get_token_cache()), 0)
+
+
+class RecordingFallback:
+    """Stands in for the SDK: records the tokens LocalVerifier hands over."""
+
+    def __init__(self):
+        self.tokens = []
+
+    def verify(self, token):
+        self.tokens.append(token)
+        return {'uid': 'from-fallback'}
+
+
+class LocalVerifierTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.issuer = FakeTokenIssuer(project_id='juakali-test')
+        cls.key_server = FakeKeyServer(cls.issuer).start()
+        cls.addClassCleanup(cls.key_server.stop)
+
+    def setUp(self):
+        self.key_server.request_count = 0
+        self.fallback = RecordingFallback()
+        self.verifier = LocalVerifier(
+            project_id=self.issuer.project_id, certs_url=self.key_server.url, fallback=self.fallback,
+        )
+        self.addCleanup(self.verifier.key_store.stop)
+
+    def test_valid_token(self):
+        claims = self.verifier.verify(self.issuer.issue('uid-1', email='one@example.com'))
+        self.assertEqual((claims['uid'], claims['email']), ('uid-1', 'one@example.com'))
+        self.assertEqual(self.fallback.tokens, [])
+
+    def test_keys_are_fetched_once(self):
+        for uid in ('uid-1', 'uid-2', 'uid-3'):
+            self.verifier.verify(self.issuer.issue(uid))
+        self.assertEqual(self.key_server.request_count, 1)
+
+    def test_expired_token(self):
+        with self.assertRaises(ExpiredTokenError):
+            self.verifier.verify(self.issuer.issue('uid-1', expires_in=-60))
+
+    def test_wrong_audience(self):
+        with self.assertRaisesMessage(InvalidTokenError, 'Audience'):
+            self.verifier.verify(self.issuer.issue('uid-1', aud='another-project'))
+
+    def test_wrong_issuer(self):
+        with self.assertRaisesMessage(InvalidTokenError, 'issuer'):
+            self.verifier.verify(self.issuer.issue('uid-1', iss='https://securetoken.google.com/another-project'))
+
+    def test_wrong_signature(self):
+        other = FakeTokenIssuer(project_id=self.issuer.project_id)
+        header = self.issuer.issue('uid-1').split('.')[0]
+        _header, payload, signature = other.issue('uid-1').split('.')
+        with self.assertRaisesMessage(InvalidTokenError, 'Signature'):
+            self.verifier.verify(f'{header}.{payload}.{signature}')
+
+    def test_empty_or_long_subject(self):
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(self.issuer.issue('', sub=''))
+        with self.assertRaises(InvalidTokenError):
+            self.verifier.verify(self.issuer.issue('u' * 129))
+
+    def test_other_algorithms_are_refused(self):
+        with self.assertRaisesMessage(InvalidTokenError, 'alg'):
+            self.verifier.verify(issue_fake_token('uid-1'))
+
+    @mock.patch('api.verifiers.UNKNOWN_KID_REFRESH_INTERVAL', 0)
+    def test_unknown_kid_refreshes_the_keys(self):
+        self.verifier.verify(self.issuer.issue('uid-1'))
+        self.issuer.add_key()  # Google rotated its keys
+        token = self.issuer.issue('uid-1')
+
+        # Not known yet: the SDK handles this token while the keys are refreshed
+        self.assertEqual(self.verifier.verify(token), {'uid': 'from-fallback'})
+        deadline = time.monotonic() + 5
+        while self.key_server.request_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.key_server.request_count, 2)
+        self.assertEqual(self.verifier.verify(token)['uid'], 'uid-1')
+        self.assertEqual(self.fallback.tokens, [token])
+
+    def test_unknown_kids_refresh_at_most_once_a_minute(self):
+        self.verifier.verify(self.issuer.issue('uid-1'))
+        self.issuer.add_key()
+        for _ in range(3):
+            self.verifier.verify(self.issuer.issue('uid-1'))
+        time.sleep(0.1)
+        self.assertEqual(self.key_server.request_count, 1)
+        self.assertEqual(len(self.fallback.tokens), 3)
+
+    def test_unreachable_key_server_falls_back(self):
+        verifier = LocalVerifier(
+            project_id=self.issuer.project_id, certs_url='http://127.0.0.1:9/certs', fallback=self.fallback,
+        )
+        with self.assertLogs('api.verifiers', 'WARNING'):
+            self.assertEqual(verifier.verify(self.issuer.issue('uid-1')), {'uid': 'from-fallback'})
+
+
+class FirebaseModeTests(TestCase):
+
+    def setUp(self):
+        get_token_cache().clear()
+        set_verifier(None)  # chosen again from the settings of each test
+        self.addCleanup(set_verifier, None)
+        self.addCleanup(get_token_cache().clear)
+
+    def get_me(self, token):
+        return APIClient().get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    @override_settings(FIREBASE_AUTH_MODE='fake')
+    def test_fake_mode_accepts_test_tokens(self):
+        response = self.get_me(issue_fake_token('uid-1', email='one@example.com'))
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['firebase_uid'], response.data['email']), ('uid-1', 'one@example.com'))
+        self.assertIsInstance(get_verifier(), FakeVerifier)
+        # Still checked like real tokens
+        self.assertEqual(self.get_me(issue_fake_token('uid-1', expires_in=-60)).status_code, 403)
+        with self.assertLogs('api.authentication', 'ERROR'):
+            self.assertEqual(self.get_me(issue_fake_token('uid-1', aud='another-project')).status_code, 403)
+
+    def test_disabled_mode_ignores_tokens(self):
+        token = issue_fake_token('uid-1', email='one@example.com')
+        with self.settings(FIREBASE_AUTH_MODE='fake'):
+            self.assertEqual(self.get_me(token).status_code, 200)
+        # Neither verified again nor served from the token cache
+        with self.settings(FIREBASE_AUTH_MODE='disabled'):
+            request = APIRequestFactory().get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertIsNone(FirebaseAuthentication().authenticate(request))
+            self.assertEqual(self.get_me(token).status_code, 403)
+
+    def test_sdk_is_initialized_once_on_first_use(self):
+        calls = []
+
+        def initialize():
+            calls.append(threading.get_ident())
+            time.sleep(0.05)  # let the other threads pile up on the lock
+            return 'app'
+
+        with mock.patch.object(firebase, '_app', None), mock.patch.object(firebase, '_initialize_app', initialize):
+            threads = [threading.Thread(target=firebase.get_firebase_app) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(firebase.get_firebase_app(), 'app')
+        self.assertEqual(len(calls), 1)
+
+    def test_missing_service_account_fails_on_first_use(self):
+        with mock.patch.object(firebase, '_app', None), \
+                mock.patch('firebase_admin.get_app', side_effect=ValueError), \
+                self.settings(SERVICE_ACCOUNT_KEY_PATH='/nonexistent/service-account.json'):
+            with self.assertRaisesMessage(ImproperlyConfigured, '/nonexistent/service-account.json'):
+                firebase.get_firebase_app()
+
+    def test_import_does_not_initialize_the_sdk(self):
+        # A fresh process, as manage.py and the WSGI/ASGI servers start
+        script = (
+            'import sys, django; django.setup(); '
+            'import api.firebase, api.authentication, api.verifiers, api.views, core.wsgi, core.asgi; '
+            'print(api.firebase._app is None, "firebase_admin" in sys.modules)'
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='core.settings', FIREBASE_AUTH_MODE='firebase')
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['True', 'False'])
+
+
+class UserResolverTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_first_login_creates_a_seeker(self):
+        user = resolve_user('uid-1', 'one@example.com')
+        self.assertEqual((user.email, user.firebase_uid, user.role), ('one@example.com', 'uid-1', 'SEEKER'))
+
+    def test_cached_user_needs_no_queries(self):
+        user = resolve_user('uid-1', 'one@example.com')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_user('uid-1', 'one@example.com').pk, user.pk)
+
+    def test_save_drops_the_cached_user(self):
+        user = resolve_user('uid-1', 'one@example.com')
+        user.role = 'PROVIDER'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_user('uid-1', 'one@example.com').role, 'PROVIDER')
+
+    def test_uid_change_drops_the_old_entry(self):
+        resolve_user('uid-1', 'one@example.com')
+        user = CustomUser.objects.get(firebase_uid='uid-1')
+        user.firebase_uid = 'uid-2'
+        user.save()
+        # Matched by email, so the account is linked to the token's UID again
+        self.assertEqual(resolve_user('uid-1', 'one@example.com').pk, user.pk)
+        self.assertEqual(CustomUser.objects.get(pk=user.pk).firebase_uid, 'uid-1')
+
+    def test_existing_account_is_linked_by_email(self):
+        admin = CustomUser.objects.create(email='admin@example.com', role='ADMIN')
+        user = resolve_user('uid-1', 'admin@example.com')
+        self.assertEqual((user.pk, user.role), (admin.pk, 'ADMIN'))
+        self.assertEqual(CustomUser.objects.get(pk=admin.pk).firebase_uid, 'uid-1')
+
+    def test_email_change_updates_only_the_email(self):
+        user = CustomUser.objects.create(email='old@example.com', firebase_uid='uid-1', first_name='Ann')
+        CustomUser.objects.filter(pk=user.pk).update(first_name='Changed elsewhere')
+        resolved = resolve_user('uid-1', 'new@example.com')
+        self.assertEqual(resolved.pk, user.pk)
+        stored = CustomUser.objects.get(pk=user.pk)
+        self.assertEqual((stored.email, stored.first_name), ('new@example.com', 'Changed elsewhere'))
+
+    def test_delete_drops_the_cached_user(self):
+        user = resolve_user('uid-1', 'one@example.com')
+        user.delete()
+        self.assertNotEqual(resolve_user('uid-1', 'one@example.com').pk, user.pk)
+
+
+class UserCacheCheckTests(SimpleTestCase):
+
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_process_local_cache_with_several_workers(self):
+        self.assertEqual([error.id for error in check_user_cache(None)], ['api.E004'])
+
+    @override_settings(
+        WEB_CONCURRENCY=4, FIREBASE_USER_CACHE_ALIAS='shared',
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'},
+        },
+    )
+    def test_shared_cache_with_several_workers(self):
+        self.assertEqual(check_user_cache(None), [])
+
+    def test_process_local_cache_with_one_worker(self):
+        self.assertEqual(check_user_cache(None), [])
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0, CATALOG_CACHE_TIMEOUT=0)
+class RowMapperConformanceTests(TestCase):
+    """
+    Every fast-path list endpoint returns the same bytes through the compiled
+    row mappers as through the serializers: as a whole, with each field on
+    its own (?fields=) and with each nested object expanded alone (?expand=),
+    over the first pages. The response cache is off so neither path is
+    served the other's body.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        providers, _categories = seed_catalog(60, provider_count=3)
+        get_search_backend().rebuild()
+        similarity.rebuild()
+        cls.provider = providers[0]
+        services = list(cls.provider.services.all()[:20])
+        cls.service = services[0]
+        cls.seeker = seed_activity(services[:10], seeker_count=4)[0]
+        cls.admin = CustomUser.objects.create(email='admin@bench.local', role='ADMIN', firebase_uid='bench-admin')
+        # Empty optional relations and unreviewed services must match as well
+        Complaint.objects.create(
+            user=cls.seeker, complaint_type=Complaint.ComplaintType.OTHER, description='No service',
+        )
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def endpoints(self):
+        """{user: paths} of the fast-path lists, None for anonymous requests."""
+        return {
+            None: (
+                '/api/services/',
+                '/api/services/?ordering=rating',
+                '/api/services/?ordering=top_rated',
+                '/api/services/?page=2',
+                '/api/services/?search=plumbing',
+                '/api/services/?near=-1.2864,36.8172&radius_km=150',
+                f'/api/services/{self.service.pk}/similar/',
+                f'/api/reviews/?service={self.service.pk}',
+            ),
+            self.provider: ('/api/services/my-services/', '/api/bookings/', '/api/reviews/provider/'),
+            self.seeker: ('/api/bookings/', '/api/reviews/'),
+            self.admin: ('/api/complaints/', '/api/admin/users/'),
+        }
+
+    def test_public_catalog(self):
+        for path in self.endpoints()[None]:
+            self.assertConforms(None, path)
+
+    def test_provider_endpoints(self):
+        for path in self.endpoints()[self.provider]:
+            self.assertConforms(self.provider, path)
+
+    def test_seeker_endpoints(self):
+        for path in self.endpoints()[self.seeker]:
+            self.assertConforms(self.seeker, path)
+
+    def test_admin_endpoints(self):
+        for path in self.endpoints()[self.admin]:
+            self.assertConforms(self.admin, path)
+
+    def test_every_fast_list_is_covered(self):
+        covered = set()
+        for user, paths in self.endpoints().items():
+            for path in paths:
+                covered.add(type(self.get(user, path, fast=False).renderer_context['view'].get_serializer()))
+        fast_lists = {
+            pattern.callback.view_class.serializer_class
+            for pattern in url_patterns(get_resolver())
+            if issubclass(getattr(pattern.callback, 'view_class', object), FastListMixin)
+        }
+        self.assertTrue(fast_lists)
+        self.assertEqual(fast_lists - covered, set())
+
+    def assertConforms(self, user, path):
+        response = self.get(user, path, fast=False)
+        view = response.renderer_context['view']
+        serializer = view.get_serializer()
+        self.assertIsNotNone(get_row_mapper(serializer, view.get_queryset().model), f'{path} has no row mapper')
+        for variant in self.variants(path, serializer):
+            with self.subTest(user=getattr(user, 'email', None), path=variant):
+                self.compare_pages(user, variant)
+
+    def variants(self, path, serializer):
+        """The path itself, each field on its own, and each nested object expanded alone."""
+        separator = '&' if '?' in path else '?'
+        yield path
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            yield f'{path}{separator}fields={name}'
+            if hasattr(field, 'fields'):
+                yield f'{path}{separator}expand={name}'
+                for nested in field.fields:
+                    yield f'{path}{separator}fields={name}.{nested}'
+        yield f'{path}{separator}expand='
+
+    def compare_pages(self, user, path, max_pages=3):
+        for _page in range(max_pages):
+            slow = self.get(user, path, fast=False)
+            fast = self.get(user, path, fast=True)
+            self.assertEqual(slow.status_code, 200, slow.content[:300])
+            self.assertEqual(fast.content, slow.content)
+            data = slow.json()
+            path = data.get('next') if isinstance(data, dict) else None
+            if not path:
+                return
+
+    def get(self, user, path, fast):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        # The admin permission classes print every check
+        with override_settings(FAST_LIST_SERIALIZATION=fast), contextlib.redirect_stdout(io.StringIO()):
+            return client.get(path)
+
+
+@override_settings(
+    QUERY_BUDGET_SAMPLE_RATE=1.0, QUERY_BUDGET_ACTION='log', QUERY_BUDGET_DEFAULT=None,
+    QUERY_BUDGET_REPEAT_THRESHOLD=10, QUERY_BUDGETS={'category-list-create': 0},
+)
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        Category.objects.create(name='Electrical', slug='electrical')
+
+    def run_queries(self, count, sql='SELECT %s', url_name=None, **settings_overrides):
+        """Send a request through a fresh middleware whose view runs ``sql`` ``count`` times."""
+        def view(request):
+            with connection.cursor() as cursor:
+                for i in range(count):
+                    cursor.execute(sql, [i])
+            return HttpResponse()
+
+        request = APIRequestFactory().get('/somewhere/')
+        request.resolver_match = mock.Mock(view_name=url_name) if url_name else None
+        with self.settings(**settings_overrides):
+            return QueryBudgetMiddleware(view)(request)
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT "a"."id", "a"."title" FROM "a" WHERE "a"."id" IN (%s, %s, %s) AND "a"."n" = 12'),
+            'SELECT ... FROM "a" WHERE "a"."id" IN (%s, ...) AND "a"."n" = ?',
+        )
+        self.assertEqual(query_shape("UPDATE  t\n SET x = 'it''s'  WHERE id = 3.5"), 'UPDATE t SET x = ? WHERE id = ?')
+        self.assertEqual(query_shape('SELECT * FROM t WHERE id IN (%s, %s)'), query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s, %s)'))
+
+    def test_over_budget_is_logged_with_the_query_shapes(self):
+        with self.assertLogs('api.query_budget', 'WARNING') as logs:
+            response = APIClient().get('/api/categories/')
+        self.assertEqual(response.status_code, 200)
+        message, = logs.output
+        self.assertIn('GET /api/categories/ [category-list-create]', message)
+        self.assertRegex(message, r'\d+ queries \(budget 0\)')
+        self.assertIn('FROM "services_category"', message)
+
+    def test_within_budget_is_quiet(self):
+        with self.settings(QUERY_BUDGETS={'category-list-create': 3}), self.assertNoLogs('api.query_budget'):
+            self.assertEqual(APIClient().get('/api/categories/').status_code, 200)
+        with self.assertNoLogs('api.query_budget'):
+            self.run_queries(10)  # no budget and at the repeat threshold
+
+    def test_default_budget_covers_unlisted_views(self):
+        with self.assertNoLogs('api.query_budget'):
+            self.run_queries(3, url_name='unlisted')
+        with self.assertLogs('api.query_budget', 'WARNING') as logs:
+            self.run_queries(3, url_name='unlisted', QUERY_BUDGET_DEFAULT=2)
+        self.assertIn('[unlisted]: 3 queries (budget 2)', logs.output[0])
+
+    def test_repeated_statements_are_reported_without_a_budget(self):
+        with self.assertLogs('api.query_budget', 'WARNING') as logs:
+            self.run_queries(11, sql='SELECT %s AS "n"')
+        message, = logs.output
+        self.assertIn('1 statement(s) repeated more than 10 times', message)
+        self.assertIn('11 x SELECT %s AS "n"', message)
+        self.assertNotIn('queries (budget', message)
+
+    def test_raise_action(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '(budget 0)'):
+            with self.settings(QUERY_BUDGET_ACTION='raise'):
+                APIClient().get('/api/categories/')
+
+    def test_sampling(self):
+        with self.assertNoLogs('api.query_budget'):
+            self.run_queries(20, QUERY_BUDGET_SAMPLE_RATE=0)
+        with mock.patch('api.query_budget.random.random', side_effect=[0.7, 0.2]):
+            with self.assertNoLogs('api.query_budget'):
+                self.run_queries(20, QUERY_BUDGET_SAMPLE_RATE=0.5)
+            with self.assertLogs('api.query_budget', 'WARNING'):
+                self.run_queries(20, QUERY_BUDGET_SAMPLE_RATE=0.5)
+
+
+def url_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from url_patterns(pattern)
+        else:
+            yield pattern
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0)
+class SparseFieldsTests(TestCase):
+    """?fields= and ?expand= on the serializer and the row mapper paths alike."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.provider = CustomUser.objects.create(email='provider@example.com', role='PROVIDER', firebase_uid='provider')
+        cls.seeker = CustomUser.objects.create(email='seeker@example.com', role='SEEKER', firebase_uid='seeker')
+        category = Category.objects.create(name='Electrical', slug='electrical')
+        cls.service = Service.objects.create(
+            provider=cls.provider, category=category, title='Solar install', description='Panels', price=1000,
+        )
+        cls.booking = Booking.objects.create(service=cls.service, seeker=cls.seeker, booking_date=timezone.now())
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def get(self, path, user=None):
+        """The response through the serializers and the row mappers, checked to be the same."""
+        responses = []
+        for fast in (False, True):
+            client = APIClient()
+            client.force_authenticate(user or self.seeker)
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                responses.append(client.get(path))
+            caches['default'].clear()
+        slow, fast = responses
+        self.assertEqual((fast.status_code, fast.content), (slow.status_code, slow.content))
+        return slow
+
+    def test_unknown_names_are_rejected(self):
+        for path, param, unknown in (
+            ('/api/services/?fields=id,titel', 'fields', 'titel'),
+            ('/api/services/?fields=title.length', 'fields', 'title.length'),
+            ('/api/services/?fields=provider_details.nmae', 'fields', 'provider_details.nmae'),
+            ('/api/services/?expand=title', 'expand', 'title'),
+            ('/api/services/?expand=reviews', 'expand', 'reviews'),
+            ('/api/bookings/?fields=id,service_details.provider_details.phone', 'fields',
+             'service_details.provider_details.phone'),
+            ('/api/bookings/?expand=service_details.seeker_details', 'expand', 'service_details.seeker_details'),
+            (f'/api/bookings/{self.booking.pk}/?fields=status,colour', 'fields', 'colour'),
+            (f'/api/services/{self.service.pk}/?fields=price,cost', 'fields', 'cost'),
+        ):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {param: f'Unknown field(s): {unknown}.'})
+
+    def test_fields_select_inside_nested_objects(self):
+        response = self.get('/api/bookings/?fields=id,service_details.title,service_details.provider_details.email')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{
+            'id': self.booking.pk,
+            'service_details': {'title': 'Solar install', 'provider_details': {'email': 'provider@example.com'}},
+        }])
+
+        # A bare nested name keeps the whole nested object, nested objects included
+        booking = self.get('/api/bookings/?fields=service_details').json()['results'][0]
+        self.assertEqual(list(booking), ['service_details'])
+        self.assertEqual(booking['service_details']['provider_details']['email'], 'provider@example.com')
+        self.assertEqual(booking['service_details']['category_details']['slug'], 'electrical')
+
+    def test_expand(self):
+        def nested(path):
+            booking = self.get(path).json()['results'][0]
+            self.assertEqual(booking['id'], self.booking.pk)
+            return {
+                name: sorted(key for key, value in booking[name].items() if isinstance(value, dict))
+                for name in ('service_details', 'seeker_details') if name in booking
+            }
+
+        everything = {'service_details': ['category_details', 'provider_details'], 'seeker_details': []}
+        self.assertEqual(nested('/api/bookings/'), everything)
+        self.assertEqual(nested('/api/bookings/?expand='), {})
+        self.assertEqual(nested('/api/bookings/?expand=service_details'), {'service_details': []})
+        self.assertEqual(
+            nested('/api/bookings/?expand=seeker_details,service_details.provider_details'),
+            {'service_details': ['provider_details'], 'seeker_details': []},
+        )
+        # Naming a nested object in fields embeds it without expand
+        self.assertEqual(nested('/api/bookings/?fields=id,seeker_details&expand='), {'seeker_details': []})
+
+    def test_writes_ignore_the_selection(self):
+        client = APIClient()
+        client.force_authenticate(self.provider)
+        response = client.patch(f'/api/bookings/{self.booking.pk}/?fields=nothing', {'status': 'CONFIRMED'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['status'], 'CONFIRMED')
+        self.assertIn('service_details', response.data)
+
+
+def traced_peak(function):
+    """The most memory Python allocated at once while ``function`` ran."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0)
+class ExportTests(TestCase):
+    """Exports stream a chunk at a time (manage.py bench_exports measures RSS over a million rows)."""
+    ROWS = 20_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(email='admin@example.com', role='ADMIN', firebase_uid='admin')
+        AdminActionLog.objects.bulk_create([
+            AdminActionLog(
+                admin_user=cls.admin, action_type='UPDATE', resource_type='SERVICE', resource_id=i,
+                description=f'Action {i}, with "quotes" and a comma', changes={'after': {'price': i}},
+                ip_address='127.0.0.1',
+            )
+            for i in range(cls.ROWS)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_rows_are_read_while_streaming(self):
+        dataset = exports.DATASETS['action-logs']
+        with self.assertNumQueries(0):
+            content = exports.export_rows(dataset, 'csv', {})
+        self.assertIsInstance(content, types.GeneratorType)
+        with self.assertNumQueries(1):  # one cursor, fetched CHUNK_SIZE rows at a time
+            first = next(content)
+        self.assertTrue(first.startswith('id,admin_user_id,'))
+        self.assertEqual(first.count('\n'), 1 + exports.CHUNK_SIZE)
+        content.close()
+
+    def test_memory_stays_bounded(self):
+        # What reading every row at once would take, for comparison
+        every_row = traced_peak(lambda: list(exports.DATASETS['action-logs'].queryset({})))
+        for file_format in ('csv', 'ndjson'):
+            with self.subTest(file_format=file_format):
+                response = self.client.get(f'/api/admin/exports/action-logs.{file_format}')
+                self.assertIsInstance(response, StreamingHttpResponse)
+                lines = []
+                peak = traced_peak(lambda: lines.extend(chunk.count(b'\n') for chunk in response.streaming_content))
+                response.close()
+                self.assertEqual(sum(lines), self.ROWS + (file_format == 'csv'))
+                self.assertLess(peak, every_row / 4, f'{peak:,} bytes at the peak, {every_row:,} for every row')
+
+    def test_accept_header_for_the_file_format(self):
+        for file_format, accept in (('csv', 'text/csv'), ('ndjson', 'application/x-ndjson'), ('csv', 'text/csv, */*;q=0.1')):
+            with self.subTest(accept=accept):
+                response = self.client.get(f'/api/admin/exports/action-logs.{file_format}?to=2000-01-01', HTTP_ACCEPT=accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], exports.FORMATS[file_format])
+                self.assertIn(f'.{file_format}"', response['Content-Disposition'])
+                b''.join(response.streaming_content)
+        # Errors are JSON whatever was asked for
+        self.client.force_authenticate(CustomUser.objects.create(email='seeker@example.com', firebase_uid='seeker'))
+        response = self.client.get('/api/admin/exports/action-logs.csv', HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertIn('detail', response.json())
+
+    def test_bookings_filtered_by_provider(self):
+        providers, _categories = seed_catalog(6, provider_count=2)
+        seed_activity(list(Service.objects.all()), seeker_count=2)
+        provider = providers[0]
+        response = self.client.get(f'/api/admin/exports/bookings.ndjson?provider={provider.pk}')
+        exported = [json.loads(line)['id'] for line in b''.join(response.streaming_content).splitlines()]
+        expected = list(Booking.objects.filter(service__provider=provider).order_by('pk').values_list('id', flat=True))
+        self.assertEqual(exported, expected)
+        self.assertTrue(expected)
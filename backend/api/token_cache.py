@@ -0,0 +1,204 @@
+"""
+Cache of verified Firebase ID tokens.
+
+The frontend sends the same ID token on every request until it is refreshed
+(roughly once an hour), so re-verifying the signature each time is wasted work.
+Decoded tokens are kept in a process-local LRU and, optionally, in a shared
+Django cache so every worker benefits from a single verification.
+
+Entries are keyed by a SHA-256 hash of the raw token (the token itself is never
+stored as a key) and never outlive the token's own ``exp`` claim.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Tokens expiring within this many seconds are not served from the cache,
+# so a token never reaches a view with less validity than this left.
+EXPIRY_LEEWAY_SECONDS = 5
+
+SHARED_KEY_PREFIX = 'fbtoken'
+
+
+def hash_token(token):
+    """Return the cache key for a raw ID token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenCache:
+    """
+    Two-tier cache of decoded ID tokens.
+
+    - Local tier: an LRU dict guarded by a lock, bounded by ``max_size``.
+      Entries expire at the token's ``exp`` or after ``local_ttl`` seconds,
+      whichever comes first, so invalidations made by other processes through
+      the shared tier are picked up within ``local_ttl``.
+    - Shared tier: any Django cache alias (e.g. Redis or Memcached). Disabled
+      when ``shared_alias`` is None.
+    """
+
+    def __init__(self, max_size=2048, local_ttl=300, shared_alias=None):
+        self.max_size = max_size
+        self.local_ttl = local_ttl
+        self.shared_alias = shared_alias
+        self._entries = OrderedDict()  # key -> (expires_at, uid, decoded_token)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        if self.shared_alias is None:
+            return None
+        return caches[self.shared_alias]
+
+    def get(self, token):
+        """Return the cached decoded token, or None on a miss."""
+        key = hash_token(token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _uid, decoded_token = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return decoded_token
+                del self._entries[key]
+
+        decoded_token = self._get_shared(key, now)
+        if decoded_token is not None:
+            self._set_local(key, decoded_token, now)
+            with self._lock:
+                self.hits += 1
+            return decoded_token
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, token, decoded_token):
+        """Store a freshly verified token until shortly before it expires."""
+        expires_at = self._token_expiry(decoded_token)
+        now = time.time()
+        if expires_at is None or expires_at <= now:
+            return
+
+        key = hash_token(token)
+        self._set_local(key, decoded_token, now)
+
+        shared = self.shared
+        if shared is not None:
+            shared.set(
+                f'{SHARED_KEY_PREFIX}:{key}',
+                {'token': decoded_token, 'cached_at': now},
+                timeout=max(1, int(expires_at - now)),
+            )
+
+    def invalidate_token(self, token):
+        """Forget a single token, e.g. on logout."""
+        key = hash_token(token)
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(f'{SHARED_KEY_PREFIX}:{key}')
+
+    def invalidate_user(self, firebase_uid):
+        """
+        Forget every token issued to a user, e.g. when the account is
+        deactivated or deleted.
+        """
+        if not firebase_uid:
+            return
+        with self._lock:
+            stale = [key for key, (_exp, uid, _tok) in self._entries.items() if uid == firebase_uid]
+            for key in stale:
+                del self._entries[key]
+        shared = self.shared
+        if shared is not None:
+            # Shared entries are indexed by token hash only, so mark every
+            # entry cached before now as revoked for this user instead.
+            shared.set(
+                f'{SHARED_KEY_PREFIX}:revoked:{firebase_uid}',
+                time.time(),
+                timeout=getattr(settings, 'FIREBASE_TOKEN_MAX_LIFETIME', 3600),
+            )
+
+    def clear(self):
+        """Drop the local tier and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _token_expiry(self, decoded_token):
+        exp = decoded_token.get('exp')
+        if exp is None:
+            return None
+        return float(exp) - EXPIRY_LEEWAY_SECONDS
+
+    def _set_local(self, key, decoded_token, now):
+        expires_at = self._token_expiry(decoded_token)
+        if expires_at is None:
+            return
+        if self.local_ttl:
+            expires_at = min(expires_at, now + self.local_ttl)
+        uid = decoded_token.get('uid')
+        with self._lock:
+            self._entries[key] = (expires_at, uid, decoded_token)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key, now):
+        shared = self.shared
+        if shared is None:
+            return None
+        entry = shared.get(f'{SHARED_KEY_PREFIX}:{key}')
+        if entry is None:
+            return None
+        decoded_token = entry['token']
+        expires_at = self._token_expiry(decoded_token)
+        if expires_at is None or expires_at <= now:
+            return None
+        uid = decoded_token.get('uid')
+        if uid:
+            revoked_at = shared.get(f'{SHARED_KEY_PREFIX}:revoked:{uid}')
+            if revoked_at is not None and entry['cached_at'] <= revoked_at:
+                return None
+        return decoded_token
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Return the process-wide token cache configured from settings."""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(
+                    max_size=getattr(settings, 'FIREBASE_TOKEN_CACHE_SIZE', 2048),
+                    local_ttl=getattr(settings, 'FIREBASE_TOKEN_CACHE_LOCAL_TTL', 300),
+                    shared_alias=getattr(settings, 'FIREBASE_TOKEN_CACHE_ALIAS', None),
+                )
+    return _token_cache
+
+
+def invalidate_token(token):
+    get_token_cache().invalidate_token(token)
+
+
+def invalidate_user(firebase_uid):
+    get_token_cache().invalidate_user(firebase_uid)
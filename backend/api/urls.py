@@ -16,4 +16,5 @@ urlpatterns = [
     path('admin/analytics/', views.AdminAnalyticsView.as_view(), name='admin-analytics'),
     path('admin/reports/', views.AdminReportsView.as_view(), name='admin-reports'),
     path('admin/action-logs/', views.AdminActionLogView.as_view(), name='admin-action-logs'),
+    path('admin/exports/<slug:dataset>.<slug:file_format>', views.AdminExportView.as_view(), name='admin-export'),
 ]
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""
+Map a verified Firebase identity to a CustomUser.
+
+Resolved users are cached by Firebase UID, so an authenticated request for a
+known user costs no database queries. The cache entry is dropped whenever the
+user row is saved or deleted (see api/signals.py), and the database is only
+written to when the token's email or UID actually differs from the stored one,
+in which case only that column is updated.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from users.models import CustomUser
+
+USER_CACHE_PREFIX = 'fbuser'
+
+
+def _user_cache():
+    return caches[getattr(settings, 'FIREBASE_USER_CACHE_ALIAS', 'default')]
+
+
+def user_cache_key(firebase_uid):
+    return f'{USER_CACHE_PREFIX}:{firebase_uid}'
+
+
+def resolve_user(firebase_uid, firebase_email=None):
+    """Return the user for a Firebase identity, creating it on first login."""
+    cache = _user_cache()
+    key = user_cache_key(firebase_uid)
+
+    user = cache.get(key)
+    if user is not None and (not firebase_email or user.email == firebase_email):
+        return user
+
+    user = _resolve_from_db(firebase_uid, firebase_email)
+    cache.set(key, user, getattr(settings, 'FIREBASE_USER_CACHE_TIMEOUT', 300))
+    return user
+
+
+def invalidate_user(*firebase_uids):
+    """Drop cached users for the given UIDs."""
+    keys = [user_cache_key(uid) for uid in firebase_uids if uid]
+    if keys:
+        _user_cache().delete_many(keys)
+
+
+def _resolve_from_db(firebase_uid, firebase_email):
+    # A single query covers both lookups the login flow needs: the email match
+    # (an admin may have been created before their first Firebase login) and
+    # the UID match (the email may have changed in Firebase).
+    if firebase_email:
+        candidates = list(CustomUser.objects.filter(Q(email=firebase_email) | Q(firebase_uid=firebase_uid))[:2])
+    else:
+        candidates = list(CustomUser.objects.filter(firebase_uid=firebase_uid)[:1])
+
+    by_email = next((u for u in candidates if firebase_email and u.email == firebase_email), None)
+    if by_email is not None:
+        if by_email.firebase_uid != firebase_uid:
+            # Link (or re-link) the Firebase UID to the existing account
+            by_email.firebase_uid = firebase_uid
+            by_email.save(update_fields=['firebase_uid'])
+        return by_email
+
+    by_uid = next((u for u in candidates if u.firebase_uid == firebase_uid), None)
+    if by_uid is not None:
+        if firebase_email and by_uid.email != firebase_email:
+            # Email changed in Firebase
+            by_uid.email = firebase_email
+            by_uid.save(update_fields=['email'])
+        return by_uid
+
+    return CustomUser.objects.create(
+        email=firebase_email or f"user_{firebase_uid}@firebase.local",
+        firebase_uid=firebase_uid,
+        is_active=True,
+        role='SEEKER'  # Default role for new users
+    )
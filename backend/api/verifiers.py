@@ -0,0 +1,303 @@
+"""
+Firebase ID token verifiers used by FirebaseAuthentication.
+
+The verifier is chosen with the FIREBASE_TOKEN_VERIFIER setting (a dotted path):
+
+- ``SDKVerifier`` delegates to ``firebase_admin.auth.verify_id_token``. The SDK
+  re-downloads Google's signing certificates on the request thread whenever its
+  copy expires, which shows up as latency spikes.
+- ``LocalVerifier`` keeps the signing keys in memory, verifies RS256 signatures
+  itself and refreshes the keys on a background thread before they expire.
+  If the keys cannot be obtained it falls back to the SDK.
+- ``FakeVerifier`` accepts HS256 tokens signed with FIREBASE_FAKE_SIGNING_KEY.
+  It is used when FIREBASE_AUTH_MODE is 'fake', for tests and benchmarks.
+
+firebase_admin, PyJWT and cryptography are imported on first use only, so
+importing this module (and therefore every view) stays cheap at startup.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .firebase import get_firebase_app
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+# Used when the key server does not send a usable Cache-Control header.
+DEFAULT_KEY_MAX_AGE = 3600
+# Wait this long before retrying after a failed refresh.
+REFRESH_RETRY_SECONDS = 30
+# An unknown "kid" triggers a refresh at most this often, so tokens with
+# made-up key ids cannot make us hammer the key server.
+UNKNOWN_KID_REFRESH_INTERVAL = 60
+
+# Project id used by FakeVerifier when FIREBASE_PROJECT_ID is not set.
+FAKE_PROJECT_ID = 'juakali-local'
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class InvalidTokenError(Exception):
+    """The ID token is malformed, wrongly signed or has invalid claims."""
+
+
+class ExpiredTokenError(InvalidTokenError):
+    """The ID token was valid but its ``exp`` has passed."""
+
+
+class SDKVerifier:
+    """Verify tokens with the firebase_admin SDK."""
+
+    def verify(self, token):
+        from firebase_admin import auth
+
+        try:
+            return auth.verify_id_token(token, app=get_firebase_app())
+        except auth.ExpiredIdTokenError as e:
+            raise ExpiredTokenError(str(e)) from e
+        except auth.InvalidIdTokenError as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class SigningKeyStore:
+    """
+    In-memory copy of the public keys published at ``url``.
+
+    Keys are fetched once on first use. After that a daemon timer refreshes
+    them ``refresh_margin`` seconds before the server-advertised expiry, so
+    request threads never wait for the download.
+    """
+
+    def __init__(self, url, refresh_margin=300, timeout=5):
+        self.url = url
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._next_attempt = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self.fetch_count = 0
+
+    def get_key(self, kid):
+        """
+        Return the public key for ``kid``, or None if it is unknown or the
+        store has no valid keys (the caller should then fall back).
+        """
+        if not self._keys:
+            with self._lock:
+                if not self._keys:
+                    if time.time() < self._next_attempt:
+                        return None
+                    try:
+                        self._refresh_locked()
+                    except Exception:
+                        self._next_attempt = time.time() + REFRESH_RETRY_SECONDS
+                        raise
+        if self._expires_at <= time.time():
+            # The background refresh has been failing for a whole key lifetime.
+            return None
+        key = self._keys.get(kid)
+        if key is None and time.time() - self._fetched_at > UNKNOWN_KID_REFRESH_INTERVAL:
+            # A kid we have not seen usually means Google rotated its keys.
+            self.schedule_refresh(0)
+        return key
+
+    def refresh(self):
+        with self._lock:
+            self._refresh_locked()
+
+    def schedule_refresh(self, delay):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def stop(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f'Refreshing Firebase signing keys failed: {type(e).__name__}: {e}')
+            self.schedule_refresh(REFRESH_RETRY_SECONDS)
+
+    def _refresh_locked(self):
+        from cryptography import x509
+
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+            cache_control = response.headers.get('Cache-Control', '')
+        self.fetch_count += 1
+
+        keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode('utf-8')).public_key()
+            for kid, pem in body.items()
+        }
+        match = _MAX_AGE_RE.search(cache_control)
+        max_age = int(match.group(1)) if match else DEFAULT_KEY_MAX_AGE
+
+        self._keys = keys
+        self._fetched_at = time.time()
+        self._expires_at = self._fetched_at + max_age
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(1, max_age - self.refresh_margin), self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+class LocalVerifier:
+    """
+    Verify Firebase ID tokens locally against cached signing keys.
+
+    Applies the same checks as the SDK: RS256 signature, ``aud`` equal to the
+    project id, ``iss`` equal to the project's securetoken issuer, a non-empty
+    ``sub`` of at most 128 characters, and ``iat``/``exp``/``auth_time`` in the past
+    or future as appropriate.
+    """
+
+    def __init__(self, project_id=None, certs_url=None, fallback=None, clock_skew=None):
+        self._project_id = project_id
+        self.key_store = SigningKeyStore(
+            certs_url or getattr(settings, 'FIREBASE_CERTS_URL', GOOGLE_CERTS_URL),
+            refresh_margin=getattr(settings, 'FIREBASE_CERTS_REFRESH_MARGIN', 300),
+        )
+        self.fallback = fallback if fallback is not None else SDKVerifier()
+        self.clock_skew = clock_skew if clock_skew is not None else getattr(settings, 'FIREBASE_CLOCK_SKEW_SECONDS', 0)
+
+    @property
+    def project_id(self):
+        if self._project_id is None:
+            self._project_id = getattr(settings, 'FIREBASE_PROJECT_ID', None) or _project_id_from_service_account()
+        return self._project_id
+
+    def verify(self, token):
+        import jwt
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise InvalidTokenError(f'Malformed Firebase ID token: {e}') from e
+
+        if header.get('alg') != 'RS256':
+            raise InvalidTokenError('Firebase ID token has an unexpected "alg" header; expected RS256.')
+        kid = header.get('kid')
+        if not kid:
+            raise InvalidTokenError('Firebase ID token has no "kid" header.')
+
+        try:
+            key = self.key_store.get_key(kid)
+        except Exception as e:
+            logger.warning(f'Firebase signing keys unavailable, using SDK: {type(e).__name__}: {e}')
+            key = None
+        if key is None:
+            return self.fallback.verify(token)
+
+        return decode_claims(token, key, 'RS256', self.project_id, self.clock_skew)
+
+
+class FakeVerifier:
+    """
+    Verify HS256 tokens issued by ``api.firebase_fakes.issue_fake_token``.
+
+    Claims are checked exactly like real ID tokens, but no keys are fetched
+    and no service account is needed. Never enable this in production; the
+    api.E001 system check refuses to run with it when DEBUG is off.
+    """
+
+    def __init__(self, project_id=None, signing_key=None, clock_skew=0):
+        self.project_id = project_id or getattr(settings, 'FIREBASE_PROJECT_ID', None) or FAKE_PROJECT_ID
+        self.signing_key = signing_key or fake_signing_key()
+        self.clock_skew = clock_skew
+
+    def verify(self, token):
+        return decode_claims(token, self.signing_key, 'HS256', self.project_id, self.clock_skew)
+
+
+def fake_signing_key():
+    return getattr(settings, 'FIREBASE_FAKE_SIGNING_KEY', None) or settings.SECRET_KEY
+
+
+def decode_claims(token, key, algorithm, project_id, clock_skew=0):
+    """
+    Check ``token``'s signature and claims the way firebase_admin does and
+    return the claims with ``uid`` set to the subject.
+    """
+    import jwt
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=project_id,
+            issuer=f'https://securetoken.google.com/{project_id}',
+            leeway=clock_skew,
+            options={'require': ['exp', 'iat', 'aud', 'iss', 'sub']},
+        )
+    except jwt.ExpiredSignatureError as e:
+        raise ExpiredTokenError('The Firebase ID token is expired.') from e
+    except jwt.InvalidTokenError as e:
+        raise InvalidTokenError(f'Invalid Firebase ID token: {e}') from e
+
+    subject = claims['sub']
+    if not isinstance(subject, str) or not subject:
+        raise InvalidTokenError('Firebase ID token has an empty "sub" claim.')
+    if len(subject) > 128:
+        raise InvalidTokenError('Firebase ID token has a "sub" claim longer than 128 characters.')
+    auth_time = claims.get('auth_time')
+    if auth_time is not None and auth_time > time.time() + clock_skew:
+        raise InvalidTokenError('Firebase ID token has an "auth_time" in the future.')
+
+    claims['uid'] = subject
+    return claims
+
+
+def _project_id_from_service_account():
+    with open(settings.SERVICE_ACCOUNT_KEY_PATH) as f:
+        return json.load(f)['project_id']
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """
+    Return the process-wide verifier: FakeVerifier in 'fake' auth mode,
+    otherwise the class named by FIREBASE_TOKEN_VERIFIER.
+    """
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                if getattr(settings, 'FIREBASE_AUTH_MODE', 'firebase') == 'fake':
+                    _verifier = FakeVerifier()
+                else:
+                    path = getattr(settings, 'FIREBASE_TOKEN_VERIFIER', 'api.verifiers.LocalVerifier')
+                    _verifier = import_string(path)()
+    return _verifier
+
+
+def set_verifier(verifier):
+    """Replace the process-wide verifier (used by benchmarks and fake mode)."""
+    global _verifier
+    with _verifier_lock:
+        _verifier = verifier
@@ -5,7 +5,9 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Q, Avg
+from django.http import Http404, StreamingHttpResponse
+from django.db.models import Count, Q, Avg, FloatField
+from django.db.models.functions import Cast, NullIf
 from django.utils import timezone
 from django.middleware.csrf import get_token
 from django.views.decorators.csrf import csrf_exempt
@@ -14,11 +16,16 @@ from django.contrib.auth import logout as django_logout
 from datetime import timedelta
 from users.serializers import CustomUserSerializer
 from .permissions import IsAdminUser
+from .pagination import KeysetPagination
+from .sparse import SparseQuerysetMixin
+from . import exports
+from .row_mappers import FastListMixin
 from .authentication import FirebaseAuthentication
 from .utils import log_admin_action, get_client_ip
 from .models import AdminActionLog
 from users.models import CustomUser
 from services.models import Service, Booking, Review, Complaint
+from services import response_cache
 
 class CurrentUserView(RetrieveUpdateAPIView):
     """
@@ -113,12 +120,14 @@ class DjangoAdminLogoutView(APIView):
             'message': 'Logged out successfully'
         }, status=status.HTTP_200_OK)
 
-class AdminUserListView(ListAPIView):
+class AdminUserListView(SparseQuerysetMixin, FastListMixin, ListAPIView):
     """
     GET: Returns a list of all users. (Admin only)
+    Ordered by email, keyset-paginated with ?cursor= and ?page_size=.
     """
     queryset = CustomUser.objects.all().order_by('email')
     serializer_class = CustomUserSerializer
+    pagination_class = KeysetPagination
     permission_classes = [IsAdminUser]
     authentication_classes = [FirebaseAuthentication, SessionAuthentication]  # Explicitly include SessionAuthentication
 
@@ -150,7 +159,7 @@ class AdminUserActivateView(APIView):
         serializer = CustomUserSerializer(user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class AdminUserDetailView(RetrieveUpdateDestroyAPIView):
+class AdminUserDetailView(SparseQuerysetMixin, RetrieveUpdateDestroyAPIView):
     """
     GET: Get user details (Admin only)
     PATCH/PUT: Update user (Admin only)
@@ -293,7 +302,8 @@ class AdminAnalyticsView(APIView):
             'trends': {
                 'daily_signups': daily_signups,
                 'daily_bookings': daily_bookings,
-            }
+            },
+            'catalog_cache': response_cache.stats(),
         }, status=status.HTTP_200_OK)
 
 class AdminReportsView(APIView):
@@ -320,10 +330,10 @@ class AdminReportsView(APIView):
         
         elif report_type == 'service_performance':
             # Service performance report
+            # Review figures come from the stored aggregates (services/ratings.py)
             services_with_stats = Service.objects.annotate(
                 booking_count=Count('bookings'),
-                review_count=Count('reviews'),
-                avg_rating=Avg('reviews__rating')
+                avg_rating=Cast('rating_sum', FloatField()) / NullIf('review_count', 0)
             ).values(
                 'id', 'title', 'provider__email', 'category__name',
                 'price', 'booking_count', 'review_count', 'avg_rating'
@@ -355,7 +365,9 @@ class AdminReportsView(APIView):
 class AdminActionLogView(ListAPIView):
     """
     GET: List admin action logs (Admin only)
+    Newest first, keyset-paginated with ?cursor= and ?page_size=.
     """
+    pagination_class = KeysetPagination
     permission_classes = [IsAdminUser]
     authentication_classes = [FirebaseAuthentication, SessionAuthentication]
     
@@ -372,7 +384,7 @@ class AdminActionLogView(ListAPIView):
         if admin_id:
             queryset = queryset.filter(admin_user_id=admin_id)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
     
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -398,4 +410,31 @@ class AdminActionLogView(ListAPIView):
                     'resource_id', 'description', 'changes', 'ip_address', 'created_at'
                 ]
         
-        return AdminActionLogSerializer
\ No newline at end of file
+        return AdminActionLogSerializer
+
+
+class AdminExportView(APIView):
+    """
+    GET: Streams a whole dataset as CSV or NDJSON (Admin only).
+    /api/admin/exports/<dataset>.<csv|ndjson> where dataset is one of
+    users, services, bookings, reviews, complaints or action-logs.
+    Supports ?from= and ?to= date ranges and per-dataset filters
+    (see api/exports.py).
+    """
+    permission_classes = [IsAdminUser]
+    authentication_classes = [FirebaseAuthentication, SessionAuthentication]
+
+    def perform_content_negotiation(self, request, force=False):
+        # The URL names the file format, so an Accept header asking for it
+        # (text/csv, application/x-ndjson) must not end in a 406; errors
+        # still come back from the first renderer, as JSON.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, dataset, file_format):
+        if dataset not in exports.DATASETS or file_format not in exports.FORMATS:
+            raise Http404
+        content = exports.export_rows(exports.DATASETS[dataset], file_format, request.query_params)
+        response = StreamingHttpResponse(content, content_type=exports.FORMATS[file_format])
+        filename = f'juakali-{dataset}-{timezone.now():%Y-%m-%d}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
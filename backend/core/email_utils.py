@@ -1,11 +1,39 @@
 """
 Email utility functions for sending notifications.
+
+Notifications are sent one SMTP connection per email, unless they are sent
+inside ``with email_batch():``, which collects them and sends them all over
+one connection when the block ends.
 """
-from django.core.mail import send_mail
+import threading
+from contextlib import contextmanager
+
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+_batch = threading.local()
+
+
+@contextmanager
+def email_batch():
+    """Send the notifications of the block together, over one connection, once it ends."""
+    if getattr(_batch, 'messages', None) is not None:  # already batching
+        yield
+        return
+    _batch.messages = messages = []
+    try:
+        yield
+    finally:
+        _batch.messages = None
+    if messages:
+        try:
+            get_connection(fail_silently=False).send_messages(messages)
+        except Exception as e:
+            # Log error but don't fail the request
+            print(f"Error sending {len(messages)} batched emails: {str(e)}")
+
 
 def send_email_notification(user, subject, template_name, context):
     """
@@ -33,6 +61,13 @@ def send_email_notification(user, subject, template_name, context):
         html_message = render_to_string(f'emails/{template_name}.html', context)
         plain_message = strip_tags(html_message)
         
+        batch = getattr(_batch, 'messages', None)
+        if batch is not None:
+            message = EmailMultiAlternatives(subject, plain_message, settings.DEFAULT_FROM_EMAIL, [user.email])
+            message.attach_alternative(html_message, 'text/html')
+            batch.append(message)
+            return True
+
         # Send email
         send_mail(
             subject=subject,
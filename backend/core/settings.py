@@ -12,8 +12,6 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os 
-import firebase_admin
-from firebase_admin import credentials
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.query_budget.QueryBudgetMiddleware',
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -140,20 +139,145 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 #The path to the service account key file
+# Firebase is initialized lazily on the first token verification (see api/firebase.py),
+# so commands that never verify a token do not need this file.
 SERVICE_ACCOUNT_KEY_PATH = os.path.join(BASE_DIR, 'core', 'firebase-service-account.json')
 
-# Check if the file exists before initializing
-if not os.path.exists(SERVICE_ACCOUNT_KEY_PATH):
-    raise FileNotFoundError(
-        f"Firebase service account key not found at {SERVICE_ACCOUNT_KEY_PATH}. "
-        "Please download it from the Firebase console and place it there."
-    )
-
-# Initialize Firebase
-cred = credentials.Certificate(SERVICE_ACCOUNT_KEY_PATH)
-firebase_admin.initialize_app(cred)
-
-print("✅ Firebase Admin SDK Initialized.")
+# How bearer tokens are authenticated:
+# - 'firebase': verify real Firebase ID tokens (default)
+# - 'fake': accept tokens from api.firebase_fakes.issue_fake_token / `manage.py fake_id_token`
+#   (no network or service account needed; for local development, tests and benchmarks)
+# - 'disabled': ignore bearer tokens entirely; only session authentication works
+# 'fake' and 'disabled' are refused by a system check when DEBUG is off.
+FIREBASE_AUTH_MODE = os.environ.get('FIREBASE_AUTH_MODE', 'firebase')
+FIREBASE_FAKE_SIGNING_KEY = os.environ.get('FIREBASE_FAKE_SIGNING_KEY')  # Defaults to SECRET_KEY
+
+# Verified ID token cache (see api/token_cache.py)
+# Tokens are cached per process; set FIREBASE_TOKEN_CACHE_ALIAS to a CACHES alias
+# (e.g. a Redis cache) to share verified tokens between workers as well.
+FIREBASE_TOKEN_CACHE_SIZE = int(os.environ.get('FIREBASE_TOKEN_CACHE_SIZE', 2048))
+FIREBASE_TOKEN_CACHE_LOCAL_TTL = int(os.environ.get('FIREBASE_TOKEN_CACHE_LOCAL_TTL', 300))
+FIREBASE_TOKEN_CACHE_ALIAS = os.environ.get('FIREBASE_TOKEN_CACHE_ALIAS') or None
+FIREBASE_TOKEN_MAX_LIFETIME = 3600  # Firebase ID tokens are valid for one hour
+
+# ID token verification (see api/verifiers.py)
+# LocalVerifier checks RS256 signatures against signing keys held in memory and
+# refreshed in the background; it falls back to the SDK if the keys are unavailable.
+# Use 'api.verifiers.SDKVerifier' to always go through firebase_admin instead.
+FIREBASE_TOKEN_VERIFIER = os.environ.get('FIREBASE_TOKEN_VERIFIER', 'api.verifiers.LocalVerifier')
+FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID')  # Defaults to the service account's project
+FIREBASE_CERTS_URL = os.environ.get(
+    'FIREBASE_CERTS_URL',
+    'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com',
+)
+FIREBASE_CERTS_REFRESH_MARGIN = 300  # Refresh signing keys this many seconds before they expire
+FIREBASE_CLOCK_SKEW_SECONDS = 0
+
+# Firebase UID -> user cache (see api/user_resolver.py)
+# Entries are dropped when the user is saved or deleted, but only in the cache
+# the save went through: with the default process-local cache another worker
+# keeps serving the old user (e.g. its old role) for up to the timeout. With
+# more than one worker (WEB_CONCURRENCY), point this at a shared cache such as
+# Redis; the api.E004 system check refuses a process-local one.
+FIREBASE_USER_CACHE_ALIAS = os.environ.get('FIREBASE_USER_CACHE_ALIAS', 'default')
+FIREBASE_USER_CACHE_TIMEOUT = int(os.environ.get('FIREBASE_USER_CACHE_TIMEOUT', 30))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # Worker processes serving requests
+
+# Public catalog response cache (see services/response_cache.py)
+# Rendered GET responses of /api/categories/, /api/services/ and /api/services/<pk>/
+# are cached until a write bumps the catalog version. Use a cache shared by all
+# workers (e.g. Redis) in production so invalidations and statistics are global.
+CATALOG_CACHE_ALIAS = os.environ.get('CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+# /api/services/facets/ responses go through the same cache unless this is False
+CATALOG_CACHE_FACETS = os.environ.get('CATALOG_CACHE_FACETS', 'True').lower() == 'true'
+
+# Bulk service import (see services/bulk.py)
+# On SQLite a 500-item import is written with 8 INSERT batches, which stays
+# within the query budget and repeat threshold below; raise both together.
+SERVICE_BULK_MAX_ITEMS = int(os.environ.get('SERVICE_BULK_MAX_ITEMS', 500))
+
+# Radius search on the service list (see services/geo.py)
+# ?near=<lat>,<lng> searches SERVICE_SEARCH_DEFAULT_RADIUS_KM around the point
+# unless ?radius_km= is given, up to SERVICE_SEARCH_MAX_RADIUS_KM.
+SERVICE_SEARCH_DEFAULT_RADIUS_KM = float(os.environ.get('SERVICE_SEARCH_DEFAULT_RADIUS_KM', 10))
+SERVICE_SEARCH_MAX_RADIUS_KM = float(os.environ.get('SERVICE_SEARCH_MAX_RADIUS_KM', 500))
+
+# Fast list serialization (see api/row_mappers.py)
+# List endpoints serialize .values() rows with compiled row mappers instead of
+# running the serializer per model instance; the output is the same
+# (RowMapperConformanceTests in api/tests.py). Set to False to always use the serializers.
+FAST_LIST_SERIALIZATION = os.environ.get('FAST_LIST_SERIALIZATION', 'True').lower() == 'true'
+
+# Typeahead suggestions (see services/typeahead.py)
+# Each process indexes service titles and category names in memory, updated
+# from signals; renames made by other processes are picked up by rebuilding
+# the index in the background, checked at most every TYPEAHEAD_MAX_STALENESS seconds.
+TYPEAHEAD_MAX_STALENESS = int(os.environ.get('TYPEAHEAD_MAX_STALENESS', 60))
+
+# Similar services (see services/similarity.py)
+# Number of similar services stored per service. They are recomputed by
+# manage.py build_similar_services (incremental; --full rebuilds them all),
+# to be run periodically, e.g. from cron.
+SIMILAR_SERVICES_COUNT = int(os.environ.get('SIMILAR_SERVICES_COUNT', 10))
+
+# "Top rated" ranking score (see services/ranking.py)
+# Every service counts RANKING_PRIOR_REVIEWS imaginary reviews of
+# RANKING_PRIOR_RATING stars on top of its own, plus RANKING_BOOKING_WEIGHT
+# times ln(1 + bookings completed in the last RANKING_RECENT_DAYS days).
+# After changing these, run `python manage.py recompute_ratings`.
+RANKING_PRIOR_RATING = float(os.environ.get('RANKING_PRIOR_RATING', 3.0))
+RANKING_PRIOR_REVIEWS = float(os.environ.get('RANKING_PRIOR_REVIEWS', 5))
+RANKING_BOOKING_WEIGHT = float(os.environ.get('RANKING_BOOKING_WEIGHT', 0.1))
+RANKING_RECENT_DAYS = int(os.environ.get('RANKING_RECENT_DAYS', 90))
+
+# Provider availability and free slots (see services/availability.py)
+# Availability windows are wall-clock times in BOOKING_TIME_ZONE; providers
+# without windows take bookings at any time. Free slots start every
+# BOOKING_SLOT_STEP_MINUTES from the start of a window and are listed for at
+# most BOOKING_SLOTS_MAX_DAYS days per request.
+BOOKING_TIME_ZONE = os.environ.get('BOOKING_TIME_ZONE', 'Africa/Nairobi')
+BOOKING_SLOT_STEP_MINUTES = int(os.environ.get('BOOKING_SLOT_STEP_MINUTES', 30))
+BOOKING_SLOTS_MAX_DAYS = int(os.environ.get('BOOKING_SLOTS_MAX_DAYS', 31))
+# Longest range of days the provider booking calendar returns at once
+BOOKING_CALENDAR_MAX_DAYS = int(os.environ.get('BOOKING_CALENDAR_MAX_DAYS', 42))
+# Most bookings POST /api/bookings/bulk-status/ changes at once
+BOOKING_BULK_MAX_IDS = int(os.environ.get('BOOKING_BULK_MAX_IDS', 200))
+
+# Per-request query budgets (see api/query_budget.py)
+# Maximum number of queries per URL name; views not listed use QUERY_BUDGET_DEFAULT
+# (None = no limit). Any single statement run more than QUERY_BUDGET_REPEAT_THRESHOLD
+# times in one request is reported as a likely N+1 pattern regardless of budget.
+# QUERY_BUDGET_ACTION is 'log' (warning on the api.query_budget logger) or 'raise'.
+# A budget covers every method of the view; `manage.py check_query_budgets`
+# replays the reads and the writes of each budgeted view against seeded data.
+QUERY_BUDGETS = {
+    'category-list-create': 3,
+    'service-list-create': 6,
+    'service-search': 6,
+    'service-facets': 3,
+    'service-autocomplete': 2,
+    'service-detail': 5,
+    'service-similar': 3,
+    'service-slots': 3,
+    'availability-list-create': 3,
+    'service-bulk-import': 16,
+    'provider-service-list': 6,
+    'booking-list-create': 6,
+    'booking-detail': 6,
+    'booking-calendar': 2,
+    'booking-bulk-status': 9,
+    'review-list-create': 6,
+    'review-detail': 6,
+    'provider-review-list': 4,
+    'complaint-list-create': 6,
+    'complaint-detail': 6,
+    'current-user': 4,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_REPEAT_THRESHOLD = int(os.environ.get('QUERY_BUDGET_REPEAT_THRESHOLD', 10))
+QUERY_BUDGET_SAMPLE_RATE = float(os.environ.get('QUERY_BUDGET_SAMPLE_RATE', 1.0 if DEBUG else 0.0))
+QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'log')
 
 AUTH_USER_MODEL = 'users.CustomUser'
 
@@ -0,0 +1,162 @@
+"""
+Provider availability, booking overlap checks and free slots
+(``GET /api/services/<pk>/slots/``).
+
+A booking holds its provider's time from ``booking_date`` to ``end_date``
+(``booking_date`` plus the service's ``duration_minutes``), whichever of
+the provider's services it is for. While it is PENDING or CONFIRMED no
+other booking of the provider may overlap it, and it has to fit in one of
+the provider's weekly AvailabilityWindows. Providers who have not set any
+windows take bookings at any time, as they did before windows existed; their
+free slots run around the clock.
+
+Two bookings overlap when each starts before the other ends. "Ends after
+``start``" cannot be answered from an index on its own, but no booking
+lasts longer than MAX_BOOKING_MINUTES, so only bookings starting between
+``start - MAX_BOOKING_MINUTES`` and ``end`` can overlap ``[start, end)``:
+one range scan of the ``(provider, booking_date, end_date, status)``
+index, however many bookings the provider has. Free slots
+are computed from one such scan over the requested days, swept together
+with the availability windows in a single pass.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from rest_framework import serializers
+
+from .models import MAX_BOOKING_MINUTES, AvailabilityWindow, Booking
+
+MAX_BOOKING_DURATION = timedelta(minutes=MAX_BOOKING_MINUTES)
+
+
+def booking_time_zone():
+    return ZoneInfo(settings.BOOKING_TIME_ZONE)
+
+
+def active_bookings(provider_id, start, end, exclude=None):
+    """The provider's PENDING and CONFIRMED bookings overlapping ``[start, end)``."""
+    bookings = Booking.objects.filter(
+        provider_id=provider_id,
+        status__in=Booking.ACTIVE_STATUSES,
+        booking_date__gt=start - MAX_BOOKING_DURATION,
+        booking_date__lt=end,
+        end_date__gt=start,
+    )
+    if exclude is not None:
+        bookings = bookings.exclude(pk=exclude)
+    return bookings
+
+
+def weekly_windows(provider_id):
+    """``{weekday: [(start_time, end_time), ...]}`` for the provider, sorted by start; empty if they set none."""
+    windows = {}
+    rows = AvailabilityWindow.objects.filter(provider_id=provider_id).order_by('weekday', 'start_time')
+    for weekday, start, end in rows.values_list('weekday', 'start_time', 'end_time'):
+        windows.setdefault(weekday, []).append((start, end))
+    return windows
+
+
+def windows_between(windows, first_day, last_day):
+    """The weekly ``windows`` as aware ``(start, end)`` datetimes on each day from first_day to last_day."""
+    zone = booking_time_zone()
+    day = first_day
+    while day <= last_day:
+        for start, end in windows.get(day.weekday(), ()):
+            yield datetime.combine(day, start, tzinfo=zone), datetime.combine(day, end, tzinfo=zone)
+        day += timedelta(days=1)
+
+
+def available_periods(provider_id, first_day, last_day):
+    """
+    The provider's windows on the days from first_day to last_day as aware
+    ``(start, end)`` datetimes, or all of those days as one period for
+    providers without windows.
+    """
+    windows = weekly_windows(provider_id)
+    if windows:
+        return list(windows_between(windows, first_day, last_day))
+    zone = booking_time_zone()
+    return [(datetime.combine(first_day, time.min, tzinfo=zone),
+             datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=zone))]
+
+
+def lock_provider(provider_id):
+    """
+    Lock the provider's row until the end of the transaction, so concurrent
+    bookings of the provider are checked and written one at a time.
+    """
+    list(get_user_model().objects.select_for_update().filter(pk=provider_id).values_list('pk', flat=True))
+
+
+def check_booking(provider_id, start, end, exclude=None):
+    """
+    Raise a ValidationError unless ``[start, end)`` is free time of the
+    provider. The windows and the overlapping bookings are looked up in one
+    query.
+    """
+    zone = booking_time_zone()
+    local_start, local_end = start.astimezone(zone), end.astimezone(zone)
+    windows = AvailabilityWindow.objects.filter(provider_id=OuterRef('pk'))
+    fitting = windows.filter(
+        weekday=local_start.weekday(), start_time__lte=local_start.time(), end_time__gte=local_end.time(),
+    )
+    has_windows, fits, busy = get_user_model().objects.filter(pk=provider_id).values_list(
+        Exists(windows), Exists(fitting), Exists(active_bookings(provider_id, start, end, exclude)),
+    ).get()
+    # Windows end within their day, so a booking fits one only if it ends that day too
+    if has_windows and not (fits and local_end.date() == local_start.date()):
+        raise serializers.ValidationError({'booking_date': 'The provider is not available at this time.'})
+    if busy:
+        raise serializers.ValidationError({'booking_date': 'The provider already has a booking at this time.'})
+
+
+def _busy_intervals(provider_id, start, end):
+    """Active bookings overlapping ``[start, end)`` as sorted, merged ``[start, end)`` intervals."""
+    busy = []
+    rows = active_bookings(provider_id, start, end).order_by('booking_date').values_list('booking_date', 'end_date')
+    for booking_start, booking_end in rows:
+        if busy and booking_start <= busy[-1][1]:
+            busy[-1][1] = max(busy[-1][1], booking_end)
+        else:
+            busy.append([booking_start, booking_end])
+    return busy
+
+
+def _next_step(window_start, moment, step):
+    """The first slot start of the window at or after ``moment``."""
+    if moment <= window_start:
+        return window_start
+    return window_start - ((window_start - moment) // step) * step
+
+
+def free_slots(service, first_day, last_day, now=None):
+    """
+    ``(start, end)`` of every free slot for ``service`` on the days from
+    first_day to last_day (dates in BOOKING_TIME_ZONE), in order. Slots
+    start every BOOKING_SLOT_STEP_MINUTES from the start of a window and
+    are never in the past.
+    """
+    now = now or datetime.now(tz=booking_time_zone())
+    duration = timedelta(minutes=service.duration_minutes)
+    step = timedelta(minutes=settings.BOOKING_SLOT_STEP_MINUTES)
+    windows = available_periods(service.provider_id, first_day, last_day)
+    if not windows:
+        return []
+    busy = _busy_intervals(service.provider_id, windows[0][0], max(end for _start, end in windows))
+
+    slots = []
+    index = 0  # first busy interval that may still matter; times only move forward
+    for window_start, window_end in windows:
+        slot = _next_step(window_start, now, step)
+        while slot + duration <= window_end:
+            while index < len(busy) and busy[index][1] <= slot:
+                index += 1
+            if index < len(busy) and busy[index][0] < slot + duration:
+                slot = _next_step(window_start, busy[index][1], step)
+                continue
+            slots.append((slot, slot + duration))
+            slot += step
+    return slots
@@ -0,0 +1,126 @@
+"""
+Synthetic catalog data for the services ``bench_*`` management commands.
+"""
+import datetime
+import random
+from decimal import Decimal
+
+from django.utils import timezone
+
+from users.models import CustomUser
+from . import geo
+from .models import Booking, Category, Complaint, Review, Service
+
+TRADES = [
+    'plumbing', 'welding', 'carpentry', 'masonry', 'electrical', 'painting', 'roofing',
+    'tailoring', 'mechanic', 'tiling', 'gardening', 'cleaning', 'metalwork', 'upholstery',
+]
+WORDS = [
+    'repair', 'install', 'custom', 'fast', 'affordable', 'quality', 'pipe', 'gate', 'door',
+    'window', 'roof', 'tank', 'wiring', 'solar', 'furniture', 'cabinet', 'fence', 'grill',
+    'kitchen', 'bathroom', 'leak', 'motor', 'engine', 'brake', 'paint', 'tile', 'floor',
+    'sofa', 'curtain', 'suit', 'dress', 'shoe', 'garden', 'lawn', 'borehole', 'jiko',
+    'mabati', 'steel', 'timber', 'cement', 'emergency', 'weekend', 'nairobi', 'mombasa',
+    'kisumu', 'nakuru', 'eldoret', 'thika', 'experienced', 'certified', 'guaranteed',
+]
+SYLLABLES = ['ka', 'ma', 'ri', 'to', 'ne', 'su', 'wa', 'li', 'po', 'ze', 'chi', 'ndo', 'mbu', 'ta', 'ge']
+
+
+def vocabulary(rng, size=4000):
+    """
+    The fixed trade words followed by ``size`` made-up words. Callers draw
+    from it with Zipf-like weights, so a few words are very common and most
+    are rare, as in real listings.
+    """
+    made_up = {''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(size * 2)}
+    words = WORDS + sorted(made_up - set(WORDS))[:size]
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+
+def seed_catalog(service_count, provider_count=200, seed=42, batch_size=5000):
+    """
+    Bulk-insert providers, one category per trade and ``service_count``
+    services with random titles, descriptions, prices and locations in Kenya.
+    Signals are not sent (bulk_create), so callers rebuild any derived indexes
+    themselves.
+    """
+    rng = random.Random(seed)
+    # Separate stream, so adding locations left the rest of the catalog unchanged
+    locations = random_locations(random.Random(seed + 1))
+    providers = CustomUser.objects.bulk_create([
+        CustomUser(email=f'provider{i}@bench.local', role='PROVIDER', firebase_uid=f'bench-provider-{i}')
+        for i in range(provider_count)
+    ])
+    categories = Category.objects.bulk_create([Category(name=trade.title(), slug=trade) for trade in TRADES])
+    words, weights = vocabulary(rng)
+
+    batch = []
+    for i in range(service_count):
+        category = rng.choice(categories)
+        title_words = rng.choices(words, weights, k=3)
+        latitude, longitude = next(locations)
+        batch.append(Service(
+            provider=rng.choice(providers),
+            category=category,
+            title=f'{category.name} {" ".join(title_words)}',
+            description=' '.join(rng.choices(words, weights, k=rng.randint(12, 40))),
+            price=Decimal(rng.randint(200, 50000)),
+            latitude=latitude,
+            longitude=longitude,
+            geohash=geo.encode(latitude, longitude),
+        ))
+        if len(batch) >= batch_size:
+            Service.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Service.objects.bulk_create(batch)
+    return providers, categories
+
+
+# (south, west, north, east) of Kenya
+KENYA_BOX = (-4.7, 33.9, 4.6, 41.9)
+
+
+def random_locations(rng, box=KENYA_BOX):
+    """Endless (latitude, longitude) pairs spread uniformly over ``box``."""
+    south, west, north, east = box
+    while True:
+        yield round(rng.uniform(south, north), 6), round(rng.uniform(west, east), 6)
+
+
+def seed_activity(services, seeker_count=10, seed=42):
+    """
+    Create seekers who book, review and complain about every service in
+    ``services``. Reviews are created one by one so the rating aggregates on
+    Service stay correct. Returns the seekers.
+    """
+    rng = random.Random(seed)
+    seekers = CustomUser.objects.bulk_create([
+        CustomUser(email=f'seeker{i}@bench.local', role='SEEKER', firebase_uid=f'bench-seeker-{i}')
+        for i in range(seeker_count)
+    ])
+    start = timezone.now() + datetime.timedelta(days=1)
+    bookings = []
+    for service in services:
+        for seeker in seekers:
+            booking_date = start + datetime.timedelta(hours=rng.randint(0, 24 * 60))
+            # bulk_create() skips Booking.save(), which fills these in
+            bookings.append(Booking(
+                service=service, seeker=seeker, provider_id=service.provider_id,
+                status=rng.choice(Booking.BookingStatus.values),
+                booking_date=booking_date, duration_minutes=service.duration_minutes,
+                end_date=booking_date + datetime.timedelta(minutes=service.duration_minutes),
+            ))
+    Booking.objects.bulk_create(bookings)
+    for service in services:
+        for seeker in seekers:
+            Review.objects.create(service=service, seeker=seeker, rating=rng.randint(1, 5), comment='Bench review')
+    Complaint.objects.bulk_create([
+        Complaint(
+            user=seeker, service=service,
+            complaint_type=Complaint.ComplaintType.SERVICE_ISSUE, description='Bench complaint',
+        )
+        for service in services for seeker in seekers[:2]
+    ])
+    return seekers
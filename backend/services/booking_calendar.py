@@ -0,0 +1,68 @@
+"""
+The provider booking calendar (``GET /api/bookings/calendar/``).
+
+A provider's bookings are read with one range scan of the
+``(provider, booking_date, ...)`` index over the requested days, already in
+date order, and grouped by day in BOOKING_TIME_ZONE. Filtering on the
+denormalized ``Booking.provider`` instead of ``service__provider`` keeps the
+services table out of the scan, so the cost grows with the bookings in the
+window rather than with every booking the provider has ever had. With
+``service`` the ``(service, booking_date)`` index is scanned instead.
+
+Canceled bookings no longer hold a slot, so they are left out of the day
+lists; they still appear in the per-status counts.
+"""
+from datetime import datetime, time, timedelta
+
+from .availability import booking_time_zone
+from .models import Booking
+
+COLUMNS = (
+    'id', 'service_id', 'service__title', 'seeker__first_name', 'seeker__last_name', 'seeker__email',
+    'status', 'booking_date', 'end_date',
+)
+
+
+def calendar_bookings(provider_id, first_day, last_day, service_id=None):
+    """The provider's bookings starting on the days from first_day to last_day, in date order."""
+    zone = booking_time_zone()
+    start = datetime.combine(first_day, time.min, tzinfo=zone)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=zone)
+    bookings = Booking.objects.filter(provider_id=provider_id, booking_date__gte=start, booking_date__lt=end)
+    if service_id is not None:
+        bookings = bookings.filter(service_id=service_id)
+    return bookings.order_by('booking_date')
+
+
+def provider_calendar(provider_id, first_day, last_day, service_id=None):
+    """
+    The provider's bookings starting on the days from first_day to last_day,
+    as ``{'counts': {status: n}, 'days': [{'date', 'counts', 'bookings'}, ...]}``
+    with an entry for every day, empty or not. Canceled bookings are only
+    counted.
+    """
+    zone = booking_time_zone()
+    days = {}
+    day = first_day
+    while day <= last_day:
+        days[day] = {'date': day.isoformat(), 'counts': dict.fromkeys(Booking.BookingStatus.values, 0), 'bookings': []}
+        day += timedelta(days=1)
+    counts = dict.fromkeys(Booking.BookingStatus.values, 0)
+
+    rows = calendar_bookings(provider_id, first_day, last_day, service_id).values_list(*COLUMNS)
+    for pk, service, title, first_name, last_name, email, status, booking_start, booking_end in rows:
+        entry = days[booking_start.astimezone(zone).date()]
+        entry['counts'][status] += 1
+        counts[status] += 1
+        if status == Booking.BookingStatus.CANCELED:
+            continue
+        entry['bookings'].append({
+            'id': pk,
+            'service': service,
+            'service_title': title,
+            'seeker_name': f'{first_name} {last_name}'.strip() or email,
+            'status': status,
+            'booking_date': booking_start.astimezone(zone).isoformat(),
+            'end_date': booking_end.astimezone(zone).isoformat(),
+        })
+    return {'counts': counts, 'days': list(days.values())}
@@ -0,0 +1,141 @@
+"""
+Bulk service import for providers (``POST /api/services/bulk/``).
+
+An import validates every item first, with one query for the categories
+and one for the provider's existing services that the items refer to, and
+then writes all valid items in one transaction: new services with
+``bulk_create`` and changed ones with ``bulk_update``. ``bulk_create`` and
+``bulk_update`` send no model signals, so the search index, the typeahead
+index, the similar services queue and the catalog response cache are
+updated here instead, once per import.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from . import response_cache
+from .models import Category, Service, SimilarServiceUpdate
+from .search import get_search_backend
+from .serializers import ServiceImportSerializer
+from .typeahead import typeahead
+
+UPDATABLE_FIELDS = ('title', 'description', 'price', 'category', 'duration_minutes', 'latitude', 'longitude', 'geohash')
+BATCH_SIZE = 500
+
+
+class ImportResult:
+    def __init__(self, items):
+        self.results = [None] * len(items)
+        self.created = []
+        self.updated = []
+        self.failed = 0
+
+    def invalid(self, index, errors):
+        self.results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+        self.failed += 1
+
+    def as_dict(self):
+        return {
+            'created': len(self.created),
+            'updated': len(self.updated),
+            'failed': self.failed,
+            'results': self.results,
+        }
+
+
+def _lookups(provider, items):
+    """Categories and the provider's services referred to by the items, one query each."""
+    category_ids, service_ids = set(), set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        for key, ids in (('category', category_ids), ('id', service_ids)):
+            try:
+                ids.add(int(item[key]))  # as IntegerField will read it
+            except (KeyError, TypeError, ValueError):
+                pass
+    categories = Category.objects.in_bulk(category_ids) if category_ids else {}
+    services = provider.services.in_bulk(service_ids) if service_ids else {}
+    return categories, services
+
+
+def import_services(provider, items, all_or_nothing=False):
+    """
+    Validate and write ``items`` (a list of dicts) for ``provider``.
+
+    Invalid items are reported and skipped; with ``all_or_nothing`` a single
+    invalid item means nothing is written.
+    """
+    categories, services = _lookups(provider, items)
+    context = {'categories': categories, 'services': services}
+    # One serializer per kind of item, reused the way ListSerializer reuses its
+    # child, so the fields are built twice per import rather than per item.
+    validators = {
+        False: ServiceImportSerializer(context=context),
+        True: ServiceImportSerializer(context=context, partial=True),
+    }
+    result = ImportResult(items)
+    seen_ids = set()
+    changed_fields = set()
+    now = timezone.now()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            result.invalid(index, {'non_field_errors': ['Expected an object.']})
+            continue
+        updating = 'id' in item
+        try:
+            data = validators[updating].run_validation(item)
+        except ValidationError as exc:
+            result.invalid(index, as_serializer_error(exc))
+            continue
+        if updating:
+            if data['id'] in seen_ids:
+                result.invalid(index, {'id': ['This service appears more than once in the import.']})
+                continue
+            seen_ids.add(data['id'])
+            service = services[data['id']]
+            for field in UPDATABLE_FIELDS:
+                if field in data:
+                    setattr(service, field, data[field])
+                    changed_fields.add(field)
+            if 'latitude' in data or 'longitude' in data:
+                # save() is bypassed, so the geohash is kept in step here
+                service.geohash = service.compute_geohash()
+                changed_fields.add('geohash')
+            service.updated_at = now
+            result.updated.append((index, service))
+        else:
+            service = Service(provider=provider, **data)
+            service.geohash = service.compute_geohash()
+            result.created.append((index, service))
+
+    if all_or_nothing and result.failed:
+        for index, _service in result.created + result.updated:
+            result.results[index] = {'index': index, 'status': 'skipped'}
+        result.created, result.updated = [], []
+        return result
+
+    new = [service for _index, service in result.created]
+    changed = [service for _index, service in result.updated]
+    with transaction.atomic():
+        Service.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        if changed:
+            # Only the columns some item changed: each one is a CASE over the whole batch
+            fields = [field for field in UPDATABLE_FIELDS if field in changed_fields]
+            Service.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+            # auto_now is not applied by bulk_update(), and needs no CASE
+            Service.objects.filter(pk__in=[service.pk for service in changed]).update(updated_at=now)
+        written = [service.pk for service in new + changed]
+        if written:
+            get_search_backend().index_services(written)
+            SimilarServiceUpdate.queue(written)
+            renamed = bool(new) or 'title' in changed_fields
+            transaction.on_commit(lambda: typeahead.update_services(new + changed, titles_changed=renamed))
+            response_cache.invalidate()
+
+    for status, entries in (('created', result.created), ('updated', result.updated)):
+        for index, service in entries:
+            result.results[index] = {'index': index, 'status': status, 'id': service.pk}
+    return result
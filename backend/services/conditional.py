@@ -0,0 +1,122 @@
+"""
+Conditional GET (ETag / Last-Modified) for the service, booking and review views.
+
+Validators are computed without serializing anything:
+
+- detail views: the object's ``updated_at`` and primary key;
+- list views: ``MAX(updated_at)`` and ``COUNT(*)`` of the filtered queryset
+  in one aggregate query (the count catches deletions, which do not move the
+  maximum).
+
+Views whose rows embed other models (a booking's seeker_details and
+service_details, say) name those relations in ``conditional_related``; the
+related rows' ``updated_at`` then count as well, through the same
+``select_related`` row for details and the same aggregate query for lists.
+
+Both also include the catalog version from services/response_cache.py, which
+changes whenever a service, category, review or provider changes, because
+those are embedded in the responses without touching the row's own
+``updated_at``: the ETag covers the version itself and Last-Modified is the
+later of ``updated_at`` and the time the version last changed. The ETag
+additionally covers the query string, the renderer format and, unless
+``etag_per_user`` is off (public views), the requesting user, since each of
+them changes the body.
+
+A matching If-None-Match (or, without it, If-Modified-Since) returns
+``304 Not Modified`` before the view fetches or serializes any rows.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import response_cache
+
+
+def make_etag(request, *parts, per_user=True):
+    renderer = getattr(request, 'accepted_renderer', None)
+    user = getattr(request, 'user', None) if per_user else None
+    raw = '|'.join(str(part) for part in (
+        getattr(renderer, 'format', ''),
+        getattr(user, 'pk', None),
+        request.get_full_path(),
+        response_cache.current_version(),
+        *parts,
+    ))
+    return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def last_modified_timestamp(updated_at):
+    """
+    The later of ``updated_at`` and the last catalog change, in whole
+    seconds as in HTTP dates, or None without ``updated_at``.
+    """
+    if updated_at is None:
+        return None
+    return int(max(updated_at.timestamp(), response_cache.changed_at()))
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def latest(timestamps):
+    """The latest of ``timestamps``, ignoring None; None if there is none."""
+    return max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+
+
+class ConditionalDetailMixin:
+    """For RetrieveAPIView subclasses whose model has ``updated_at``."""
+    etag_per_user = True
+    # Embedded relations whose ``updated_at`` also moves the validators;
+    # select_related them in get_queryset.
+    conditional_related = ()
+
+    def get_object(self):
+        # Fetched once per request: the validators and the response share it.
+        if not hasattr(self, '_conditional_object'):
+            self._conditional_object = super().get_object()
+        return self._conditional_object
+
+    def get(self, request, *args, **kwargs):
+        obj = self.get_object()
+        related = [getattr(obj, name) for name in self.conditional_related]
+        stamps = [obj.updated_at, *(other.updated_at if other is not None else None for other in related)]
+        etag = make_etag(
+            request, obj.pk, *(stamp.isoformat() if stamp else '' for stamp in stamps),
+            per_user=self.etag_per_user,
+        )
+        last_modified = last_modified_timestamp(latest(stamps))
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
+
+
+class ConditionalListMixin:
+    """For ListAPIView subclasses whose model has ``updated_at``."""
+    etag_per_user = True
+    # Embedded relations whose ``updated_at`` also moves the validators
+    conditional_related = ()
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        fields = ['updated_at', *(f'{name}__updated_at' for name in self.conditional_related)]
+        summary = queryset.aggregate(
+            count=Count('pk'), **{f'last_modified_{index}': Max(field) for index, field in enumerate(fields)},
+        )
+        stamps = [summary[f'last_modified_{index}'] for index in range(len(fields))]
+        etag = make_etag(
+            request, summary['count'], *(stamp.isoformat() if stamp else '' for stamp in stamps),
+            per_user=self.etag_per_user,
+        )
+        last_modified = last_modified_timestamp(latest(stamps))
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
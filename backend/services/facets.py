@@ -0,0 +1,87 @@
+"""
+Facet counts for the catalog filters (``GET /api/services/facets/``).
+
+For the same search and filter parameters as the service list, counts the
+matching services per category, per price bucket and per rating band. Each
+facet ignores its own filter, so the counts say how many services the list
+would show if that choice were changed (picking another category, say)
+while the other filters stay as they are.
+
+Every facet is one grouped or conditional aggregate query, three queries in
+all, however large the catalog is.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q
+
+from .filters import annotate_rating, apply_filters, decimal_param
+
+# Upper edges of the price buckets (KES); the last bucket has no upper edge
+PRICE_EDGES = (Decimal(500), Decimal(1000), Decimal(2500), Decimal(5000), Decimal(10000), Decimal(25000))
+# min_rating values offered by the filter ("4 stars & up", ...)
+RATING_BANDS = (4, 3, 2, 1)
+# Prices have two decimal places: a bucket [low, high) is low..high-0.01 for
+# the inclusive min_price/max_price filters.
+_CENT = Decimal('0.01')
+
+
+def price_buckets():
+    """(min_price, max_price) pairs, inclusive; max_price is None for the last one."""
+    lows = (Decimal(0),) + PRICE_EDGES
+    highs = tuple(edge - _CENT for edge in PRICE_EDGES) + (None,)
+    return list(zip(lows, highs))
+
+
+def category_counts(queryset, params):
+    rows = (
+        apply_filters(queryset, params, exclude=('category',))
+        .filter(category__isnull=False)
+        .order_by()
+        .values('category_id', 'category__name', 'category__slug')
+        .annotate(count=Count('id'))
+    )
+    counts = [
+        {'id': row['category_id'], 'name': row['category__name'], 'slug': row['category__slug'], 'count': row['count']}
+        for row in rows
+    ]
+    return sorted(counts, key=lambda entry: (-entry['count'], entry['name']))
+
+
+def price_counts(queryset, params):
+    buckets = price_buckets()
+    counts = apply_filters(queryset, params, exclude=('price',)).aggregate(**{
+        f'bucket_{index}': Count('id', filter=Q(price__gte=low) & (Q(price__lte=high) if high is not None else Q()))
+        for index, (low, high) in enumerate(buckets)
+    })
+    # Formatted like the price field of the services
+    return [
+        {'min_price': f'{low:.2f}', 'max_price': None if high is None else f'{high:.2f}', 'count': counts[f'bucket_{index}']}
+        for index, (low, high) in enumerate(buckets)
+    ]
+
+
+def rating_counts(queryset, params, min_rating):
+    """Counts per rating band and of unrated services, plus the total matching every filter."""
+    queryset = annotate_rating(apply_filters(queryset, params, exclude=('rating',)))
+    aggregates = {f'band_{band}': Count('id', filter=Q(rating_avg__gte=band)) for band in RATING_BANDS}
+    aggregates['unrated'] = Count('id', filter=Q(review_count=0))
+    # This query already applies every other filter, so the total is one more count
+    aggregates['total'] = Count('id', filter=Q(rating_avg__gte=min_rating)) if min_rating is not None else Count('id')
+    counts = queryset.aggregate(**aggregates)
+    bands = [{'min_rating': band, 'count': counts[f'band_{band}']} for band in RATING_BANDS]
+    return bands, counts['unrated'], counts['total']
+
+
+def facet_counts(queryset, params):
+    """All facets for the query parameters ``params``, in three queries."""
+    min_rating = decimal_param(params, 'min_rating')
+    categories = category_counts(queryset, params)
+    prices = price_counts(queryset, params)
+    bands, unrated, total = rating_counts(queryset, params, min_rating)
+    return {
+        'count': total,
+        'categories': categories,
+        'price': prices,
+        'rating': bands,
+        'unrated': unrated,
+    }
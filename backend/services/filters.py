@@ -0,0 +1,147 @@
+"""
+Query-string search, filtering and ordering for the service catalog.
+
+Supported parameters (all optional):
+    search      free text matched against title, description and category name
+                through the full-text index (see services/search.py)
+    category    category id or slug
+    min_price   lowest price (inclusive)
+    max_price   highest price (inclusive)
+    min_rating  lowest average review rating (inclusive, 1-5)
+    near        <lat>,<lng>: only services within radius_km of the point,
+                annotated with distance_km (see services/geo.py)
+    radius_km   search radius for near (default and maximum in settings)
+    bbox        <south>,<west>,<north>,<east>: only services inside the box
+    ordering    one of SERVICE_ORDERINGS (default: distance with near,
+                relevance when searching, newest otherwise)
+"""
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
+from rest_framework import serializers
+
+from . import geo
+from .search import get_search_backend
+
+SERVICE_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'rating': (F('rating_avg').desc(nulls_last=True), '-id'),
+    'top_rated': ('-ranking_score', '-id'),
+    'relevance': (F('search_rank').desc(nulls_last=True), '-id'),
+    'distance': ('distance_km', 'id'),
+}
+DEFAULT_SERVICE_ORDERING = 'newest'
+DEFAULT_SEARCH_ORDERING = 'relevance'
+
+
+def filter_services(queryset, params):
+    """Apply the catalog query parameters to a Service queryset."""
+    queryset = apply_filters(queryset, params)
+    search = params.get('search', '').strip()
+    near = params.get('near', '').strip()
+
+    default = DEFAULT_SEARCH_ORDERING if search else 'distance' if near else DEFAULT_SERVICE_ORDERING
+    ordering = params.get('ordering') or default
+    if ordering not in SERVICE_ORDERINGS:
+        raise serializers.ValidationError({
+            'ordering': f"Must be one of: {', '.join(SERVICE_ORDERINGS)}."
+        })
+    if ordering == 'distance' and not near:
+        raise serializers.ValidationError({'ordering': "'distance' ordering requires near."})
+    if ordering == 'relevance':
+        if not search:
+            raise serializers.ValidationError({'ordering': "'relevance' ordering requires a search term."})
+        queryset = get_search_backend().annotate_rank(queryset, search)
+    if ordering == 'rating' and 'rating_avg' not in queryset.query.annotations:
+        queryset = annotate_rating(queryset)
+
+    return queryset.order_by(*SERVICE_ORDERINGS[ordering])
+
+
+def apply_filters(queryset, params, exclude=()):
+    """
+    Apply the filtering parameters (everything but ordering). Filter groups
+    named in ``exclude`` ('category', 'price', 'rating') are left out, which
+    is how the facet counts (services/facets.py) see the other choices.
+    """
+    search = params.get('search', '').strip()
+    if search:
+        queryset = get_search_backend().filter(queryset, search)
+
+    category = params.get('category', '').strip()
+    if category and 'category' not in exclude:
+        if category.isdigit():
+            queryset = queryset.filter(category_id=int(category))
+        else:
+            queryset = queryset.filter(category__slug=category)
+
+    min_price = decimal_param(params, 'min_price')
+    max_price = decimal_param(params, 'max_price')
+    if 'price' not in exclude:
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+    near = _coordinates_param(params, 'near', 2)
+    if near is not None:
+        radius = decimal_param(params, 'radius_km')
+        radius = settings.SERVICE_SEARCH_DEFAULT_RADIUS_KM if radius is None else float(radius)
+        if not 0 < radius <= settings.SERVICE_SEARCH_MAX_RADIUS_KM:
+            raise serializers.ValidationError({
+                'radius_km': f'Must be greater than 0 and at most {settings.SERVICE_SEARCH_MAX_RADIUS_KM:g}.'
+            })
+        queryset = geo.within_radius(queryset, *near, radius)
+    bbox = _coordinates_param(params, 'bbox', 4)
+    if bbox is not None:
+        if bbox[0] > bbox[2]:
+            raise serializers.ValidationError({'bbox': 'South must not be greater than north.'})
+        if bbox[1] > bbox[3]:
+            bbox[3] += 360.0  # the box crosses the antimeridian
+        queryset = geo.within_box(queryset, *bbox)
+
+    min_rating = decimal_param(params, 'min_rating')
+    if min_rating is not None and 'rating' not in exclude:
+        queryset = annotate_rating(queryset).filter(rating_avg__gte=min_rating)
+    return queryset
+
+
+def annotate_rating(queryset):
+    # Stored aggregates (services/ratings.py); NULL for unreviewed services
+    return queryset.annotate(rating_avg=Cast('rating_sum', FloatField()) / NullIf('review_count', 0))
+
+
+def decimal_param(params, name):
+    """The query parameter ``name`` as a finite Decimal, or None if it is empty."""
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise serializers.ValidationError({name: 'A valid number is required.'})
+    return number
+
+
+def _coordinates_param(params, name, count):
+    """``count`` comma-separated latitudes and longitudes, alternating, or None."""
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise serializers.ValidationError({name: f'Expected {count} comma-separated numbers.'})
+    if any(abs(latitude) > 90 for latitude in numbers[0::2]) or any(abs(longitude) > 180 for longitude in numbers[1::2]):
+        raise serializers.ValidationError({name: 'Latitudes must be within ±90 and longitudes within ±180.'})
+    return numbers
@@ -0,0 +1,143 @@
+"""
+Service locations: geohash cells and radius / bounding-box search.
+
+Every located service stores a 9-character geohash of its coordinates in an
+indexed column. A geohash names a cell of a fixed grid, and all points in a
+cell share that cell's prefix, so the services in one cell are one range
+scan on the index (``geohash >= 'kzf0' AND geohash < 'kzf1'``).
+
+A search first lists the cells, at the finest precision that keeps their
+number small, that cover the bounding box of the query; only the services
+in those ranges are read, and exact (haversine) distances are computed for
+those candidates alone. The work therefore follows the number of services
+near the point, not the size of the catalog.
+"""
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # about 4.8m x 4.8m, finer than any radius we search with
+EARTH_RADIUS_KM = 6371.0088
+MAX_CELLS = 16
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of the geohash cells of ``precision``."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def radius_box(latitude, longitude, radius_km):
+    """
+    (south, west, north, east) of the box around a circle. The circle is
+    widest poleward of its center, so the longitude half-width is
+    asin(sin(r) / cos(latitude)) rather than r / cos(latitude).
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angle)
+    cos_lat = math.cos(math.radians(latitude))
+    if math.sin(angle) >= cos_lat:
+        lon_delta = 180.0  # the circle reaches over a pole
+    else:
+        lon_delta = min(180.0, math.degrees(math.asin(math.sin(angle) / cos_lat)))
+    return (max(-90.0, latitude - lat_delta), longitude - lon_delta,
+            min(90.0, latitude + lat_delta), longitude + lon_delta)
+
+
+def covering_cells(south, west, north, east):
+    """The geohash prefixes of at most MAX_CELLS cells covering the box."""
+    if east - west >= 360.0:
+        west, east = -180.0, 180.0
+    for precision in range(PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(north / height) - math.floor(south / height) + 1
+        columns = math.floor(east / width) - math.floor(west / width) + 1
+        if rows * columns <= MAX_CELLS or precision == 1:
+            break
+    cells = set()
+    for row in range(math.floor(south / height), math.floor(north / height) + 1):
+        latitude = min(89.999999, max(-89.999999, (row + 0.5) * height))
+        for column in range(math.floor(west / width), math.floor(east / width) + 1):
+            longitude = (column + 0.5) * width
+            longitude = (longitude + 180.0) % 360.0 - 180.0  # wrap across the antimeridian
+            cells.add(encode(latitude, longitude, precision))
+    return sorted(cells)
+
+
+def _next_prefix(prefix):
+    """The prefix that directly follows ``prefix`` in geohash order, or None after 'zzz'."""
+    head = prefix.rstrip(BASE32[-1])
+    if not head:
+        return None
+    return head[:-1] + BASE32[BASE32.index(head[-1]) + 1] + BASE32[0] * (len(prefix) - len(head))
+
+
+def cell_ranges(cells):
+    """Merge sorted prefixes into ``(start, end)`` ranges of adjacent cells."""
+    ranges = []
+    for cell in cells:
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1][1] = _next_prefix(cell)
+        else:
+            ranges.append([cell, _next_prefix(cell)])
+    return [(start, end) for start, end in ranges]
+
+
+def box_filter(south, west, north, east):
+    """Q narrowing services to the geohash ranges and then the exact box."""
+    ranges = Q()
+    for start, end in cell_ranges(covering_cells(south, west, north, east)):
+        ranges |= Q(geohash__gte=start, geohash__lt=end) if end else Q(geohash__gte=start)
+    box = Q(latitude__gte=south, latitude__lte=north)
+    if west < -180.0 or east > 180.0:
+        # The box crosses the antimeridian: two longitude intervals
+        box &= Q(longitude__gte=(west + 540.0) % 360.0 - 180.0) | Q(longitude__lte=(east + 540.0) % 360.0 - 180.0)
+    else:
+        box &= Q(longitude__gte=west, longitude__lte=east)
+    return ranges & box
+
+
+def distance_km(latitude, longitude):
+    """Haversine distance expression from the point to each service."""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    delta_lat = Radians(F('latitude'), output_field=FloatField()) - lat
+    delta_lon = Radians(F('longitude'), output_field=FloatField()) - lon
+    half_chord = (
+        Power(Sin(delta_lat / 2), 2)
+        + math.cos(lat) * Cos(Radians(F('latitude'))) * Power(Sin(delta_lon / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(half_chord))
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """Services within ``radius_km`` of the point, annotated with ``distance_km``."""
+    queryset = queryset.filter(box_filter(*radius_box(latitude, longitude, radius_km)))
+    return queryset.annotate(distance_km=distance_km(latitude, longitude)).filter(distance_km__lte=radius_km)
+
+
+def within_box(queryset, south, west, north, east):
+    return queryset.filter(box_filter(south, west, north, east))
@@ -0,0 +1,146 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database, format_summary, measure, summarize
+from services import availability
+from services.benchmarking import seed_catalog
+from services.models import AvailabilityWindow, Booking, Service
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Give one provider thousands of bookings across their services (default 5000 over two '
+        'years), time overlap checks and the free-slot endpoint, check the slots against a '
+        'brute-force scan of every booking, and fail unless the overlap query is an index range '
+        'scan and every p99 stays under --max-ms.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=300)
+        parser.add_argument('--max-ms', type=float, default=20.0)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            providers, _categories = seed_catalog(20, provider_count=1)
+            provider = providers[0]
+            services = list(Service.objects.filter(provider=provider))
+            for index, service in enumerate(services):
+                service.duration_minutes = (30, 60, 90, 120)[index % 4]
+            Service.objects.bulk_update(services, ['duration_minutes'])
+            AvailabilityWindow.objects.bulk_create([
+                AvailabilityWindow(provider=provider, weekday=weekday, start_time=start, end_time=end)
+                for weekday in range(6)
+                for start, end in ((datetime.time(8), datetime.time(12)), (datetime.time(13), datetime.time(18)))
+            ])
+            seeker = CustomUser.objects.create(email='seeker@bench.local', role='SEEKER', firebase_uid='bench-seeker')
+            today = datetime.datetime.now(tz=availability.booking_time_zone()).date()
+            self.seed_bookings(provider, services, seeker, today, options['bookings'])
+            self.stdout.write(f"{Booking.objects.filter(provider=provider).count():,} bookings of one provider")
+
+            self.check_plan(provider)
+            rng = random.Random(3)
+            slow = []
+
+            def candidate():
+                day = today + datetime.timedelta(days=rng.randint(0, 700))
+                start = datetime.datetime.combine(day, datetime.time(rng.randint(8, 16), rng.choice((0, 30))),
+                                                  tzinfo=availability.booking_time_zone())
+                return start, start + datetime.timedelta(minutes=60)
+
+            def check():
+                try:
+                    availability.check_booking(provider.pk, *candidate())
+                except ValidationError:
+                    pass
+
+            timings = measure(check, options['iterations'])
+            self.report('overlap check', timings, options['max_ms'], slow)
+
+            client = APIClient()
+            for days in (7, 31):
+                paths = iter(
+                    f'/api/services/{rng.choice(services).pk}/slots/?from={first}&to={first + datetime.timedelta(days=days - 1)}'
+                    for first in (today + datetime.timedelta(days=rng.randint(0, 700 - days)) for _ in range(options['iterations']))
+                )
+                timings = measure(lambda: client.get(next(paths)), options['iterations'])
+                self.report(f'free slots, {days} days', timings, options['max_ms'], slow)
+
+            self.check_against_scan(services, today, rng)
+
+        if slow:
+            raise CommandError(f"p99 above {options['max_ms']}ms for: {', '.join(slow)}")
+        self.stdout.write(self.style.SUCCESS('Overlap checks and free slots stay fast with thousands of bookings.'))
+
+    def seed_bookings(self, provider, services, seeker, today, count):
+        """``count`` bookings that do not overlap, packed into the windows from today on."""
+        rng = random.Random(1)
+        windows = availability.weekly_windows(provider.pk)
+        bookings, day = [], today
+        while len(bookings) < count:
+            for start, end in availability.windows_between(windows, day, day):
+                slot = start
+                while len(bookings) < count:
+                    service = rng.choice(services)
+                    duration = datetime.timedelta(minutes=service.duration_minutes)
+                    slot += datetime.timedelta(minutes=rng.choice((0, 30, 60, 120)))
+                    if slot + duration > end:
+                        break
+                    bookings.append(Booking(
+                        service=service, seeker=seeker, provider=provider,
+                        status=rng.choice(Booking.BookingStatus.values),
+                        booking_date=slot, duration_minutes=service.duration_minutes, end_date=slot + duration,
+                    ))
+                    slot += duration
+            day += datetime.timedelta(days=1)
+        Booking.objects.bulk_create(bookings, batch_size=2000)
+
+    def check_plan(self, provider):
+        start = datetime.datetime.now(tz=availability.booking_time_zone())
+        query = availability.active_bookings(provider.pk, start, start + datetime.timedelta(hours=1)).query
+        sql, params = query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.stdout.write(f'overlap query: {plan}')
+        if 'booking_provider_time_idx' not in plan or 'booking_date>' not in plan.replace(' ', ''):
+            raise CommandError('The overlap query is not a range scan of booking_provider_time_idx.')
+
+    def check_against_scan(self, services, today, rng):
+        """Every free slot of a few random weeks, recomputed from all the provider's bookings."""
+        bookings = list(
+            Booking.objects.filter(provider=services[0].provider, status__in=Booking.ACTIVE_STATUSES)
+            .values_list('booking_date', 'end_date')
+        )
+        for _ in range(5):
+            service = rng.choice(services)
+            first = today + datetime.timedelta(days=rng.randint(1, 690))
+            last = first + datetime.timedelta(days=6)
+            slots = availability.free_slots(service, first, last)
+            windows = availability.windows_between(availability.weekly_windows(service.provider_id), first, last)
+            duration = datetime.timedelta(minutes=service.duration_minutes)
+            for start, end in slots:
+                if any(booked_start < end and start < booked_end for booked_start, booked_end in bookings):
+                    raise CommandError(f'Slot {start} overlaps a booking.')
+            # Every step of every window that is free must be offered
+            offered = {start for start, _end in slots}
+            for window_start, window_end in windows:
+                start = window_start
+                while start + duration <= window_end:
+                    free = not any(b_start < start + duration and start < b_end for b_start, b_end in bookings)
+                    if free and start not in offered:
+                        raise CommandError(f'Free slot {start} was not offered.')
+                    start += datetime.timedelta(minutes=30)
+        self.stdout.write('Free slots match a scan of every booking.')
+
+    def report(self, label, timings, max_ms, slow):
+        self.stdout.write(format_summary(label, timings, 'ms'))
+        if summarize(timings, 'ms')['p99'] > max_ms:
+            slow.append(label)
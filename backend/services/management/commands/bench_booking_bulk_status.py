@@ -0,0 +1,106 @@
+import time
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database
+from services import ratings
+from services.benchmarking import seed_activity, seed_catalog
+from services.models import Booking, BookingTransition, Service
+
+Status = Booking.BookingStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Confirm and then complete a provider's day of bookings (default 50), once with one "
+        'PATCH /api/bookings/<pk>/ per booking and once with POST /api/bookings/bulk-status/, '
+        'and compare requests, queries, email connections and time. Fail unless the bulk '
+        'requests change every booking, record the transitions, keep the completed booking '
+        'counts exact and report other users\' bookings as not found.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            providers, _categories = seed_catalog(10, provider_count=2)
+            provider, other = providers
+            services = list(Service.objects.filter(provider=provider))
+            seed_activity(services + list(Service.objects.filter(provider=other)[:1]),
+                          seeker_count=options['bookings'] // len(services) + 1)
+            pks = list(Booking.objects.filter(provider=provider).values_list('id', flat=True)[:options['bookings']])
+            foreign = Booking.objects.filter(provider=other).values_list('id', flat=True)[0]
+            client = APIClient()
+            client.force_authenticate(provider)
+
+            def one_by_one(status):
+                for pk in pks:
+                    response = client.patch(f'/api/bookings/{pk}/', {'status': status}, format='json')
+                    if response.status_code != 200:
+                        raise CommandError(f'PATCH returned {response.status_code}: {response.data}')
+                return len(pks)
+
+            def in_bulk(status):
+                response = client.post('/api/bookings/bulk-status/', {'ids': pks, 'status': status}, format='json')
+                if response.status_code != 200 or response.data['updated'] != len(pks):
+                    raise CommandError(f'The bulk request returned {response.status_code}: {response.data}')
+                return 1
+
+            for label, apply in (('One PATCH per booking', one_by_one), ('POST bulk-status', in_bulk)):
+                self.reset(pks)
+                for status in (Status.CONFIRMED, Status.COMPLETED):
+                    self.run(f'{label}, {status}', apply, status)
+                self.check_state(pks)
+
+            response = client.post(
+                '/api/bookings/bulk-status/', {'ids': [pks[0], foreign], 'status': Status.CANCELED}, format='json',
+            )
+            outcomes = {result['id']: result['outcome'] for result in response.data['results']}
+            if outcomes != {pks[0]: 'invalid', foreign: 'not_found'}:
+                raise CommandError(f'Unexpected outcomes for a completed and a foreign booking: {outcomes}')
+            self.stdout.write('A completed booking is reported invalid, another provider\'s booking not found.')
+
+        self.stdout.write(self.style.SUCCESS('The bulk requests change every booking, with one email connection each.'))
+
+    def reset(self, pks):
+        Booking.objects.filter(pk__in=pks).update(status=Status.PENDING)
+        BookingTransition.objects.all().delete()
+        ratings.recompute_ranking()
+
+    def run(self, label, apply, status):
+        """Count requests, queries and email connections of ``apply(status)``, and time it."""
+        connections = []
+        send_messages = EmailBackend.send_messages
+
+        def counting_send_messages(backend, messages):
+            connections.append(len(messages))
+            return send_messages(backend, messages)
+
+        mail.outbox = []
+        EmailBackend.send_messages = counting_send_messages
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                requests = apply(status)
+                elapsed = time.perf_counter() - start
+        finally:
+            EmailBackend.send_messages = send_messages
+        self.stdout.write(
+            f'{label:<38} {requests:>3} request(s) {len(queries):>5} queries '
+            f'{len(connections):>4} email connection(s) for {sum(connections):>3} emails  {elapsed * 1000:8.1f}ms'
+        )
+
+    def check_state(self, pks):
+        statuses = set(Booking.objects.filter(pk__in=pks).values_list('status', flat=True))
+        if statuses != {Status.COMPLETED}:
+            raise CommandError(f'The bookings ended up {statuses}, not all COMPLETED.')
+        if BookingTransition.objects.filter(booking__in=pks).count() != 2 * len(pks):
+            raise CommandError('Not every change was recorded as a transition.')
+        if len(ratings.ranking_mismatches()[0]):
+            raise CommandError('The completed booking counts drifted from the bookings.')
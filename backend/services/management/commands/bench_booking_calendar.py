@@ -0,0 +1,121 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database, format_summary, measure, summarize
+from services.availability import booking_time_zone
+from services.benchmarking import seed_catalog
+from services.booking_calendar import COLUMNS, calendar_bookings, provider_calendar
+from services.models import Booking, Service
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Give one provider years of booking history (default 200k bookings) and another only '
+        'the bookings of the calendar week, with the same bookings that week for both. Time '
+        'GET /api/bookings/calendar/ for both and fail if the long history makes its median more '
+        'than --max-ratio times slower, if the week is not read with an index range scan, or if the '
+        'calendar differs from a scan of every booking.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history', type=int, default=200_000)
+        parser.add_argument('--per-day', type=int, default=30, help='Bookings per day in the calendar week.')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--max-ratio', type=float, default=1.5)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            veteran, newcomer = seed_catalog(20, provider_count=2)[0]
+            seeker = CustomUser.objects.create(email='seeker@bench.local', role='SEEKER', firebase_uid='bench-seeker')
+            first_day = datetime.datetime.now(tz=booking_time_zone()).date() + datetime.timedelta(days=7)
+            last_day = first_day + datetime.timedelta(days=6)
+            self.seed(veteran, newcomer, seeker, first_day, options)
+            self.stdout.write(
+                f'{Booking.objects.filter(provider=veteran).count():,} bookings of one provider, '
+                f'{Booking.objects.filter(provider=newcomer).count():,} of the other'
+            )
+
+            self.check_plan(veteran, first_day, last_day)
+            self.check_against_scan(veteran, first_day, last_day)
+
+            p50 = {}
+            for label, provider in (('years of history', veteran), ('one week of bookings', newcomer)):
+                client = APIClient()
+                client.force_authenticate(provider)
+                path = f'/api/bookings/calendar/?from={first_day}&to={last_day}'
+                timings = measure(lambda: client.get(path), options['iterations'])
+                self.stdout.write(format_summary(label, timings, 'ms'))
+                p50[label] = summarize(timings, 'ms')['p50']
+
+        ratio = p50['years of history'] / p50['one week of bookings']
+        if ratio > options['max_ratio']:
+            raise CommandError(f"The long history made the calendar {ratio:.2f}x slower (max {options['max_ratio']}x).")
+        self.stdout.write(self.style.SUCCESS(
+            f'The calendar week takes as long with years of history ({ratio:.2f}x of a new provider).'
+        ))
+
+    def seed(self, veteran, newcomer, seeker, first_day, options):
+        """The same bookings in the calendar week for both providers, and years of history for the veteran."""
+        rng = random.Random(5)
+        zone = booking_time_zone()
+        services = {
+            provider: list(Service.objects.filter(provider=provider).only('id', 'provider_id', 'duration_minutes'))
+            for provider in (veteran, newcomer)
+        }
+        statuses = Booking.BookingStatus.values
+        bookings = []
+
+        def book(provider, start, status):
+            service = rng.choice(services[provider])
+            bookings.append(Booking(
+                service=service, seeker=seeker, provider=provider, status=status, booking_date=start,
+                duration_minutes=service.duration_minutes,
+                end_date=start + datetime.timedelta(minutes=service.duration_minutes),
+            ))
+
+        week_start = datetime.datetime.combine(first_day, datetime.time.min, tzinfo=zone)
+        for minute in sorted(rng.sample(range(7 * 24 * 60), 7 * options['per_day'])):
+            start, status = week_start + datetime.timedelta(minutes=minute, microseconds=1), rng.choice(statuses)
+            book(veteran, start, status)
+            book(newcomer, start, status)
+        # History: five years before the week and a year after it
+        for minute in rng.sample(range(6 * 365 * 24 * 60), options['history']):
+            start = week_start - datetime.timedelta(days=5 * 365) + datetime.timedelta(minutes=minute, microseconds=2)
+            if not week_start <= start < week_start + datetime.timedelta(days=7):
+                book(veteran, start, rng.choice(statuses))
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+
+    def check_plan(self, provider, first_day, last_day):
+        sql, params = calendar_bookings(provider.pk, first_day, last_day).values_list(*COLUMNS).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' / '.join(row[-1] for row in cursor.fetchall())
+        self.stdout.write(f'calendar query: {plan}')
+        if 'booking_provider_time_idx' not in plan or 'booking_date>' not in plan.replace(' ', ''):
+            raise CommandError('The calendar is not read with a range scan of booking_provider_time_idx.')
+        if 'TEMP B-TREE' in plan:
+            raise CommandError('The calendar query sorts its rows instead of reading them in index order.')
+
+    def check_against_scan(self, provider, first_day, last_day):
+        zone = booking_time_zone()
+        expected, total = {}, 0
+        rows = Booking.objects.filter(provider=provider).values_list('id', 'booking_date', 'status')
+        for pk, booking_date, status in rows:
+            day = booking_date.astimezone(zone).date()
+            if first_day <= day <= last_day:
+                total += 1
+                if status != Booking.BookingStatus.CANCELED:
+                    expected.setdefault(day.isoformat(), set()).add(pk)
+        calendar = provider_calendar(provider.pk, first_day, last_day)
+        found = {day['date']: {booking['id'] for booking in day['bookings']} for day in calendar['days'] if day['bookings']}
+        if found != expected:
+            raise CommandError('The calendar differs from a scan of every booking.')
+        if sum(calendar['counts'].values()) != total:
+            raise CommandError('The status counts do not add up to the bookings.')
+        self.stdout.write(f"The calendar matches a scan of every booking ({sum(calendar['counts'].values())} in the week).")
@@ -0,0 +1,173 @@
+import logging
+import os
+import random
+import tempfile
+import threading
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database, format_summary, measure
+from services import ratings
+from services.benchmarking import seed_activity, seed_catalog
+from services.models import Booking, BookingTransition, Service
+from services.transitions import TRANSITIONS
+
+Status = Booking.BookingStatus
+
+
+class Command(BaseCommand):
+    help = (
+        'Have several threads confirm, complete and cancel the same bookings at once, first by '
+        'reading and saving the whole booking and then through PATCH /api/bookings/<pk>/. Fail '
+        'if any acknowledged status change through the API is lost, if the recorded transitions '
+        'do not chain up to each booking\'s status or if a transition takes more than 3 queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=100, help='Status changes tried per thread.')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory, override_settings(QUERY_BUDGET_SAMPLE_RATE=0), \
+                bench_database(os.path.join(directory, 'bench.sqlite3')):
+            providers, _categories = seed_catalog(10, provider_count=1)
+            services = list(Service.objects.filter(provider=providers[0]))
+            seed_activity(services, seeker_count=options['bookings'] // len(services) + 1)
+            bookings = list(Booking.objects.select_related('seeker', 'provider')[:options['bookings']])
+            self.stdout.write(f'{len(bookings)} bookings, {options["threads"]} threads, '
+                              f'{options["attempts"]} changes tried per thread')
+
+            pending = Booking.objects.filter(pk__in=[booking.pk for booking in bookings])
+            pending.update(status=Status.PENDING)
+            lost = self.count_lost(self.race(bookings, options, self.save_whole_booking))
+            self.stdout.write(f'Read and save(): at least {lost} acknowledged change(s) lost')
+
+            pending.update(status=Status.PENDING)
+            ratings.recompute_ranking()
+            # The refused changes would each log a warning
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.ERROR)
+            try:
+                acknowledged = self.race(bookings, options, self.patch_status)
+            finally:
+                request_logger.setLevel(level)
+            self.check_events(bookings, acknowledged)
+            if len(ratings.ranking_mismatches()[0]):
+                raise CommandError('The completed booking counts drifted from the bookings.')
+
+            self.check_queries(bookings[0])
+
+        self.stdout.write(self.style.SUCCESS('Concurrent status changes are never lost.'))
+
+    def race(self, bookings, options, change):
+        """Run ``change`` from every thread at once; return ``{booking pk: [acknowledged change, ...]}``."""
+        acknowledged = defaultdict(list)
+        lock = threading.Lock()
+        start = threading.Barrier(options['threads'])
+        errors = []
+
+        def run(seed):
+            rng = random.Random(seed)
+            client = APIClient()
+            try:
+                start.wait()
+                for _ in range(options['attempts']):
+                    booking = rng.choice(bookings)
+                    user = rng.choice((booking.seeker, booking.provider))
+                    result = change(client, booking, user, rng)
+                    if result is not None:
+                        with lock:
+                            acknowledged[booking.pk].append(result)
+            except Exception as error:  # reported below; a thread cannot raise to the command
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(seed,)) for seed in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError(f'{len(errors)} thread(s) failed: {errors[0]!r}')
+        return acknowledged
+
+    def save_whole_booking(self, client, booking, user, rng):
+        """The former read-modify-write: load the booking, check, then save() every column."""
+        current = Booking.objects.get(pk=booking.pk)
+        choices = [to for from_status, to in TRANSITIONS if from_status == current.status]
+        if not choices:
+            return None
+        from_status, current.status = current.status, rng.choice(choices)
+        current.save()
+        return from_status, current.status
+
+    def patch_status(self, client, booking, user, rng):
+        client.force_authenticate(user)
+        to_status = rng.choice((Status.CONFIRMED, Status.COMPLETED, Status.CANCELED))
+        response = client.patch(f'/api/bookings/{booking.pk}/', {'status': to_status}, format='json')
+        if response.status_code == 200:
+            return to_status
+        if response.status_code not in (400, 403, 409):
+            raise CommandError(f'PATCH returned {response.status_code}: {response.data}')
+        return None
+
+    def count_lost(self, acknowledged):
+        """
+        Acknowledged changes from a status the booking had already left: each
+        status is left once, so any second change from it overwrote the first.
+        """
+        return sum(len(changes) - len({from_status for from_status, _to in changes}) for changes in acknowledged.values())
+
+    def check_events(self, bookings, acknowledged):
+        """
+        The recorded transitions of each booking chain from PENDING to its
+        current status, and are exactly the changes the API acknowledged.
+        """
+        events = defaultdict(list)
+        for event in BookingTransition.objects.order_by('id'):
+            events[event.booking_id].append((event.from_status, event.to_status))
+        for booking in Booking.objects.filter(pk__in=[b.pk for b in bookings]):
+            chain = events[booking.pk]
+            status = Status.PENDING
+            for from_status, to_status in chain:
+                if from_status != status:
+                    raise CommandError(f'Booking {booking.pk}: transitions {chain} do not chain up.')
+                status = to_status
+            if status != booking.status:
+                raise CommandError(f'Booking {booking.pk} is {booking.status} but its transitions end at {status}.')
+            # Repeating the current status is a no-op that is acknowledged as well
+            if {to for _from, to in chain} != set(acknowledged[booking.pk]):
+                raise CommandError(f'Booking {booking.pk}: changes {acknowledged[booking.pk]} were acknowledged '
+                                   f'but {chain} recorded.')
+        self.stdout.write(f'PATCH status: {sum(map(len, events.values()))} changes, none lost, all recorded as transitions')
+
+    def check_queries(self, booking):
+        """Time and count the queries of confirm and complete requests."""
+        client = APIClient()
+        client.force_authenticate(booking.provider)
+
+        def confirm_and_complete():
+            Booking.objects.filter(pk=booking.pk).update(status=Status.PENDING)
+            for to_status in (Status.CONFIRMED, Status.COMPLETED):
+                response = client.patch(f'/api/bookings/{booking.pk}/', {'status': to_status}, format='json')
+                if response.status_code != 200:
+                    raise CommandError(f'PATCH returned {response.status_code}: {response.data}')
+
+        timings = measure(confirm_and_complete, 100)
+        self.stdout.write(format_summary('confirm + complete', timings, 'ms'))
+
+        Booking.objects.filter(pk=booking.pk).update(status=Status.PENDING)
+        with CaptureQueriesContext(connection) as queries:
+            client.patch(f'/api/bookings/{booking.pk}/', {'status': Status.CONFIRMED}, format='json')
+        statements = [q['sql'] for q in queries.captured_queries if q['sql'] not in ('BEGIN', 'COMMIT')]
+        self.stdout.write(f'Queries per transition: {len(statements)} '
+                          '(read the booking, conditional UPDATE, INSERT the transition)')
+        if len(statements) > 3:
+            raise CommandError('A status change took more than 3 queries:\n' + '\n'.join(statements))
@@ -0,0 +1,68 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database
+from api.query_budget import QueryCounter
+from services.benchmarking import seed_catalog
+from services.models import Service
+from services.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Import the same services one POST at a time and through POST /api/services/bulk/ '
+        '(JSON and NDJSON), and report wall time and query counts for each.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=500)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            providers, categories = seed_catalog(100, provider_count=1)
+            provider = providers[0]
+            client = APIClient()
+            client.force_authenticate(provider)
+            rng = random.Random(42)
+            items = [
+                {
+                    'title': f'Imported service {i}',
+                    'description': 'Bulk imported listing',
+                    'price': f'{rng.randint(500, 50000) / 100:.2f}',
+                    'category': rng.choice(categories).pk,
+                }
+                for i in range(options['items'])
+            ]
+
+            self.run('one POST per service', lambda: [client.post('/api/services/', item, format='json') for item in items])
+            self.run('bulk JSON', lambda: client.post('/api/services/bulk/', items, format='json'))
+            ndjson = '\n'.join(json.dumps(item) for item in items)
+            self.run('bulk NDJSON', lambda: client.post(
+                '/api/services/bulk/', ndjson, content_type='application/x-ndjson',
+            ))
+
+            imported = list(provider.services.order_by('-id').values('id', 'price')[:len(items)])
+            updates = [{'id': row['id'], 'price': str(row['price'] + 1)} for row in imported]
+            self.run('bulk JSON update', lambda: client.post('/api/services/bulk/', updates, format='json'))
+
+            found = len(get_search_backend().filter(Service.objects.all(), 'imported'))
+            self.stdout.write(f'{found} services found by searching for "imported"')
+
+    def run(self, label, func):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            responses = func()
+            elapsed = time.perf_counter() - start
+        responses = responses if isinstance(responses, list) else [responses]
+        statuses = sorted({response.status_code for response in responses})
+        self.stdout.write(
+            f'{label:<22} {elapsed * 1000:>9.1f}ms  {counter.total:>6} queries  '
+            f'{len(responses)} request(s), status {statuses}'
+        )
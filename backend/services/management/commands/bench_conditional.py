@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database, format_summary, measure
+from services.benchmarking import seed_activity, seed_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare bytes sent and server time for plain GETs and for conditional GETs '
+        '(If-None-Match) that come back 304, on seeded service, booking and review endpoints.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=2000)
+        parser.add_argument('--seekers', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        # Measure the views, not the catalog response cache in front of them.
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0, CATALOG_CACHE_TIMEOUT=0), bench_database():
+            providers, _categories = seed_catalog(options['services'], provider_count=5)
+            services = list(providers[0].services.all()[:100])
+            seekers = seed_activity(services, seeker_count=options['seekers'])
+            seeker = seekers[0]
+            service = services[0]
+            booking = seeker.bookings.first()
+
+            endpoints = [
+                ('service list', None, '/api/services/?page_size=50'),
+                ('service detail', None, f'/api/services/{service.pk}/'),
+                ('booking list', seeker, '/api/bookings/?paginate=false'),
+                ('booking detail', seeker, f'/api/bookings/{booking.pk}/'),
+                ('review list', None, f'/api/reviews/?service={service.pk}&paginate=false'),
+            ]
+            for label, user, path in endpoints:
+                self.compare(label, user, path, options['iterations'])
+
+    def compare(self, label, user, path, iterations):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        first = client.get(path)
+        etag = first['ETag']
+
+        def plain():
+            plain.response = client.get(path)
+
+        def conditional():
+            conditional.response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+
+        plain_timings = measure(plain, iterations)
+        conditional_timings = measure(conditional, iterations)
+        assert conditional.response.status_code == 304, conditional.response.status_code
+
+        self.stdout.write(
+            f'{label}: {len(plain.response.content)} bytes per plain GET, '
+            f'{len(conditional.response.content)} bytes per 304'
+        )
+        self.stdout.write('  ' + format_summary('plain 200', plain_timings))
+        self.stdout.write('  ' + format_summary('conditional 304', conditional_timings))
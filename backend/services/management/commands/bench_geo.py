@@ -0,0 +1,99 @@
+import math
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import bench_database, format_summary, measure, summarize
+from services import geo
+from services.benchmarking import random_locations
+from services.models import Category, Service
+from users.models import CustomUser
+
+RADII_KM = [1, 5, 25]
+
+
+class Command(BaseCommand):
+    help = (
+        'Grow a synthetic catalog of located services (default to 1M) and time radius queries '
+        'through the geohash index and as a full scan at each size. Fails if the indexed query '
+        'time grows faster than size ** --max-exponent for the smallest radius.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--max-exponent', type=float, default=0.5)
+        parser.add_argument('--scan-limit', type=int, default=100_000,
+                            help='Skip the full-scan baseline above this many services.')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        centers = list(_take(random_locations(random.Random(7)), options['iterations']))
+        indexed = {radius: {} for radius in RADII_KM}
+
+        with bench_database():
+            provider = CustomUser.objects.create(email='provider@bench.local', role='PROVIDER', firebase_uid='bench-provider')
+            category = Category.objects.create(name='Plumbing', slug='plumbing')
+            locations = random_locations(random.Random(42))
+            seeded = 0
+            for size in sizes:
+                start = time.perf_counter()
+                self.seed(provider, category, locations, size - seeded)
+                seeded = size
+                self.stdout.write(f'\n{size:,} services (seeded in {time.perf_counter() - start:.1f}s)')
+
+                for radius in RADII_KM:
+                    matches = []
+                    queries = iter(centers * 2)
+
+                    def nearest():
+                        latitude, longitude = next(queries)
+                        queryset = geo.within_radius(Service.objects.all(), latitude, longitude, radius)
+                        matches.append(len(queryset.order_by('distance_km', 'id')[:options['page_size']]))
+
+                    timings = measure(nearest, len(centers))
+                    indexed[radius][size] = summarize(timings, 'ms')['p50']
+                    label = f'{radius:>2} km, geohash index'
+                    self.stdout.write(f'{format_summary(label, timings, "ms")}  ~{sum(matches) / len(matches):.1f} results')
+
+                    if size <= options['scan_limit']:
+                        def scan():
+                            latitude, longitude = next(queries)
+                            queryset = Service.objects.annotate(distance_km=geo.distance_km(latitude, longitude))
+                            list(queryset.filter(distance_km__lte=radius).order_by('distance_km', 'id')[:options['page_size']])
+
+                        self.stdout.write(format_summary(f'{radius:>2} km, full scan', measure(scan, 5), 'ms'))
+
+        self.stdout.write('')
+        smallest, largest = sizes[0], sizes[-1]
+        exponents = {}
+        for radius in RADII_KM:
+            exponents[radius] = math.log(indexed[radius][largest] / indexed[radius][smallest]) / math.log(largest / smallest)
+            self.stdout.write(
+                f'{radius:>2} km: p50 {indexed[radius][smallest]:.2f}ms -> {indexed[radius][largest]:.2f}ms '
+                f'for {largest // smallest}x the services, time ~ size^{exponents[radius]:.2f}'
+            )
+        if len(sizes) > 1 and exponents[RADII_KM[0]] > options['max_exponent']:
+            raise CommandError(
+                f'{RADII_KM[0]} km queries grew as size^{exponents[RADII_KM[0]]:.2f}, '
+                f'more than size^{options["max_exponent"]}.'
+            )
+        self.stdout.write(self.style.SUCCESS('Indexed radius queries stayed sub-linear in the catalog size.'))
+
+    def seed(self, provider, category, locations, count, batch_size=20000):
+        for offset in range(0, count, batch_size):
+            batch = []
+            for latitude, longitude in _take(locations, min(batch_size, count - offset)):
+                batch.append(Service(
+                    provider=provider, category=category, title='Bench service', description='',
+                    price=Decimal(1000), latitude=latitude, longitude=longitude,
+                    geohash=geo.encode(latitude, longitude),
+                ))
+            Service.objects.bulk_create(batch)
+
+
+def _take(iterator, count):
+    return (next(iterator) for _ in range(count))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.benchmarking import bench_database, format_summary, measure
+from services.benchmarking import seed_catalog
+from services.search import SearchResults, get_search_backend
+
+QUERIES = ['plumbing', 'pipe repair', 'sol', 'nairobi emergency', 'certified steel gate', 'zzzz']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text search latency on a synthetic catalog (default 100k services).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with bench_database():
+            self.stdout.write(f"Seeding {options['services']} services...")
+            seed_catalog(options['services'])
+
+            start = time.perf_counter()
+            with transaction.atomic():
+                backend.rebuild()
+            self.stdout.write(f'Index rebuilt with {type(backend).__name__} in {time.perf_counter() - start:.2f}s')
+
+            for query in QUERIES:
+                results = SearchResults(query, backend=backend)
+                matches = results.count()
+
+                def page():
+                    SearchResults(query, backend=backend)[0:options['page_size']]
+
+                timings = measure(page, options['iterations'])
+                self.stdout.write(format_summary(f'{query!r} ({matches} hits)', timings))
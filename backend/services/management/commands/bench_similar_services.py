@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.benchmarking import bench_database, format_summary, measure
+from services import similarity
+from services.benchmarking import seed_catalog
+from services.models import Service, SimilarService
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the similar services of a synthetic catalog (default 100k services) and fail if it '
+        'takes longer than --max-minutes. Then edit one service into a copy of another, run the '
+        'incremental update and check that each now lists the other first, and time the endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--max-minutes', type=float, default=5.0)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0, CATALOG_CACHE_TIMEOUT=0), bench_database():
+            self.stdout.write(f"Seeding {options['services']:,} services...")
+            seed_catalog(options['services'])
+
+            start = time.perf_counter()
+            stats = similarity.rebuild()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"Full rebuild: {elapsed:.1f}s for {stats['services']:,} services over {stats['words']:,} words "
+                f"({stats['vectorize_seconds']:.1f}s vectorizing, {stats['neighbours_seconds']:.1f}s for the "
+                f"neighbours, {SimilarService.objects.count():,} rows)"
+            )
+
+            self.check_incremental()
+
+            pks = list(Service.objects.order_by('?').values_list('id', flat=True)[:options['iterations']])
+            client, paths = APIClient(), iter(f'/api/services/{pk}/similar/' for pk in pks)
+            timings = measure(lambda: client.get(next(paths)), len(pks))
+            self.stdout.write(format_summary('GET /api/services/<pk>/similar/', timings, 'ms'))
+
+        if elapsed > options['max_minutes'] * 60:
+            raise CommandError(f"The full rebuild took longer than {options['max_minutes']} minutes.")
+        self.stdout.write(self.style.SUCCESS(f"The full rebuild took under {options['max_minutes']} minutes."))
+
+    def check_incremental(self):
+        original, copy = Service.objects.order_by('id')[:2]
+        copy.title, copy.description, copy.category = original.title, original.description, original.category
+        copy.save()
+        start = time.perf_counter()
+        recomputed = similarity.update()
+        self.stdout.write(f'Incremental update: {recomputed:,} services recomputed in {time.perf_counter() - start:.1f}s')
+        firsts = {
+            entry.service_id: entry.similar_id
+            for entry in SimilarService.objects.filter(service__in=[original, copy], rank=1)
+        }
+        if firsts != {original.pk: copy.pk, copy.pk: original.pk}:
+            raise CommandError('The incremental update missed a service that became a duplicate of another.')
+        self.stdout.write('A service edited into a duplicate lists, and is listed by, the original first.')
@@ -0,0 +1,94 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.benchmarking import bench_database, format_summary, measure, summarize
+from services.benchmarking import seed_catalog
+from services.models import Service
+from services.typeahead import tokenize, typeahead
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the typeahead index over a synthetic catalog (default 100k services), report its '
+        'memory and lookup latency for prefix, multi-word and misspelled queries, and fail if the '
+        'p99 of any kind exceeds --max-ms.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=100_000)
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=8)
+        parser.add_argument('--max-ms', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        with override_settings(QUERY_BUDGET_SAMPLE_RATE=0), bench_database():
+            self.stdout.write(f"Seeding {options['services']:,} services...")
+            seed_catalog(options['services'])
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            typeahead.load()
+            elapsed = time.perf_counter() - start
+            size, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            index = typeahead.services
+            self.stdout.write(
+                f'Loaded {len(index):,} titles ({len(index.vocab):,} distinct words) in {elapsed:.2f}s, '
+                f'{size / 2**20:.1f} MB ({size / max(len(index), 1):.0f} bytes per title)'
+            )
+
+            rng = random.Random(7)
+            titles = list(Service.objects.values_list('title', flat=True)[:5000])
+            words = [word for title in titles for word in tokenize(title)]
+            kinds = {
+                '1-2 letter prefix': lambda: rng.choice(words)[:rng.randint(1, 2)],
+                '3+ letter prefix': lambda: rng.choice(words)[:rng.randint(3, 8)],
+                'two words': lambda: ' '.join(rng.sample(tokenize(rng.choice(titles)), 2))[:-1],
+                'misspelled word': lambda: misspell(rng, rng.choice([w for w in words if len(w) >= 5] or words)),
+                'no match': lambda: 'qxzv' + str(rng.randint(0, 999)),
+            }
+            slow = []
+            for label, make_query in kinds.items():
+                queries = iter([make_query() for _ in range(options['iterations'])])
+                fuzzy = []
+
+                def lookup():
+                    fuzzy.append(typeahead.suggest(next(queries), options['limit'])[2])
+
+                timings = measure(lookup, options['iterations'])
+                self.stdout.write(f'{format_summary(label, timings, "ms")}  fuzzy {sum(fuzzy) / len(fuzzy):.0%}')
+                if summarize(timings, 'ms')['p99'] > options['max_ms']:
+                    slow.append(label)
+
+            self.check_incremental(typeahead)
+
+        if slow:
+            raise CommandError(f'p99 above {options["max_ms"]}ms for: {", ".join(slow)}')
+        self.stdout.write(self.style.SUCCESS(f'Every kind of lookup stayed under {options["max_ms"]}ms at p99.'))
+
+    def check_incremental(self, typeahead):
+        service = Service.objects.order_by('id').first()
+        service.title = 'Zanzibar dhow restoration'
+        service.save()
+        _categories, found, _fuzzy = typeahead.suggest('zanzib dhow', 8)
+        renamed = [entry['id'] for entry in found] == [service.pk]
+        service.delete()
+        _categories, found, _fuzzy = typeahead.suggest('zanzib', 8)
+        if not renamed or found:
+            raise CommandError('The index did not follow a service being renamed and deleted.')
+        self.stdout.write('Renames and deletions show up in the next lookup.')
+
+
+def misspell(rng, word):
+    """``word`` with one letter dropped, doubled or swapped with the next."""
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(('drop', 'double', 'swap'))
+    if edit == 'drop':
+        return word[:i] + word[i + 1:]
+    if edit == 'double':
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
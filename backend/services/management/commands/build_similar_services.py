@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from services import similarity
+from services.models import SimilarServiceUpdate
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the similar services of the services queued by catalog changes, '
+        'or of every service with --full (which also refreshes the word weights).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild every service\'s similar services.')
+
+    def handle(self, *args, **options):
+        if options['full']:
+            stats = similarity.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt the similar services of {stats['services']:,} services over {stats['words']:,} words "
+                f"in {stats['vectorize_seconds'] + stats['neighbours_seconds']:.1f}s "
+                f"({stats['vectorize_seconds']:.1f}s vectorizing, {stats['neighbours_seconds']:.1f}s for the neighbours)."
+            ))
+            return
+        queued = SimilarServiceUpdate.objects.count()
+        recomputed = similarity.update()
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed the similar services of {recomputed:,} services ({queued:,} queued).'
+        ))
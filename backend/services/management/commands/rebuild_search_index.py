@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.models import Service
+from services.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the service full-text search index from the database in bulk.'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        start = time.perf_counter()
+        with transaction.atomic():
+            backend.rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {Service.objects.count()} services with {type(backend).__name__} in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from services import ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify the stored review aggregates on every service against its reviews, and its '
+        'recent completed bookings and ranking score, and repair them. Run it daily: completed '
+        'bookings only leave the recent window here.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report services with stale aggregates; exit with an error if there are any.',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale = 0
+            for service, expected in ratings.find_mismatches(options['batch_size']):
+                stale += 1
+                if options['verbosity'] > 1:
+                    stored = {field: getattr(service, field) for field in expected}
+                    self.stdout.write(f'Service {service.pk}: stored {stored}, expected {expected}')
+            stale_ranking = len(ratings.ranking_mismatches()[0])
+            if stale or stale_ranking:
+                raise CommandError(
+                    f'{stale} service(s) have stale rating aggregates, {stale_ranking} a stale ranking score.'
+                )
+            self.stdout.write(self.style.SUCCESS('All rating aggregates and ranking scores are up to date.'))
+            return
+
+        with transaction.atomic():
+            fixed = ratings.recompute(options['batch_size'])
+            ranked = ratings.recompute_ranking(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed rating aggregates for {fixed} service(s) and ranking scores for {ranked}.'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_complaint_review'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-created_at', '-id'], name='service_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['price', 'id'], name='service_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['category', 'price'], name='service_category_price_idx'),
+        ),
+    ]
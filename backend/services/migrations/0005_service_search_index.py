@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from services.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection)
+    backend.create_index(schema_editor)
+    backend.rebuild()
+
+
+def drop_search_index(apps, schema_editor):
+    from services.search import get_search_backend
+
+    get_search_backend(schema_editor.connection).drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_service_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:15
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Review = apps.get_model('services', 'Review')
+    Service = apps.get_model('services', 'Service')
+    rows = Review.objects.order_by().values('service_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{stars}_count': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)},
+    )
+    for row in rows:
+        Service.objects.filter(pk=row.pop('service_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_service_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
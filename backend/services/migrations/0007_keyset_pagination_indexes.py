@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0006_service_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['-created_at', '-id'], name='booking_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['seeker', '-created_at', '-id'], name='booking_seeker_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['-created_at', '-id'], name='complaint_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='complaint_user_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['service', '-created_at', '-id'], name='review_service_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['seeker', '-created_at', '-id'], name='review_seeker_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['provider', '-created_at', '-id'], name='service_provider_newest_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:41
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0007_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['geohash'], name='service_geohash_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0008_service_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarServiceUpdate',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='services.service')),
+                ('queued_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarService',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='services.service')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_of', to='services.service')),
+            ],
+            options={
+                'ordering': ['service', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('service', 'rank'), name='similar_service_rank_unique')],
+            },
+        ),
+    ]
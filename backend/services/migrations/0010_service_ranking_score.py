@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:21
+
+import services.ranking
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def backfill_ranking_scores(apps, schema_editor):
+    Booking = apps.get_model('services', 'Booking')
+    Service = apps.get_model('services', 'Service')
+    rows = (
+        Booking.objects.filter(status='COMPLETED', booking_date__gte=services.ranking.recent_since())
+        .order_by().values('service_id').annotate(count=Count('id'))
+    )
+    for row in rows:
+        Service.objects.filter(pk=row['service_id']).update(recent_completed_bookings=row['count'])
+    Service.objects.update(ranking_score=services.ranking.score_expression(
+        F('review_count'), F('rating_sum'), F('recent_completed_bookings'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0009_similar_services'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='ranking_score',
+            field=models.FloatField(default=services.ranking.prior_score, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='recent_completed_bookings',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ranking_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-ranking_score', '-id'], name='service_top_rated_idx'),
+        ),
+    ]
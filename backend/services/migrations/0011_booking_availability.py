@@ -0,0 +1,98 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:27
+
+import datetime
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_booking_intervals(apps, schema_editor):
+    Booking = apps.get_model('services', 'Booking')
+    Service = apps.get_model('services', 'Service')
+    services = Service.objects.filter(pk=OuterRef('service_id'))
+    Booking.objects.update(
+        provider_id=Subquery(services.values('provider_id')[:1]),
+        duration_minutes=Subquery(services.values('duration_minutes')[:1]),
+    )
+    for booking in Booking.objects.only('id', 'booking_date', 'duration_minutes').iterator():
+        booking.end_date = booking.booking_date + datetime.timedelta(minutes=booking.duration_minutes)
+        booking.save(update_fields=['end_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0010_service_ranking_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+            ],
+            options={
+                'ordering': ['weekday', 'start_time'],
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='end_date',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='provider',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='provider_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(720)]),
+        ),
+        migrations.RunPython(backfill_booking_intervals, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='end_date',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='provider',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='provider_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['provider', 'booking_date', 'end_date', 'status'], name='booking_provider_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='availabilitywindow',
+            name='provider',
+            field=models.ForeignKey(limit_choices_to={'role': 'PROVIDER'}, on_delete=django.db.models.deletion.CASCADE, related_name='availability_windows', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='availabilitywindow',
+            index=models.Index(fields=['provider', 'weekday', 'start_time'], name='availability_provider_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='availabilitywindow',
+            constraint=models.CheckConstraint(condition=models.Q(('start_time__lt', models.F('end_time'))), name='availability_start_before_end'),
+        ),
+    ]
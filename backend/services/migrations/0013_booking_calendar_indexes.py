@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0012_booking_transition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['provider', '-created_at', '-id'], name='booking_provider_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service', 'booking_date'], name='booking_service_time_idx'),
+        ),
+    ]
@@ -1,5 +1,14 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
+from django.core.validators import MaxValueValidator, MinValueValidator
+
+from . import geo, ranking
+
+# Longest booking a service can have: overlap checks only look this far back
+# for bookings that may still be running (services/availability.py)
+MAX_BOOKING_MINUTES = 12 * 60
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -22,23 +31,177 @@ class Service(models.Model):
     # image_url = models.URLField(max_length=1024, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # How long a booking of the service takes (see services/availability.py)
+    duration_minutes = models.PositiveIntegerField(
+        default=60, validators=[MinValueValidator(5), MaxValueValidator(MAX_BOOKING_MINUTES)],
+    )
+
+    # Where the service is offered. geohash is derived from the coordinates on
+    # save() and indexed for radius and bounding-box search (services/geo.py).
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=geo.PRECISION, blank=True, default='', editable=False)
+
+    # Review aggregates, kept up to date by services/ratings.py whenever a review
+    # is created, changed or deleted (`manage.py recompute_ratings` rebuilds them)
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Bookings completed within the last RANKING_RECENT_DAYS days, and the "top
+    # rated" score derived from it and the review aggregates (services/ranking.py)
+    recent_completed_bookings = models.PositiveIntegerField(default=0, editable=False)
+    ranking_score = models.FloatField(default=ranking.prior_score, editable=False)
+
+    RATING_FIELDS = (
+        'review_count', 'rating_sum',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+    RANKING_FIELDS = ('recent_completed_bookings', 'ranking_score')
     
+    class Meta:
+        indexes = [
+            # Catalog orderings and filters (see services/filters.py)
+            models.Index(fields=['-created_at', '-id'], name='service_newest_idx'),
+            models.Index(fields=['price', 'id'], name='service_price_idx'),
+            models.Index(fields=['-ranking_score', '-id'], name='service_top_rated_idx'),
+            models.Index(fields=['category', 'price'], name='service_category_price_idx'),
+            # Keyset pagination (see api/pagination.py)
+            models.Index(fields=['provider', '-created_at', '-id'], name='service_provider_newest_idx'),
+            # Geohash cell ranges (see services/geo.py)
+            models.Index(fields=['geohash'], name='service_geohash_idx'),
+        ]
+
     @property
     def average_rating(self):
-        """Calculate average rating from reviews."""
-        reviews = self.reviews.all()
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 2)
+        """Average review rating, from the stored aggregates."""
+        if self.review_count:
+            return round(self.rating_sum / self.review_count, 2)
         return None
-    
+
+    @property
+    def rating_histogram(self):
+        """Number of reviews per star rating, ``{1: n, ..., 5: n}``."""
+        return {stars: getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+    def save(self, *args, **kwargs):
+        self.geohash = self.compute_geohash()
+        # The rating aggregates and ranking fields are only ever changed with F()
+        # updates; a plain save of a stale instance must not overwrite them.
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.RATING_FIELDS + self.RANKING_FIELDS
+            ]
+        elif kwargs.get('update_fields') is not None and {'latitude', 'longitude'} & set(kwargs['update_fields']):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'geohash'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored title, so only renames make other processes
+        # rebuild their typeahead index (services/typeahead.py).
+        instance._loaded_title = instance.__dict__.get('title')
+        return instance
+
     @property
-    def review_count(self):
-        """Get total number of reviews."""
-        return self.reviews.count()
+    def loaded_title(self):
+        """The title as last loaded from or saved to the database."""
+        return getattr(self, '_loaded_title', None)
+
+    def compute_geohash(self):
+        """The geohash of the coordinates, '' unless both are set."""
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geo.encode(self.latitude, self.longitude)
     
     def __str__(self):
         return self.title
     
+class SimilarService(models.Model):
+    """
+    One of the most similar services to ``service``, by TF-IDF cosine
+    similarity of title, description and category (services/similarity.py).
+    """
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='similar_entries')
+    similar = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='similar_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['service', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'rank'], name='similar_service_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.similar_id} is #{self.rank} similar to {self.service_id}"
+
+class SimilarServiceUpdate(models.Model):
+    """A service whose similar services must be recomputed (``manage.py build_similar_services``)."""
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    queued_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def queue(cls, service_ids):
+        """Queue ``service_ids``, moving ``queued_at`` forward for those already queued."""
+        if service_ids:
+            cls.objects.bulk_create(
+                [cls(service_id=pk) for pk in service_ids],
+                update_conflicts=True, unique_fields=['service'], update_fields=['queued_at'],
+            )
+
+    @classmethod
+    def queue_referrers(cls, service_id):
+        """Queue the services listing ``service_id`` (about to be deleted) as similar."""
+        cls.queue(list(
+            SimilarService.objects.filter(similar_id=service_id).exclude(service_id=service_id)
+            .values_list('service_id', flat=True)
+        ))
+
+
+class AvailabilityWindow(models.Model):
+    """
+    A weekly period in which a provider takes bookings, in BOOKING_TIME_ZONE.
+    Providers without any windows take bookings at any time.
+    """
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0, "Monday"
+        TUESDAY = 1, "Tuesday"
+        WEDNESDAY = 2, "Wednesday"
+        THURSDAY = 3, "Thursday"
+        FRIDAY = 4, "Friday"
+        SATURDAY = 5, "Saturday"
+        SUNDAY = 6, "Sunday"
+
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        limit_choices_to={'role': 'PROVIDER'},
+        related_name='availability_windows'
+    )
+    weekday = models.PositiveSmallIntegerField(choices=Weekday.choices)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['provider', 'weekday', 'start_time'], name='availability_provider_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(start_time__lt=models.F('end_time')), name='availability_start_before_end'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M} for {self.provider_id}"
+
 class Booking(models.Model):
     class BookingStatus(models.TextChoices):
         PENDING = "PENDING", "Pending"
@@ -59,16 +222,89 @@ class Booking(models.Model):
         default=BookingStatus.PENDING
     )
     booking_date = models.DateTimeField()
+    # The booking occupies [booking_date, end_date) of the service's provider,
+    # both copied from the service on save() so overlap checks need no join
+    # (services/availability.py)
+    duration_minutes = models.PositiveIntegerField(editable=False)
+    end_date = models.DateTimeField(editable=False)
+    provider = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        editable=False,
+        related_name='provider_bookings'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Statuses that hold the provider's time
+    ACTIVE_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED)
     
     class Meta:
         # A seeker can only book the same service for the same time slot once
         unique_together = ('service', 'seeker', 'booking_date')
+        indexes = [
+            # Keyset pagination (see api/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='booking_newest_idx'),
+            models.Index(fields=['seeker', '-created_at', '-id'], name='booking_seeker_newest_idx'),
+            models.Index(fields=['provider', '-created_at', '-id'], name='booking_provider_newest_idx'),
+            # Overlap checks, free slots and the provider calendar: the bookings
+            # of a provider starting in a time range, with their ends and
+            # statuses read from the index
+            models.Index(fields=['provider', 'booking_date', 'end_date', 'status'], name='booking_provider_time_idx'),
+            # The calendar of a single service
+            models.Index(fields=['service', 'booking_date'], name='booking_service_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember whether the stored row counted as a recently completed
+        # booking, so services/ratings.py can adjust the count on changes.
+        instance._loaded_completion = tuple(instance.__dict__.get(name) for name in ('service_id', 'status', 'booking_date'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or update_fields is None or 'service' in update_fields:
+            self.provider_id = self.service.provider_id
+        if self.duration_minutes is None:
+            self.duration_minutes = self.service.duration_minutes
+        self.end_date = self.booking_date + timedelta(minutes=self.duration_minutes)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'end_date', *(['provider'] if 'service' in update_fields else [])}
+        super().save(*args, **kwargs)
+
+    @property
+    def loaded_completion(self):
+        """``(service_id, status, booking_date)`` as last loaded from or saved to the database."""
+        return getattr(self, '_loaded_completion', None)
 
     def __str__(self):
         return f"Booking for {self.service.title} by {self.seeker.email} on {self.booking_date}"
 
+class BookingTransition(models.Model):
+    """A status change of a booking, recorded by services/transitions.py."""
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=50, choices=Booking.BookingStatus.choices)
+    to_status = models.CharField(max_length=50, choices=Booking.BookingStatus.choices)
+    # Who made the change; NULL for management commands and deleted users
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['booking', 'created_at'], name='booking_transition_idx'),
+        ]
+
+    def __str__(self):
+        return f"Booking {self.booking_id}: {self.from_status} -> {self.to_status}"
+
 class Review(models.Model):
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='reviews')
     seeker = models.ForeignKey(
@@ -85,6 +321,25 @@ class Review(models.Model):
     class Meta:
         unique_together = ('service', 'seeker')  # One review per seeker per service
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see api/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='review_newest_idx'),
+            models.Index(fields=['service', '-created_at', '-id'], name='review_service_newest_idx'),
+            models.Index(fields=['seeker', '-created_at', '-id'], name='review_seeker_newest_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the stored row counted towards, so services/ratings.py
+        # can move it between aggregates when the review is changed or deleted.
+        instance._loaded_rating = (instance.__dict__.get('service_id'), instance.__dict__.get('rating'))
+        return instance
+
+    @property
+    def loaded_rating(self):
+        """``(service_id, rating)`` as last loaded from or saved to the database."""
+        return getattr(self, '_loaded_rating', None)
     
     def __str__(self):
         return f"Review by {self.seeker.email} for {self.service.title} - {self.rating} stars"
@@ -119,6 +374,11 @@ class Complaint(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see api/pagination.py)
+            models.Index(fields=['-created_at', '-id'], name='complaint_newest_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='complaint_user_newest_idx'),
+        ]
     
     def __str__(self):
         return f"Complaint by {self.user.email} - {self.complaint_type}"
\ No newline at end of file
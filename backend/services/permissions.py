@@ -32,6 +32,13 @@ class IsSeeker(BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated and request.user.role == 'SEEKER'
 
+class IsProvider(BasePermission):
+    """
+    Allows access only to users with the 'PROVIDER' role.
+    """
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and request.user.role == 'PROVIDER'
+
 class IsBookingOwnerOrProvider(BasePermission):
     """
     Allows access only to the Seeker who made the booking or the Provider
@@ -0,0 +1,61 @@
+"""
+The "top rated" ranking score stored on Service (``?ordering=top_rated``).
+
+Sorting by the plain average rating puts a service with a single 5-star
+review above one with a hundred 4.8-star reviews. The score is a Bayesian
+average instead: every service starts with RANKING_PRIOR_REVIEWS imaginary
+reviews of RANKING_PRIOR_RATING stars, so a few reviews move it little and
+many reviews move it close to their own average::
+
+    (prior_reviews * prior_rating + rating_sum) / (prior_reviews + review_count)
+        + booking_weight * ln(1 + recent completed bookings)
+
+The second term, off when RANKING_BOOKING_WEIGHT is 0, rewards services
+booked and completed within the last RANKING_RECENT_DAYS days.
+
+The score is a column with an index, so the ordering is an index scan. It
+is written by the same F() UPDATE that changes the review aggregates or
+the booking count (services/ratings.py), computed by ``score_expression``
+in SQL; ``manage.py recompute_ratings`` recomputes it for the whole
+catalog with ``scores``, in NumPy, which also lets bookings age out of the
+recent window. Both use the prior from settings, so they agree.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Ln
+from django.utils import timezone
+
+
+def prior_score():
+    """The score of a service without reviews or bookings."""
+    return float(settings.RANKING_PRIOR_RATING)
+
+
+def recent_since():
+    """Completed bookings dated after this count towards the score."""
+    return timezone.now() - timedelta(days=settings.RANKING_RECENT_DAYS)
+
+
+def score_expression(review_count, rating_sum, recent_bookings):
+    """The score as an SQL expression of the three (expressions of) columns."""
+    weight = float(settings.RANKING_PRIOR_REVIEWS)
+    score = (
+        (Value(weight * settings.RANKING_PRIOR_RATING) + Cast(rating_sum, FloatField()))
+        / (Value(weight) + Cast(review_count, FloatField()))
+    )
+    if settings.RANKING_BOOKING_WEIGHT:
+        score += Value(float(settings.RANKING_BOOKING_WEIGHT)) * Ln(Value(1.0) + Cast(recent_bookings, FloatField()))
+    return score
+
+
+def scores(review_counts, rating_sums, recent_bookings):
+    """The scores of whole columns at once, as a float64 array."""
+    weight = float(settings.RANKING_PRIOR_REVIEWS)
+    review_counts = np.asarray(review_counts, dtype=np.float64)
+    result = (weight * settings.RANKING_PRIOR_RATING + np.asarray(rating_sums, dtype=np.float64)) / (weight + review_counts)
+    if settings.RANKING_BOOKING_WEIGHT:
+        result += settings.RANKING_BOOKING_WEIGHT * np.log1p(np.asarray(recent_bookings, dtype=np.float64))
+    return result
@@ -0,0 +1,202 @@
+"""
+Review aggregates and the ranking score stored on Service.
+
+Each service keeps its review count, rating sum and a 1-5 star histogram in
+its own columns, so average ratings can be served (and filtered and sorted
+on) without touching the review table. The signal handlers in
+services/signals.py call ``review_saved`` / ``review_deleted``, which adjust
+the columns with a single F() UPDATE per affected service, so concurrent
+reviews never overwrite each other's changes. ``booking_saved`` /
+``booking_deleted`` keep the count of recently completed bookings the same
+way (``bookings_saved`` for many bookings at once, in one UPDATE), and both
+UPDATEs recompute the "top rated" score (services/ranking.py) from the new
+values.
+
+Bulk operations that bypass model signals (``QuerySet.update()``, raw SQL,
+fixtures loaded with ``raw=True``) leave the aggregates stale; run
+``python manage.py recompute_ratings`` afterwards. Completed bookings also
+leave the recent window only when that command runs, so run it daily.
+"""
+from collections import Counter
+
+import numpy as np
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Now
+
+from . import ranking, response_cache
+from .models import Booking, Review, Service
+
+HISTOGRAM_FIELDS = {stars: f'rating_{stars}_count' for stars in range(1, 6)}
+
+
+def _apply(service_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one review with ``rating`` from a service."""
+    if service_id is None or rating not in HISTOGRAM_FIELDS:
+        return
+    review_count = F('review_count') + sign
+    rating_sum = F('rating_sum') + sign * rating
+    Service.objects.filter(pk=service_id).update(**{
+        'updated_at': Now(),  # the average is part of the service's representation
+        'review_count': review_count,
+        'rating_sum': rating_sum,
+        HISTOGRAM_FIELDS[rating]: F(HISTOGRAM_FIELDS[rating]) + sign,
+        # SET expressions all read the row as it was, so the score is given the new values
+        'ranking_score': ranking.score_expression(review_count, rating_sum, F('recent_completed_bookings')),
+    })
+
+
+def review_saved(review, created):
+    current = (review.service_id, review.rating)
+    previous = None if created else review.loaded_rating
+    if previous != current:
+        if previous is not None:
+            _apply(*previous, sign=-1)
+        _apply(*current, sign=1)
+    review._loaded_rating = current
+
+
+def review_deleted(review):
+    _apply(*(review.loaded_rating or (review.service_id, review.rating)), sign=-1)
+    review._loaded_rating = None
+
+
+def _counts_as_recent(booking):
+    """Whether ``(service_id, status, booking_date)`` counts towards recent_completed_bookings."""
+    service_id, status, booking_date = booking
+    return (
+        service_id is not None and status == Booking.BookingStatus.COMPLETED
+        and booking_date is not None and booking_date >= ranking.recent_since()
+    )
+
+
+def _count_bookings(deltas):
+    """Add ``{service_id: delta}`` to the services' recent completed bookings, in one UPDATE."""
+    deltas = {service_id: delta for service_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    bookings = F('recent_completed_bookings') + Case(
+        *(When(pk=service_id, then=Value(delta)) for service_id, delta in deltas.items()),
+        default=Value(0),
+    )
+    Service.objects.filter(pk__in=deltas).update(
+        recent_completed_bookings=bookings,
+        ranking_score=ranking.score_expression(F('review_count'), F('rating_sum'), bookings),
+    )
+    response_cache.invalidate()  # the top_rated ordering changed
+
+
+def _count_booking(service_id, sign):
+    _count_bookings({service_id: sign})
+
+
+def bookings_saved(bookings):
+    """
+    Count each booking's change since it was loaded or last saved, for
+    bookings whose status changed with ``QuerySet.update()``.
+    """
+    deltas = Counter()
+    for booking in bookings:
+        current = (booking.service_id, booking.status, booking.booking_date)
+        previous = booking.loaded_completion
+        if previous is not None and _counts_as_recent(previous):
+            deltas[previous[0]] -= 1
+        if _counts_as_recent(current):
+            deltas[current[0]] += 1
+        booking._loaded_completion = current
+    _count_bookings(deltas)
+
+
+def booking_saved(booking, created):
+    if created:
+        booking._loaded_completion = None
+    bookings_saved([booking])
+
+
+def booking_deleted(booking):
+    previous = booking.loaded_completion or (booking.service_id, booking.status, booking.booking_date)
+    if _counts_as_recent(previous):
+        _count_booking(previous[0], -1)
+    booking._loaded_completion = None
+
+
+def actual_aggregates(service_ids=None):
+    """Return ``{service_id: {field: value}}`` computed from the review table."""
+    reviews = Review.objects.order_by()
+    if service_ids is not None:
+        reviews = reviews.filter(service_id__in=service_ids)
+    rows = reviews.values('service_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{field: Count('id', filter=Q(rating=stars)) for stars, field in HISTOGRAM_FIELDS.items()},
+    )
+    return {row.pop('service_id'): row for row in rows}
+
+
+def find_mismatches(batch_size=2000):
+    """
+    Yield ``(service, expected)`` for every service whose stored aggregates
+    differ from its reviews; ``expected`` maps each field to its correct value.
+    """
+    empty = dict.fromkeys(Service.RATING_FIELDS, 0)
+    services = Service.objects.only('id', *Service.RATING_FIELDS).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(services.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        actual = actual_aggregates([service.pk for service in batch])
+        for service in batch:
+            expected = actual.get(service.pk, empty)
+            if any(getattr(service, field) != expected[field] for field in Service.RATING_FIELDS):
+                yield service, expected
+
+
+def recompute(batch_size=2000):
+    """Rewrite the aggregates of every stale service; returns how many were fixed."""
+    fixed = []
+    for service, expected in find_mismatches(batch_size):
+        for field, value in expected.items():
+            setattr(service, field, value)
+        fixed.append(service)
+    Service.objects.bulk_update(fixed, Service.RATING_FIELDS, batch_size=batch_size)
+    return len(fixed)
+
+
+def ranking_mismatches():
+    """
+    ``(ids, recent_completed_bookings, ranking_scores)`` arrays with the
+    correct values of every service whose stored ranking fields differ,
+    computed for the whole catalog at once.
+    """
+    rows = list(Service.objects.order_by('pk').values_list(
+        'id', 'review_count', 'rating_sum', 'recent_completed_bookings', 'ranking_score',
+    ))
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([])
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    review_counts, rating_sums, stored_bookings, stored_scores = np.array([row[1:] for row in rows], dtype=np.float64).T
+
+    recent = (
+        Booking.objects.filter(status=Booking.BookingStatus.COMPLETED, booking_date__gte=ranking.recent_since())
+        .order_by().values_list('service_id').annotate(count=Count('id'))
+    )
+    bookings = np.zeros(len(ids), dtype=np.int64)
+    if recent:
+        service_ids, counts = np.array(list(recent), dtype=np.int64).T
+        bookings[np.searchsorted(ids, service_ids)] = counts
+
+    scores = ranking.scores(review_counts, rating_sums, bookings)
+    stale = (bookings != stored_bookings) | ~np.isclose(scores, stored_scores, rtol=0, atol=1e-9)
+    return ids[stale], bookings[stale], scores[stale]
+
+
+def recompute_ranking(batch_size=2000):
+    """Rewrite the ranking fields of every stale service; returns how many were fixed."""
+    ids, bookings, scores = ranking_mismatches()
+    fixed = [
+        Service(pk=pk, recent_completed_bookings=count, ranking_score=score)
+        for pk, count, score in zip(ids.tolist(), bookings.tolist(), scores.tolist())
+    ]
+    Service.objects.bulk_update(fixed, Service.RANKING_FIELDS, batch_size=batch_size)
+    return len(fixed)
@@ -0,0 +1,147 @@
+"""
+Response cache for the public catalog endpoints.
+
+GET responses of the views using CachedResponseMixin are stored, fully
+rendered, in the CATALOG_CACHE_ALIAS cache under a key made of a catalog
+version, the renderer format, the scheme and host, the path and the
+normalized query string. The host and scheme are part of the key because
+paginated bodies hold absolute next/previous links.
+Any write that can change what those endpoints return (a Service, Category,
+Review or provider saved or deleted; see services/signals.py) bumps the
+version, so stale entries are never read again and simply expire.
+
+Hits, misses and invalidations are counted in the same cache, so the
+figures cover every worker sharing it (see ``stats()``).
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+VERSION_KEY = 'catalog:version'
+CHANGED_AT_KEY = 'catalog:changed_at'
+STATS_KEYS = {
+    'hits': 'catalog:stats:hits',
+    'misses': 'catalog:stats:misses',
+    'invalidations': 'catalog:stats:invalidations',
+}
+# Headers added by the view itself; everything else (CORS, cookies, Vary) is
+# added by middleware on the way out and must not be replayed.
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Allow')
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def _incr(key, delta=1):
+    cache = _cache()
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Missing (never set or evicted); add() keeps a concurrent first write.
+        if cache.add(key, delta, timeout=None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def current_version():
+    return _cache().get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def changed_at():
+    """
+    When the catalog version last changed, as a Unix timestamp. If that was
+    not recorded (or was evicted), now: a later time only costs a full response.
+    """
+    return _cache().get_or_set(CHANGED_AT_KEY, time.time, timeout=None)
+
+
+def invalidate():
+    """Make every cached catalog response stale."""
+    _cache().set(CHANGED_AT_KEY, time.time(), timeout=None)
+    _incr(VERSION_KEY)
+    _incr(STATS_KEYS['invalidations'])
+
+
+def stats():
+    values = _cache().get_many(list(STATS_KEYS.values()))
+    counts = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    lookups = counts['hits'] + counts['misses']
+    counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else None
+    counts['version'] = current_version()
+    return counts
+
+
+def reset_stats():
+    _cache().delete_many(list(STATS_KEYS.values()))
+
+
+def cache_key(request, version):
+    """
+    Key for a request: its scheme, host and path, with empty parameters
+    dropped and the parameters and values sorted.
+    """
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values if value != ''
+    )
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = f'{getattr(renderer, "format", "")}|{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}'
+    return f'catalog:{version}:{hashlib.sha1(raw.encode("utf-8")).hexdigest()}'
+
+
+def get(key):
+    entry = _cache().get(key)
+    _incr(STATS_KEYS['hits' if entry is not None else 'misses'])
+    if entry is None:
+        return None
+    status, headers, content = entry
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+def store(key, response):
+    headers = [(name, response[name]) for name in CACHED_HEADERS if response.has_header(name)]
+    _cache().set(
+        key,
+        (response.status_code, headers, response.content),
+        getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300),
+    )
+
+
+class CachedResponseMixin:
+    """
+    Serve GET requests from the catalog response cache.
+
+    Authentication, permissions and content negotiation still run first, so
+    a cached body is only returned to requests that would have been allowed
+    to see it, in the format they asked for. Only 200 responses are stored.
+    Views can turn the cache off by overriding ``use_response_cache()``.
+    """
+
+    def use_response_cache(self):
+        return True
+
+    def get(self, request, *args, **kwargs):
+        if not self.use_response_cache():
+            return super().get(request, *args, **kwargs)
+        key = cache_key(request, current_version())
+        cached = get(key)
+        if cached is not None:
+            # Validators stored with the body (see services/conditional.py) still apply.
+            last_modified = parse_http_date_safe(cached.get('Last-Modified', ''))
+            not_modified = get_conditional_response(request, etag=cached.get('ETag'), last_modified=last_modified)
+            return not_modified if not_modified is not None else cached
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response.add_post_render_callback(lambda rendered: store(key, rendered))
+        return response
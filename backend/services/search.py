@@ -0,0 +1,384 @@
+"""
+Full-text search over services.
+
+Each service's title, description and category name are kept in a search
+index that lives next to the service table:
+
+- SQLite: an FTS5 virtual table ``services_service_fts`` (rowid = service id),
+  ranked with bm25() and highlighted with highlight()/snippet().
+- PostgreSQL: a ``services_service_search`` table holding a weighted tsvector
+  per service behind a GIN index, ranked with ts_rank_cd() and highlighted
+  with ts_headline().
+- Any other database falls back to case-insensitive substring matching.
+
+The index is created by migration 0005, kept in sync by the signal handlers in
+services/signals.py and can be rebuilt in bulk with
+``python manage.py rebuild_search_index``.
+
+Every write is a single INSERT ... SELECT over the service/category join, so
+the index always reflects what is in the database and reindexing many
+services costs one statement.
+
+Highlights are HTML. The database marks matches with the STX/ETX control
+characters, the text is then HTML-escaped in Python and only those marks
+become ``<mark>``/``</mark>``, so markup in a title or description comes back
+escaped rather than as markup.
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Category, Service
+
+SERVICE_TABLE = Service._meta.db_table
+CATEGORY_TABLE = Category._meta.db_table
+FTS_TABLE = 'services_service_fts'
+PG_TABLE = 'services_service_search'
+
+# Match delimiters passed to highlight()/snippet()/ts_headline() (STX/ETX)
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Split user input into plain word terms (drops all query syntax)."""
+    return _TERM_RE.findall(query.lower())[:16]
+
+
+def highlight_html(text):
+    """HTML-escape highlighted text from the database and mark its matches."""
+    if text is None:
+        return None
+    return html.escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+class SearchHit:
+    def __init__(self, service_id, rank, title, snippet):
+        self.service_id = service_id
+        self.rank = rank
+        self.title = highlight_html(title)
+        self.snippet = highlight_html(snippet)
+
+
+class SubstringSearchBackend:
+    """Fallback for databases without a full-text index."""
+
+    def create_index(self, schema_editor):
+        pass
+
+    def drop_index(self, schema_editor):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def index_services(self, service_ids):
+        pass
+
+    def index_category(self, category_id):
+        pass
+
+    def remove_services(self, service_ids):
+        pass
+
+    def filter(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query):
+            condition &= (
+                Q(title__icontains=term) |
+                Q(description__icontains=term) |
+                Q(category__name__icontains=term)
+            )
+        return queryset.filter(condition)
+
+    def annotate_rank(self, queryset, query):
+        return queryset.annotate(search_rank=RawSQL('0', []))
+
+    def count(self, query):
+        return self.filter(Service.objects.all(), query).count()
+
+    def search(self, query, limit, offset=0):
+        ids = self.filter(Service.objects.order_by('-created_at', '-id'), query).values_list('id', flat=True)
+        return [SearchHit(pk, 0.0, None, None) for pk in ids[offset:offset + limit]]
+
+
+class SQLiteSearchBackend(SubstringSearchBackend):
+    """FTS5 index; every term is matched as a prefix so partial words work."""
+
+    # bm25 column weights: title, description, category name
+    BM25 = f"bm25({FTS_TABLE}, 10.0, 1.0, 4.0)"
+    SOURCE_SQL = (
+        f"SELECT s.id, s.title, s.description, COALESCE(c.name, '') "
+        f"FROM {SERVICE_TABLE} s LEFT JOIN {CATEGORY_TABLE} c ON c.id = s.category_id"
+    )
+
+    def match_expression(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"title, description, category_name, "
+            f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, title, description, category_name) {self.SOURCE_SQL}")
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+    def index_services(self, service_ids):
+        service_ids = list(service_ids)
+        if not service_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(service_ids))
+        with connection.cursor() as cursor:
+            # FTS5 replaces the row with the same rowid, so this is one statement
+            cursor.execute(
+                f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, description, category_name) "
+                f"{self.SOURCE_SQL} WHERE s.id IN ({placeholders})",
+                service_ids,
+            )
+
+    def index_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {FTS_TABLE} SET category_name = COALESCE("
+                f"(SELECT name FROM {CATEGORY_TABLE} WHERE id = %s), '') "
+                f"WHERE rowid IN (SELECT id FROM {SERVICE_TABLE} WHERE category_id = %s)",
+                [category_id, category_id],
+            )
+
+    def remove_services(self, service_ids):
+        service_ids = list(service_ids)
+        if not service_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(service_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", service_ids)
+
+    def filter(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+
+    def annotate_rank(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return super().annotate_rank(queryset, query)
+        # bm25() is "lower is better"; negate it so every backend sorts rank descending.
+        return queryset.annotate(search_rank=RawSQL(
+            f"SELECT -{self.BM25} FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {SERVICE_TABLE}.id",
+            [match],
+        ))
+
+    def count(self, query):
+        match = self.match_expression(query)
+        if match is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit, offset=0):
+        match = self.match_expression(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -{self.BM25}, "
+                f"highlight({FTS_TABLE}, 0, %s, %s), "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY {self.BM25} LIMIT %s OFFSET %s",
+                [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match, limit, offset],
+            )
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(SubstringSearchBackend):
+    """Weighted tsvector per service behind a GIN index."""
+
+    CONFIG = 'english'
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('english', s.title), 'A') || "
+        "setweight(to_tsvector('english', COALESCE(c.name, '')), 'B') || "
+        "setweight(to_tsvector('english', s.description), 'C')"
+    )
+    SOURCE_SQL = (
+        f"SELECT s.id, {DOCUMENT_SQL} "
+        f"FROM {SERVICE_TABLE} s LEFT JOIN {CATEGORY_TABLE} c ON c.id = s.category_id"
+    )
+    HEADLINE_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, HighlightAll=true'
+    SNIPPET_OPTIONS = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8'
+
+    def tsquery(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+            f"service_id bigint PRIMARY KEY REFERENCES {SERVICE_TABLE}(id) ON DELETE CASCADE "
+            f"DEFERRABLE INITIALLY DEFERRED, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_idx ON {PG_TABLE} USING GIN (document)"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {PG_TABLE}")
+            cursor.execute(f"INSERT INTO {PG_TABLE} (service_id, document) {self.SOURCE_SQL}")
+
+    def index_services(self, service_ids):
+        service_ids = list(service_ids)
+        if not service_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (service_id, document) {self.SOURCE_SQL} WHERE s.id = ANY(%s) "
+                f"ON CONFLICT (service_id) DO UPDATE SET document = EXCLUDED.document",
+                [service_ids],
+            )
+
+    def index_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {PG_TABLE} (service_id, document) {self.SOURCE_SQL} WHERE s.category_id = %s "
+                f"ON CONFLICT (service_id) DO UPDATE SET document = EXCLUDED.document",
+                [category_id],
+            )
+
+    def remove_services(self, service_ids):
+        service_ids = list(service_ids)
+        if not service_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE service_id = ANY(%s)", [service_ids])
+
+    def filter(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return queryset
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT service_id FROM {PG_TABLE} WHERE document @@ to_tsquery('{self.CONFIG}', %s)",
+            [tsquery],
+        ))
+
+    def annotate_rank(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return super().annotate_rank(queryset, query)
+        return queryset.annotate(search_rank=RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('{self.CONFIG}', %s)) FROM {PG_TABLE} "
+            f"WHERE {PG_TABLE}.service_id = {SERVICE_TABLE}.id",
+            [tsquery],
+        ))
+
+    def count(self, query):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {PG_TABLE} WHERE document @@ to_tsquery('{self.CONFIG}', %s)",
+                [tsquery],
+            )
+            return cursor.fetchone()[0]
+
+    def search(self, query, limit, offset=0):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return []
+        with connection.cursor() as cursor:
+            # Rank and page first, then build headlines for the returned rows only.
+            cursor.execute(
+                f"WITH hits AS ("
+                f"  SELECT d.service_id, ts_rank_cd(d.document, q) AS rank, q "
+                f"  FROM {PG_TABLE} d, to_tsquery('{self.CONFIG}', %s) q "
+                f"  WHERE d.document @@ q ORDER BY rank DESC, d.service_id DESC LIMIT %s OFFSET %s"
+                f") "
+                f"SELECT h.service_id, h.rank, "
+                f"ts_headline('{self.CONFIG}', s.title, h.q, %s), "
+                f"ts_headline('{self.CONFIG}', s.description, h.q, %s) "
+                f"FROM hits h JOIN {SERVICE_TABLE} s ON s.id = h.service_id "
+                f"ORDER BY h.rank DESC, h.service_id DESC",
+                [tsquery, limit, offset, self.HEADLINE_OPTIONS, self.SNIPPET_OPTIONS],
+            )
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(conn=None):
+    """Return the search backend for the given (default) database connection."""
+    vendor = (conn or connection).vendor
+    return _BACKENDS.get(vendor, SubstringSearchBackend)()
+
+
+class SearchResults:
+    """
+    Lazy, sliceable view of a full-text query for DRF's paginator.
+
+    Slicing runs one ranked query for the requested window and loads the
+    matching services with their provider and category in one more query.
+    Each service gets ``search_rank`` and ``search_highlight`` attributes.
+    """
+
+    def __init__(self, query, queryset=None, backend=None):
+        self.query = query
+        self.queryset = queryset if queryset is not None else Service.objects.select_related('provider', 'category')
+        self.backend = backend or get_search_backend()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return iter(self[0:self.count()])
+
+    def __getitem__(self, window):
+        if not isinstance(window, slice):
+            raise TypeError('SearchResults only supports slicing.')
+        start = window.start or 0
+        stop = window.stop if window.stop is not None else self.count()
+        hits = self.backend.search(self.query, limit=max(0, stop - start), offset=start)
+        services = self.queryset.in_bulk([hit.service_id for hit in hits])
+        results = []
+        for hit in hits:
+            service = services.get(hit.service_id)
+            if service is None:
+                continue
+            service.search_rank = hit.rank
+            service.search_highlight = {'title': hit.title, 'description': hit.snippet}
+            results.append(service)
+        return results
@@ -1,8 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from .models import Category, Service, Booking, Review, Complaint
+from .models import AvailabilityWindow, Category, Service, Booking, Review, Complaint
+from .availability import check_booking, lock_provider
+from .transitions import check_transition, transition
 from users.serializers import CustomUserSerializer
+from api.sparse import SparseFieldsMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug']
@@ -22,7 +29,7 @@ class CategorySerializer(serializers.ModelSerializer):
             validated_data['slug'] = slugify(validated_data['name'])
         return super().update(instance, validated_data)
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     provider = serializers.HiddenField(default=serializers.CurrentUserDefault())
     provider_details = CustomUserSerializer(source='provider', read_only=True)
     category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
@@ -43,8 +50,12 @@ class ServiceSerializer(serializers.ModelSerializer):
             'category_details',
             'average_rating',
             'review_count',
+            'duration_minutes',
+            'latitude',
+            'longitude',
             'created_at',
         ]
+        property_sources = {'average_rating': ('review_count', 'rating_sum')}
         
     def validate_provider(self, value):
         """
@@ -53,10 +64,79 @@ class ServiceSerializer(serializers.ModelSerializer):
         if value.role != 'PROVIDER':
             raise serializers.ValidationError("Only users with the 'PROVIDER' role can create services.")
         return value
+
+    def validate(self, data):
+        validate_location(data, self.instance)
+        return data
     
-class BookingSerializer(serializers.ModelSerializer):
+def validate_location(data, instance=None):
+    """A location needs both coordinates (or neither, to clear it)."""
+    if 'latitude' not in data and 'longitude' not in data:
+        return
+    latitude = data.get('latitude', getattr(instance, 'latitude', None))
+    longitude = data.get('longitude', getattr(instance, 'longitude', None))
+    if (latitude is None) != (longitude is None):
+        raise serializers.ValidationError({
+            'longitude' if longitude is None else 'latitude': 'Latitude and longitude must be given together.'
+        })
+
+class ServiceNearbySerializer(ServiceSerializer):
+    """A service plus its distance from the ?near= point (see services/geo.py)."""
+    distance_km = serializers.FloatField(read_only=True)
+
+    class Meta(ServiceSerializer.Meta):
+        fields = ServiceSerializer.Meta.fields + ['distance_km']
+        annotation_fields = ('distance_km',)
+
+class ServiceSimilarSerializer(ServiceSerializer):
+    """A service plus its similarity to the service it is listed for (see services/similarity.py)."""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(ServiceSerializer.Meta):
+        fields = ServiceSerializer.Meta.fields + ['similarity']
+        annotation_fields = ('similarity',)
+
+class ServiceSearchResultSerializer(ServiceSerializer):
+    """A service plus its relevance and highlighted title/description snippet."""
+    search_rank = serializers.FloatField(read_only=True)
+    search_highlight = serializers.DictField(read_only=True)
+
+    class Meta(ServiceSerializer.Meta):
+        fields = ServiceSerializer.Meta.fields + ['search_rank', 'search_highlight']
+
+class ServiceImportSerializer(serializers.ModelSerializer):
+    """
+    One item of a bulk import (see services/bulk.py). Items with an ``id``
+    update that service (partially); items without one create a service.
+    Categories and the provider's services are looked up once per import
+    and passed in the context as ``categories`` and ``services``.
+    """
+    id = serializers.IntegerField(required=False)
+    category = serializers.IntegerField()
+
+    class Meta:
+        model = Service
+        fields = ['id', 'title', 'description', 'price', 'category', 'duration_minutes', 'latitude', 'longitude']
+
+    def validate(self, data):
+        validate_location(data, self.context['services'].get(data.get('id')))
+        return data
+
+    def validate_id(self, value):
+        if value not in self.context['services']:
+            raise serializers.ValidationError('No service of yours has this id.')
+        return value
+
+    def validate_category(self, value):
+        category = self.context['categories'].get(value)
+        if category is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return category
+
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     seeker = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    # The provider and category are needed by validate() and service_details
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.select_related('provider', 'category'))
     
     # Read-only fields for detail
     service_details = ServiceSerializer(source='service', read_only=True)
@@ -70,6 +150,8 @@ class BookingSerializer(serializers.ModelSerializer):
             'seeker',
             'status',
             'booking_date',
+            'duration_minutes',
+            'end_date',
             'service_details',
             'seeker_details',
             'created_at',
@@ -92,6 +174,50 @@ class BookingSerializer(serializers.ModelSerializer):
             
         return data
 
+    def create(self, validated_data):
+        """
+        Check that the provider is free, with their bookings locked. New
+        bookings are always PENDING; only services/transitions.py moves them on.
+        """
+        service = validated_data['service']
+        start = validated_data['booking_date']
+        validated_data['status'] = Booking.BookingStatus.PENDING
+        with transaction.atomic():
+            lock_provider(service.provider_id)
+            check_booking(service.provider_id, start, start + timedelta(minutes=service.duration_minutes))
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        """
+        Change the status through services/transitions.py, and check the
+        provider is free again when the booking moves or changes service.
+        """
+        # The seeker is set on create only: on update the hidden field holds
+        # whoever sends the request, possibly the provider
+        validated_data.pop('seeker', None)
+        service = validated_data.get('service', instance.service)
+        start = validated_data.get('booking_date', instance.booking_date)
+        status = validated_data.pop('status', instance.status)
+        request = self.context.get('request')
+        if status != instance.status:
+            check_transition(instance, status, request.user if request else None)
+        if service.pk != instance.service_id:
+            instance.duration_minutes = service.duration_minutes
+        moved = service.pk != instance.service_id or start != instance.booking_date
+        with transaction.atomic():
+            if status in Booking.ACTIVE_STATUSES and moved:
+                lock_provider(service.provider_id)
+                end = start + timedelta(minutes=instance.duration_minutes)
+                check_booking(service.provider_id, start, end, exclude=instance.pk)
+            if status != instance.status:
+                transition(instance, status, request.user if request else None)
+            if validated_data:
+                # Only the changed columns, so a stale status is never written back
+                for field, value in validated_data.items():
+                    setattr(instance, field, value)
+                instance.save(update_fields=[*validated_data, 'duration_minutes', 'updated_at'])
+        return instance
+
     def validate_seeker(self, value):
         """
         Check that the user creating the booking is a SEEKER.
@@ -102,9 +228,42 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Only users with the 'SEEKER' role can create bookings.")
         return value
 
-class ReviewSerializer(serializers.ModelSerializer):
+class BookingBulkStatusSerializer(serializers.Serializer):
+    """The request body of ``POST /api/bookings/bulk-status/``."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=settings.BOOKING_BULK_MAX_IDS,
+    )
+    status = serializers.ChoiceField(choices=Booking.BookingStatus.choices)
+
+class AvailabilityWindowSerializer(serializers.ModelSerializer):
+    """A weekly availability window of the logged-in provider."""
+    provider = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
+    class Meta:
+        model = AvailabilityWindow
+        fields = ['id', 'provider', 'weekday', 'start_time', 'end_time']
+
+    def validate(self, data):
+        """Windows must end after they start and not overlap the provider's other windows that day."""
+        weekday = data.get('weekday', getattr(self.instance, 'weekday', None))
+        start = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start >= end:
+            raise serializers.ValidationError({'end_time': 'Must be after start_time.'})
+        provider = data.get('provider') or self.instance.provider
+        others = AvailabilityWindow.objects.filter(
+            provider=provider, weekday=weekday, start_time__lt=end, end_time__gt=start,
+        )
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if others.exists():
+            raise serializers.ValidationError('This window overlaps another of your windows on the same day.')
+        return data
+
+class ReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     seeker = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all())
+    # The provider is loaded with the service for the new review notification
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.select_related('provider'))
     seeker_details = CustomUserSerializer(source='seeker', read_only=True)
     service_details = ServiceSerializer(source='service', read_only=True)
 
@@ -146,7 +305,26 @@ class ReviewSerializer(serializers.ModelSerializer):
         
         return data
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class ProviderReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """A review in a provider's feed: the reviewed service is named, not embedded."""
+    service_title = serializers.CharField(source='service.title', read_only=True)
+    seeker_details = CustomUserSerializer(source='seeker', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = [
+            'id',
+            'service',
+            'service_title',
+            'seeker_details',
+            'rating',
+            'comment',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = ['service', 'rating', 'comment', 'created_at', 'updated_at']
+
+class ComplaintSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), required=False, allow_null=True)
     booking = serializers.PrimaryKeyRelatedField(queryset=Booking.objects.all(), required=False, allow_null=True)
@@ -0,0 +1,142 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import CustomUser
+from . import ratings, response_cache
+from .models import Booking, Category, Review, Service, SimilarServiceUpdate
+from .search import get_search_backend
+from .typeahead import typeahead
+
+
+@receiver(post_save, sender=Service)
+def index_saved_service(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index_services([instance.pk])
+
+
+@receiver(post_delete, sender=Service)
+def unindex_deleted_service(sender, instance, **kwargs):
+    get_search_backend().remove_services([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_services(sender, instance, created, raw=False, **kwargs):
+    """A renamed category changes the searchable text of all its services."""
+    if not created and not raw:
+        get_search_backend().index_category(instance.pk)
+
+
+@receiver(pre_delete, sender=Category)
+def clear_deleted_category(sender, instance, **kwargs):
+    """
+    Deleting a category sets its services' category to NULL with a bulk UPDATE
+    that sends no signals, so reindex them while they can still be found.
+    """
+    service_ids = list(instance.services.values_list('id', flat=True))
+    if service_ids:
+        instance._search_reindex_ids = service_ids
+
+
+@receiver(post_delete, sender=Category)
+def reindex_uncategorized_services(sender, instance, **kwargs):
+    service_ids = getattr(instance, '_search_reindex_ids', None)
+    if service_ids:
+        get_search_backend().index_services(service_ids)
+
+
+# The typeahead index lives in memory: change it only once the write is committed
+
+@receiver(post_save, sender=Service)
+def update_service_suggestion(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        renamed = created or instance.loaded_title != instance.title
+        instance._loaded_title = instance.title
+        transaction.on_commit(lambda: typeahead.update_services([instance], titles_changed=renamed))
+
+
+@receiver(post_delete, sender=Service)
+def remove_service_suggestion(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead.remove_service(pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_suggestion(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: typeahead.update_category(instance))
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestion(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead.remove_category(pk))
+
+
+# Similar services are recomputed from a queue by manage.py build_similar_services
+
+SIMILARITY_FIELDS = {'title', 'description', 'category', 'category_id'}
+
+
+@receiver(post_save, sender=Service)
+def queue_similar_services(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or SIMILARITY_FIELDS & set(update_fields)):
+        SimilarServiceUpdate.queue([instance.pk])
+
+
+@receiver(pre_delete, sender=Service)
+def queue_similar_services_of_deleted(sender, instance, **kwargs):
+    SimilarServiceUpdate.queue_referrers(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def queue_renamed_category_services(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        SimilarServiceUpdate.queue(list(instance.services.values_list('id', flat=True)))
+
+
+@receiver(post_delete, sender=Category)
+def queue_uncategorized_services(sender, instance, **kwargs):
+    SimilarServiceUpdate.queue(getattr(instance, '_search_reindex_ids', None))
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        ratings.review_saved(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_deleted_review(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
+
+
+@receiver(post_save, sender=Booking)
+def count_saved_booking(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        ratings.booking_saved(instance, created)
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_deleted_booking(sender, instance, **kwargs):
+    ratings.booking_deleted(instance)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_catalog_cache(sender, **kwargs):
+    response_cache.invalidate()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_catalog_cache_for_provider(sender, instance, update_fields=None, **kwargs):
+    """Provider details are embedded in every service; other users never appear in the catalog."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    if instance.role == CustomUser.Role.PROVIDER or instance.services.exists():
+        response_cache.invalidate()
@@ -0,0 +1,211 @@
+"""
+"Similar services" recommendations (``GET /api/services/<pk>/similar/``).
+
+Every service is turned into a TF-IDF vector over the words of its title
+(counted twice), description and category name: a sparse matrix with one
+L2-normalized row per service, so the cosine similarity of two services is
+the dot product of their rows. ``manage.py build_similar_services`` then
+multiplies blocks of rows by the whole matrix, keeps the SIMILAR_SERVICES_COUNT
+best columns of each row with ``argpartition`` and stores them as
+SimilarService rows.
+
+Catalog changes queue the services they affect (SimilarServiceUpdate, from
+services/signals.py and the bulk import). Without ``--full`` the command
+only recomputes the queued services, plus the services whose stored lists a
+queued service enters or leaves, against the current vectors. The IDF
+weights themselves only change on a full rebuild, which is worth running
+now and then (nightly, say).
+"""
+import re
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from scipy import sparse
+
+from . import response_cache
+from .models import Service, SimilarService, SimilarServiceUpdate
+
+_WORD = re.compile(r'[^\W\d_]{2,}')
+STOP_WORDS = frozenset('''
+    a an and are as at be by for from has have i in is it its my of on or our so that the this
+    to was we will with you your yours all any can do get more most no not off out up very
+'''.split())
+TITLE_WEIGHT = 2
+# Words in fewer services than this carry no signal and are left out of the
+# vocabulary. So are words in more than MAX_DOCUMENT_SHARE of the services once
+# that is more than COMMON_WORD_MIN_SERVICES services: a word in n services adds
+# n² products to a rebuild, so in a large catalog the common words are most of
+# its cost, while in a small one they are most of what the services share (a
+# category name, say).
+MIN_DOCUMENT_FREQUENCY = 2
+MAX_DOCUMENT_SHARE = 0.1
+COMMON_WORD_MIN_SERVICES = 1000
+# Neighbours scoring below this are not worth showing
+MIN_SCORE = 0.05
+# Cells of the dense similarity block computed at once (float32: 4 bytes each)
+BLOCK_CELLS = 2 ** 25
+WRITE_BATCH_SIZE = 5000
+
+
+def words(title, description, category):
+    text = f'{title} ' * TITLE_WEIGHT + f'{description} {category or ""}'
+    return [word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS]
+
+
+class Vectors:
+    """The TF-IDF matrix of the catalog: row ``i`` is the service ``ids[i]``."""
+
+    def __init__(self, ids, matrix):
+        self.ids = ids
+        self.matrix = matrix
+        self.rows = {pk: row for row, pk in enumerate(ids.tolist())}
+
+    @classmethod
+    def load(cls):
+        rows = (
+            Service.objects.order_by('id')
+            .values_list('id', 'title', 'description', 'category__name')
+            .iterator(chunk_size=WRITE_BATCH_SIZE)
+        )
+        ids, vocabulary, indptr, indices = [], {}, [0], []
+        for pk, title, description, category in rows:
+            ids.append(pk)
+            for word in words(title, description, category):
+                indices.append(vocabulary.setdefault(word, len(vocabulary)))
+            indptr.append(len(indices))
+        shape = (len(ids), len(vocabulary))
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=shape,
+        )
+        counts.sum_duplicates()  # one entry per (service, word) with its count
+        return cls(np.array(ids, dtype=np.int64), tf_idf(counts))
+
+
+def tf_idf(counts):
+    """Sublinear TF times smoothed IDF, pruned of rare and ubiquitous words, rows L2-normalized."""
+    services = counts.shape[0]
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    most = max(MAX_DOCUMENT_SHARE * services, COMMON_WORD_MIN_SERVICES)
+    keep = (document_frequency >= MIN_DOCUMENT_FREQUENCY) & (document_frequency <= most)
+    counts = counts[:, np.flatnonzero(keep)].tocsr()
+    idf = (np.log((1 + services) / (1 + document_frequency[keep])) + 1).astype(np.float32)
+    weights = counts.copy()
+    weights.data = 1 + np.log(weights.data)
+    weights = weights @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ weights, dtype=np.float32)
+
+
+def nearest(vectors, rows, count):
+    """
+    Yield ``(row, neighbour rows, scores)`` for each of ``rows``, best first,
+    computing the similarities of a block of rows to every service at once.
+    """
+    matrix = vectors.matrix
+    transposed = matrix.T.tocsr()
+    services = matrix.shape[0]
+    block = max(1, BLOCK_CELLS // max(services, 1))
+    count = min(count, services - 1)
+    if count <= 0:
+        return
+    for start in range(0, len(rows), block):
+        chunk = np.asarray(rows[start:start + block])
+        scores = (matrix[chunk] @ transposed).toarray()
+        scores[np.arange(len(chunk)), chunk] = -1  # a service is not similar to itself
+        best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind='stable')
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        for row, neighbours, row_scores in zip(chunk.tolist(), best, best_scores):
+            keep = row_scores >= MIN_SCORE
+            yield row, neighbours[keep], row_scores[keep]
+
+
+def _entries(vectors, rows, count):
+    for row, neighbours, scores in nearest(vectors, rows, count):
+        service_id = int(vectors.ids[row])
+        for rank, (neighbour, score) in enumerate(zip(vectors.ids[neighbours].tolist(), scores.tolist()), start=1):
+            yield SimilarService(service_id=service_id, similar_id=neighbour, rank=rank, score=score)
+
+
+def _write(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == WRITE_BATCH_SIZE:
+            SimilarService.objects.bulk_create(batch)
+            batch = []
+    SimilarService.objects.bulk_create(batch)
+
+
+def rebuild(count=None):
+    """Recompute every service's similar services. Returns timing figures."""
+    count = count or settings.SIMILAR_SERVICES_COUNT
+    queued_before = timezone.now()
+    started = time.perf_counter()
+    vectors = Vectors.load()
+    loaded = time.perf_counter()
+    with transaction.atomic():
+        SimilarService.objects.all().delete()
+        _write(_entries(vectors, list(range(len(vectors.ids))), count))
+        SimilarServiceUpdate.objects.filter(queued_at__lte=queued_before).delete()
+    response_cache.invalidate()
+    return {
+        'services': len(vectors.ids),
+        'words': vectors.matrix.shape[1],
+        'vectorize_seconds': loaded - started,
+        'neighbours_seconds': time.perf_counter() - loaded,
+    }
+
+
+def update(count=None):
+    """
+    Recompute the queued services and every service whose stored list a
+    queued service now enters or leaves. Returns the number recomputed.
+    """
+    count = count or settings.SIMILAR_SERVICES_COUNT
+    started = timezone.now()
+    queue = list(SimilarServiceUpdate.objects.values_list('service_id', flat=True))
+    if not queue:
+        return 0
+    vectors = Vectors.load()
+    changed = [vectors.rows[pk] for pk in queue if pk in vectors.rows]
+
+    # The weakest score on each stored list: a changed service beating it enters that list
+    threshold = np.full(len(vectors.ids), MIN_SCORE, dtype=np.float32)
+    stored = (
+        SimilarService.objects.order_by().values('service_id')
+        .annotate(weakest=Min('score'), entries=Count('id'))
+        .values_list('service_id', 'weakest', 'entries')
+    )
+    for service_id, weakest, entries in stored:
+        row = vectors.rows.get(service_id)
+        if row is not None and entries >= min(count, len(vectors.ids) - 1):
+            threshold[row] = max(weakest, MIN_SCORE)
+    affected = set(changed)
+    if changed:
+        # Best score of any changed service per service, kept sparse
+        scores = (vectors.matrix @ vectors.matrix[changed].T).max(axis=1).toarray().ravel()
+        affected.update(np.flatnonzero(scores > threshold).tolist())
+    # Lists the changed services are on now, with scores that may no longer hold
+    referrers = SimilarService.objects.filter(similar_id__in=queue).values_list('service_id', flat=True)
+    affected.update(vectors.rows[pk] for pk in referrers.distinct() if pk in vectors.rows)
+
+    rows = sorted(affected)
+    service_ids = vectors.ids[rows].tolist()
+    with transaction.atomic():
+        for start in range(0, len(service_ids), WRITE_BATCH_SIZE):
+            SimilarService.objects.filter(service_id__in=service_ids[start:start + WRITE_BATCH_SIZE]).delete()
+        _write(_entries(vectors, rows, count))
+        # Services queued again meanwhile stay queued
+        SimilarServiceUpdate.objects.filter(queued_at__lte=started).delete()
+    response_cache.invalidate()
+    return len(rows)
+
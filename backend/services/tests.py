@@ -1,3 +1,1364 @@
-from django.test import TestCase
+import base64
+import datetime
+import json
+import math
+import random
+import threading
+import time
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from scipy import sparse
+
+from users.models import CustomUser
+from . import availability, geo, ranking, ratings, response_cache, similarity, transitions, typeahead
+from .models import AvailabilityWindow, Booking, BookingTransition, Category, Review, Service, SimilarServiceUpdate
+from .search import highlight_html
+
+
+def make_provider(email='provider@example.com', **fields):
+    return CustomUser.objects.create(email=email, role='PROVIDER', firebase_uid=email, **fields)
+
+
+def make_seeker(email='seeker@example.com', **fields):
+    return CustomUser.objects.create(email=email, role='SEEKER', firebase_uid=email, **fields)
+
+
+class CatalogTestCase(TestCase):
+    """A provider, a category and an API client, with the catalog caches emptied."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.provider = make_provider()
+        self.category = Category.objects.create(name='Electrical', slug='electrical')
+        self.client = APIClient()
+
+    def make_service(self, title='Solar install', price='1000', **fields):
+        fields.setdefault('provider', self.provider)
+        fields.setdefault('category', self.category)
+        fields.setdefault('description', 'Panels and wiring')
+        return Service.objects.create(title=title, price=Decimal(price), **fields)
+
+
+class SearchHighlightTests(CatalogTestCase):
+
+    def test_markup_in_the_text_is_escaped(self):
+        self.make_service(
+            title='Install <script>alert(1)</script> solar',
+            description='<img src=x onerror=alert(1)> solar panels',
+        )
+        response = self.client.get('/api/services/search/', {'q': 'solar'})
+        highlight = response.data['results'][0]['search_highlight']
+        self.assertEqual(highlight['title'], 'Install &lt;script&gt;alert(1)&lt;/script&gt; <mark>solar</mark>')
+        self.assertEqual(highlight['description'], '&lt;img src=x onerror=alert(1)&gt; <mark>solar</mark> panels')
+
+    def test_every_match_is_marked(self):
+        self.make_service(title='Solar & wiring: solar panels')
+        response = self.client.get('/api/services/search/', {'q': 'solar'})
+        self.assertEqual(
+            response.data['results'][0]['search_highlight']['title'],
+            '<mark>Solar</mark> &amp; wiring: <mark>solar</mark> panels',
+        )
+
+    def test_no_highlight(self):
+        self.assertIsNone(highlight_html(None))
+
+
+class SearchIndexTests(CatalogTestCase):
+
+    def search(self, q):
+        return [service['id'] for service in self.client.get('/api/services/search/', {'q': q}).data['results']]
+
+    def test_edit_reindexes_the_service(self):
+        service = self.make_service('Solar install')
+        self.client.force_authenticate(self.provider)
+        response = self.client.patch(f'/api/services/{service.pk}/', {'title': 'Gate welding'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.search('solar'), [])
+        self.assertEqual(self.search('weld'), [service.pk])
+
+
+class RatingAggregateTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service()
+        self.seeker = make_seeker()
+
+    def assertAggregates(self, service, histogram):
+        service.refresh_from_db()
+        count = sum(histogram.values())
+        total = sum(stars * n for stars, n in histogram.items())
+        self.assertEqual((service.review_count, service.rating_sum), (count, total))
+        self.assertEqual(service.rating_histogram, {stars: histogram.get(stars, 0) for stars in range(1, 6)})
+        self.assertEqual(service.average_rating, round(total / count, 2) if count else None)
+        self.assertAlmostEqual(service.ranking_score, ranking.scores([count], [total], [0])[0])
+
+    def post_review(self, seeker, rating, service=None):
+        self.client.force_authenticate(seeker)
+        response = self.client.post(
+            '/api/reviews/', {'service': (service or self.service).pk, 'rating': rating}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_create(self):
+        self.post_review(self.seeker, 4)
+        self.post_review(make_seeker('other@example.com'), 2)
+        self.assertAggregates(self.service, {4: 1, 2: 1})
+
+    def test_update_moves_the_rating(self):
+        pk = self.post_review(self.seeker, 4)
+        response = self.client.patch(f'/api/reviews/{pk}/', {'rating': 1}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertAggregates(self.service, {1: 1})
+
+        # Saving without changing the rating leaves the aggregates alone
+        self.client.patch(f'/api/reviews/{pk}/', {'comment': 'Fixed it'}, format='json')
+        self.assertAggregates(self.service, {1: 1})
+
+    def test_update_moves_the_review_to_another_service(self):
+        other = self.make_service('Gate welding')
+        review = Review.objects.create(service=self.service, seeker=self.seeker, rating=5)
+        review.service = other
+        review.rating = 3
+        review.save()
+        self.assertAggregates(self.service, {})
+        self.assertAggregates(other, {3: 1})
+
+    def test_delete(self):
+        pk = self.post_review(self.seeker, 5)
+        self.post_review(make_seeker('other@example.com'), 3)
+        self.client.force_authenticate(self.seeker)
+        response = self.client.delete(f'/api/reviews/{pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertAggregates(self.service, {3: 1})
+
+    def test_stale_service_save_keeps_the_aggregates(self):
+        stale = Service.objects.get(pk=self.service.pk)
+        Review.objects.create(service=self.service, seeker=self.seeker, rating=5)
+        stale.title = 'Solar install and repair'
+        stale.save()
+        self.assertAggregates(self.service, {5: 1})
+
+    def test_aggregates_match_a_recount(self):
+        seekers = [make_seeker(f'seeker{i}@example.com') for i in range(6)]
+        for seeker, rating in zip(seekers, (1, 2, 5, 5, 4, 3)):
+            Review.objects.create(service=self.service, seeker=seeker, rating=rating)
+        Review.objects.filter(seeker=seekers[0]).get().delete()
+        review = Review.objects.get(seeker=seekers[1])
+        review.rating = 4
+        review.save()
+        self.assertEqual(list(ratings.find_mismatches()), [])
+        self.assertAggregates(self.service, {3: 1, 4: 2, 5: 2})
+
+
+class KeysetPaginationTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Prices with ties, so the id tie-breaker decides the order within a price
+        self.services = [self.make_service(f'Service {i}', price) for i, price in enumerate(
+            ['500', '100', '300', '100', '500', '200', '100', '300', '500'],
+        )]
+        self.by_price = [s.pk for s in sorted(self.services, key=lambda s: (s.price, s.pk))]
+
+    def walk(self, url, link):
+        """Follow ``link`` ('next' or 'previous') from ``url``; return the pages of ids and the last response."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.data)
+            pages.append([service['id'] for service in response.data['results']])
+            last, url = response, response.data[link]
+        return pages, last
+
+    def test_forward_and_back_with_ties(self):
+        pages, last = self.walk('/api/services/?ordering=price&page_size=2', 'next')
+        self.assertEqual([pk for page in pages for pk in page], self.by_price)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 2, 1])
+
+        back, first = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(back, pages[-2::-1])
+        self.assertIsNone(first.data['previous'])
+
+    def test_newest_first_by_default(self):
+        pages, _last = self.walk('/api/services/?page_size=4', 'next')
+        self.assertEqual([pk for page in pages for pk in page], [s.pk for s in reversed(self.services)])
+
+    def test_rows_added_while_paging_are_not_repeated(self):
+        response = self.client.get('/api/services/?ordering=price&page_size=3')
+        seen = [service['id'] for service in response.data['results']]
+        cheapest = self.make_service('Cheapest', '50')
+        pages, _last = self.walk(response.data['next'], 'next')
+        rest = [pk for page in pages for pk in page]
+        self.assertEqual(seen + rest, self.by_price)
+        self.assertNotIn(cheapest.pk, rest)
+
+    def test_bad_cursors(self):
+        valid = self.client.get('/api/services/?ordering=price&page_size=2').data['next']
+        cursor = valid.split('cursor=')[1].split('&')[0]
+        position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))['p']
+        for bad in (
+            'not-base64!', encode_cursor([1, 2, 3]), encode_cursor({'p': position[:1]}),
+            encode_cursor({'p': ['not a price', position[1]]}),
+        ):
+            with self.subTest(cursor=bad):
+                response = self.client.get('/api/services/', {'ordering': 'price', 'cursor': bad})
+                self.assertEqual(response.status_code, 404)
+
+    def test_unpaginated(self):
+        response = self.client.get('/api/services/?ordering=price&paginate=false')
+        self.assertEqual([service['id'] for service in response.data], self.by_price)
+
+
+def encode_cursor(cursor):
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip('=')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com', 'www.example.com'])
+class ResponseCacheTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            self.make_service(f'Service {i}')
+
+    def test_links_follow_the_host_and_scheme(self):
+        first = self.client.get('/api/services/?page_size=2', HTTP_HOST='api.example.com')
+        other_host = self.client.get('/api/services/?page_size=2', HTTP_HOST='www.example.com')
+        secure = self.client.get('/api/services/?page_size=2', HTTP_HOST='api.example.com', secure=True)
+        self.assertTrue(first.json()['next'].startswith('http://api.example.com/api/services/'))
+        self.assertTrue(other_host.json()['next'].startswith('http://www.example.com/api/services/'))
+        self.assertTrue(secure.json()['next'].startswith('https://api.example.com/api/services/'))
+
+    def test_same_request_is_served_from_the_cache(self):
+        response_cache.reset_stats()
+        self.client.get('/api/services/?page_size=2&category=', HTTP_HOST='api.example.com')
+        self.client.get('/api/services/?page_size=2', HTTP_HOST='api.example.com')
+        self.assertEqual((response_cache.stats()['hits'], response_cache.stats()['misses']), (1, 1))
+
+    def test_writes_invalidate(self):
+        self.assertEqual(len(self.client.get('/api/services/?paginate=false').json()), 3)
+        self.make_service('Service 3')
+        self.assertEqual(len(self.client.get('/api/services/?paginate=false').json()), 4)
+
+
+class ConditionalGetTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service()
+        self.service.refresh_from_db()
+
+    def get(self, path, **headers):
+        return self.client.get(path, headers=headers)
+
+    def test_etag_and_last_modified(self):
+        for path in (f'/api/services/{self.service.pk}/', '/api/services/'):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(self.get(path, if_none_match=response['ETag']).status_code, 304)
+                self.assertEqual(self.get(path, if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_catalog_change_moves_last_modified(self):
+        for minutes, path in enumerate((f'/api/services/{self.service.pk}/', '/api/services/'), start=1):
+            with self.subTest(path=path):
+                response = self.get(path)
+                # Renaming the category changes the response but not the service's updated_at
+                later = time.time() + 60 * minutes
+                with mock.patch('services.response_cache.time.time', return_value=later):
+                    self.category.name = f'Electrical {path}'
+                    self.category.save()
+                self.assertEqual(Service.objects.get(pk=self.service.pk).updated_at, self.service.updated_at)
+                stale = self.get(path, if_modified_since=response['Last-Modified'])
+                self.assertEqual(stale.status_code, 200)
+                self.assertEqual(stale['Last-Modified'], http_date(int(later)))
+                self.assertEqual(self.get(path, if_none_match=response['ETag']).status_code, 200)
+
+    def test_embedded_seeker_change_moves_the_validators(self):
+        seeker = make_seeker()
+        booking = Booking.objects.create(service=self.service, seeker=seeker, booking_date=timezone.now())
+        review = Review.objects.create(service=self.service, seeker=seeker, rating=4)
+        self.client.force_authenticate(self.provider)
+        paths = (
+            '/api/bookings/', f'/api/bookings/{booking.pk}/', f'/api/reviews/?service={self.service.pk}',
+            f'/api/reviews/{review.pk}/', '/api/reviews/provider/',
+        )
+        for minutes, path in enumerate(paths, start=1):
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertEqual(response.status_code, 200)
+                # A seeker's new name is in seeker_details, but touches neither the
+                # listed rows nor the catalog version
+                version = response_cache.current_version()
+                later = timezone.now() + datetime.timedelta(minutes=minutes)
+                with mock.patch('django.utils.timezone.now', return_value=later):
+                    seeker.first_name = f'Renamed {minutes}'
+                    seeker.save()
+                self.assertEqual(response_cache.current_version(), version)
+                stale = self.get(path, if_none_match=response['ETag'])
+                self.assertEqual(stale.status_code, 200)
+                self.assertIn(f'Renamed {minutes}', stale.content.decode())
+                self.assertEqual(stale['Last-Modified'], http_date(int(later.timestamp())))
+                self.assertEqual(self.get(path, if_modified_since=response['Last-Modified']).status_code, 200)
+                self.assertEqual(self.get(path, if_none_match=stale['ETag']).status_code, 304)
+
+
+def haversine_km(latitude, longitude, other_latitude, other_longitude):
+    lat, other_lat = math.radians(latitude), math.radians(other_latitude)
+    half_chord = (
+        math.sin((other_lat - lat) / 2) ** 2
+        + math.cos(lat) * math.cos(other_lat) * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(half_chord))
+
+
+def destination(latitude, longitude, bearing, distance_km):
+    """The point ``distance_km`` from the start along ``bearing`` (degrees)."""
+    lat, bearing = math.radians(latitude), math.radians(bearing)
+    angle = distance_km / geo.EARTH_RADIUS_KM
+    other_lat = math.asin(math.sin(lat) * math.cos(angle) + math.cos(lat) * math.sin(angle) * math.cos(bearing))
+    delta_lon = math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat),
+        math.cos(angle) - math.sin(lat) * math.sin(other_lat),
+    )
+    return math.degrees(other_lat), wrap_longitude(longitude + math.degrees(delta_lon))
+
+
+def wrap_longitude(longitude):
+    return (longitude + 180.0) % 360.0 - 180.0
+
+
+class GeoRadiusTests(TestCase):
+    """Radius search through the geohash ranges against a brute-force haversine."""
+
+    QUERIES = [
+        (-1.2921, 36.8219, 10),    # Nairobi
+        (-1.2921, 36.8219, 500),
+        (0.0, 0.0, 5),             # the first split of every geohash, both ways
+        (-17.7134, 179.95, 25),    # Fiji, across the antimeridian
+        (-16.5, -179.98, 40),
+        (64.1466, -21.9426, 50),   # Reykjavik, cells much narrower in km
+        (89.9, 10.0, 30),          # the circle covers the North Pole
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(17)
+        points = []
+        for latitude, longitude, radius in cls.QUERIES:
+            points += cls.around(rng, latitude, longitude, radius)
+        provider = make_provider()
+        category = Category.objects.create(name='Electrical', slug='electrical')
+        Service.objects.bulk_create([
+            Service(
+                provider=provider, category=category, title='Service', description='', price=Decimal(1000),
+                latitude=latitude, longitude=longitude, geohash=geo.encode(latitude, longitude),
+            )
+            for latitude, longitude in points
+        ])
+        cls.points = {pk: location for pk, *location in Service.objects.values_list('id', 'latitude', 'longitude')}
+
+    @staticmethod
+    def around(rng, latitude, longitude, radius):
+        """Points scattered over twice the radius, on the circle and on the edges of the covering cells."""
+        points = [
+            destination(latitude, longitude, rng.uniform(0, 360), radius * 2 * math.sqrt(rng.random()))
+            for _ in range(300)
+        ]
+        for _ in range(100):
+            bearing = rng.uniform(0, 360)
+            points.append(destination(latitude, longitude, bearing, radius - 1e-4))
+            points.append(destination(latitude, longitude, bearing, radius + 1e-4))
+
+        south, west, north, east = geo.radius_box(latitude, longitude, radius)
+        height, width = geo.cell_size(len(geo.covering_cells(south, west, north, east)[0]))
+        for row in range(math.floor(south / height), math.floor(north / height) + 2):
+            for offset in (-1e-9, 0.0, 1e-9):
+                points += [(row * height + offset, wrap_longitude(rng.uniform(west, east))) for _ in range(5)]
+        for column in range(math.floor(west / width), math.floor(east / width) + 2):
+            for offset in (-1e-9, 0.0, 1e-9):
+                longitude = wrap_longitude(column * width + offset)
+                points += [(rng.uniform(south, north), longitude) for _ in range(5)]
+        return [(latitude, longitude) for latitude, longitude in points if -90 <= latitude <= 90]
+
+    def test_same_services_as_brute_force(self):
+        for latitude, longitude, radius in self.QUERIES:
+            with self.subTest(latitude=latitude, longitude=longitude, radius=radius):
+                distances = {pk: haversine_km(latitude, longitude, *location) for pk, location in self.points.items()}
+                expected = {pk for pk, distance in distances.items() if distance <= radius}
+                found = dict(geo.within_radius(
+                    Service.objects.all(), latitude, longitude, radius,
+                ).values_list('id', 'distance_km'))
+                self.assertGreater(len(expected), 100)
+                self.assertEqual(set(found), expected)
+                for pk, distance in found.items():
+                    self.assertAlmostEqual(distance, distances[pk], places=6)
+
+    def test_near_parameter_across_the_antimeridian(self):
+        caches['default'].clear()
+        latitude, longitude, radius = -17.7134, 179.95, 25
+        response = APIClient().get(
+            '/api/services/', {'near': f'{latitude},{longitude}', 'radius_km': radius, 'paginate': 'false'},
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        found = [service['id'] for service in response.data]
+        self.assertTrue(any(self.points[pk][1] < 0 for pk in found))
+        self.assertEqual(
+            set(found),
+            {pk for pk, location in self.points.items() if haversine_km(latitude, longitude, *location) <= radius},
+        )
+        distances = [service['distance_km'] for service in response.data]
+        self.assertEqual(distances, sorted(distances))
+
+
+@override_settings(TYPEAHEAD_MAX_STALENESS=60)
+class TypeaheadTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service('Solar install')
+        self.index = typeahead.Typeahead()
+        self.index.load()
+
+    def titles(self, query):
+        return [service['title'] for service in self.index.suggest(query, 5)[1]]
+
+    def later(self, seconds=61):
+        """Pretend ``seconds`` have passed since the index was loaded or checked."""
+        return mock.patch('services.typeahead.time.monotonic', return_value=time.monotonic() + seconds)
+
+    def test_only_indexed_changes_bump_the_version(self):
+        for field, value, bumps in (('price', Decimal('900'), False), ('title', 'Solar repair', True)):
+            with self.subTest(field=field):
+                version = typeahead.current_version()
+                service = Service.objects.get(pk=self.service.pk)
+                setattr(service, field, value)
+                with self.captureOnCommitCallbacks(execute=True):
+                    service.save()
+                self.assertEqual(typeahead.current_version() != version, bumps)
+
+        version = typeahead.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertNotEqual(typeahead.current_version(), version)
+
+        version = typeahead.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(service=self.service, seeker=make_seeker(), rating=5)
+        self.assertEqual(typeahead.current_version(), version)
+
+    def test_no_check_before_the_staleness_window(self):
+        typeahead.bump_version()
+        with mock.patch.object(self.index, '_start_rebuild') as start_rebuild:
+            self.titles('sol')
+            self.assertFalse(start_rebuild.called)
+            with self.later():
+                self.titles('sol')
+            self.assertEqual(start_rebuild.call_count, 1)
+
+    def test_up_to_date_index_is_not_rebuilt(self):
+        with mock.patch.object(self.index, '_start_rebuild') as start_rebuild, self.later():
+            self.titles('sol')
+        self.assertFalse(start_rebuild.called)
+
+    def test_one_rebuild_while_the_old_index_is_served(self):
+        Service.objects.filter(pk=self.service.pk).update(title='Solar repair')  # as if by another process
+        typeahead.bump_version()
+        results = []
+        barrier = threading.Barrier(8)
+
+        def lookup():
+            barrier.wait()
+            results.append(self.titles('sol'))
+
+        with mock.patch.object(self.index, '_start_rebuild') as start_rebuild, self.later():
+            threads = [threading.Thread(target=lookup) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(start_rebuild.call_count, 1)
+            self.assertTrue(self.index.rebuilding)
+            self.assertEqual(results, [['Solar install']] * 8)
+
+        self.index.load()  # what the rebuild thread runs
+        self.index.rebuilding = False
+        self.assertEqual(self.titles('sol'), ['Solar repair'])
+
+    def test_changes_during_a_load_are_kept(self):
+        other = self.make_service('Gate welding')
+        build = typeahead.PrefixIndex.build
+
+        def build_then_rename(rows):
+            index = build(rows)
+            if not self.index.replay:  # the service rows: rename while the categories are read
+                other.title = 'Gate painting'
+                self.index.update_services([other])
+            return index
+
+        with mock.patch.object(typeahead.PrefixIndex, 'build', side_effect=build_then_rename):
+            self.index.load()
+        self.assertEqual(self.titles('gate'), ['Gate painting'])
+        self.assertIsNone(self.index.replay)
+
+
+Status = Booking.BookingStatus
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0)
+class BookingTransitionTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service()
+        self.seeker = make_seeker()
+        self.booking = self.make_booking()
+
+    def make_booking(self, **fields):
+        fields.setdefault('booking_date', timezone.now() + datetime.timedelta(days=3))
+        return Booking.objects.create(service=self.service, seeker=self.seeker, **fields)
+
+    def change(self, user, status, booking=None, method='patch'):
+        booking = booking or self.booking
+        self.client.force_authenticate(user)
+        data = {'status': status}
+        if method == 'put':
+            data.update(service=booking.service_id, booking_date=booking.booking_date.isoformat())
+        return getattr(self.client, method)(f'/api/bookings/{booking.pk}/', data, format='json')
+
+    def logged(self, booking=None):
+        return list(BookingTransition.objects.filter(booking=booking or self.booking).order_by('id').values_list(
+            'from_status', 'to_status', 'actor',
+        ))
+
+    def test_allowed_transitions_are_logged(self):
+        for user, status in ((self.provider, Status.CONFIRMED), (self.provider, Status.COMPLETED)):
+            response = self.change(user, status)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(response.data['status'], status)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Status.COMPLETED)
+        self.assertEqual(self.logged(), [
+            (Status.PENDING, Status.CONFIRMED, self.provider.pk),
+            (Status.CONFIRMED, Status.COMPLETED, self.provider.pk),
+        ])
+
+    def test_either_side_cancels(self):
+        other = self.make_booking(booking_date=self.booking.booking_date + datetime.timedelta(days=1))
+        for user, booking in ((self.seeker, self.booking), (self.provider, other)):
+            response = self.change(user, Status.CANCELED, booking)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(self.logged(booking), [(Status.PENDING, Status.CANCELED, user.pk)])
+
+    def test_invalid_transition(self):
+        response = self.change(self.provider, Status.COMPLETED)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Status.PENDING)
+        self.assertEqual(self.logged(), [])
+
+    def test_final_statuses_stay(self):
+        self.change(self.seeker, Status.CANCELED)
+        self.assertEqual(self.change(self.provider, Status.CONFIRMED).status_code, 400)
+        self.assertEqual(len(self.logged()), 1)
+
+    def test_forbidden_transition(self):
+        response = self.change(self.seeker, Status.CONFIRMED)
+        self.assertEqual(response.status_code, 403)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Status.PENDING)
+        self.assertEqual(self.logged(), [])
+
+    def test_concurrent_change_conflicts(self):
+        # The seeker's copy is read before the provider confirms
+        stale = Booking.objects.get(pk=self.booking.pk)
+        transitions.transition(Booking.objects.get(pk=self.booking.pk), Status.CONFIRMED, self.provider)
+        with self.assertRaises(transitions.TransitionConflict), transaction.atomic():
+            transitions.transition(stale, Status.CANCELED, self.seeker)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.status, Status.CONFIRMED)
+        self.assertEqual(self.logged(), [(Status.PENDING, Status.CONFIRMED, self.provider.pk)])
+
+    def test_concurrent_change_through_the_api(self):
+        transition = transitions.transition
+
+        def confirm_first(booking, to_status, actor=None):
+            # The provider's request commits between the seeker's read and write
+            Booking.objects.filter(pk=booking.pk).update(status=Status.CONFIRMED)
+            return transition(booking, to_status, actor)
+
+        with mock.patch('services.serializers.transition', side_effect=confirm_first):
+            response = self.change(self.seeker, Status.CANCELED)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.logged(), [])
+
+    def test_new_bookings_are_pending(self):
+        self.service.refresh_from_db()
+        score = self.service.ranking_score
+        self.client.force_authenticate(self.seeker)
+        for status in (Status.COMPLETED, Status.CONFIRMED):
+            with self.subTest(status=status):
+                response = self.client.post('/api/bookings/', {
+                    'service': self.service.pk, 'status': status,
+                    'booking_date': (timezone.now() - datetime.timedelta(days=1)).isoformat(),
+                }, format='json')
+                self.assertEqual(response.status_code, 201, response.data)
+                self.assertEqual(Booking.objects.get(pk=response.data['id']).status, Status.PENDING)
+                Booking.objects.filter(pk=response.data['id']).delete()
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.recent_completed_bookings, self.service.ranking_score), (0, score))
+
+    def test_provider_update_keeps_the_seeker(self):
+        for method, status in (('put', Status.CONFIRMED), ('patch', Status.COMPLETED)):
+            with self.subTest(method=method):
+                response = self.change(self.provider, status, method=method)
+                self.assertEqual(response.status_code, 200, response.data)
+                self.booking.refresh_from_db()
+                self.assertEqual((self.booking.status, self.booking.seeker_id), (status, self.seeker.pk))
+
+    def test_bulk_outcomes(self):
+        confirmed = self.make_booking(
+            booking_date=self.booking.booking_date + datetime.timedelta(days=1), status=Status.CONFIRMED,
+        )
+        foreign = Booking.objects.create(
+            service=self.make_service(provider=make_provider('other@example.com')), seeker=self.seeker,
+            booking_date=self.booking.booking_date,
+        )
+        self.client.force_authenticate(self.provider)
+        response = self.client.post('/api/bookings/bulk-status/', {
+            'ids': [self.booking.pk, confirmed.pk, foreign.pk], 'status': Status.CONFIRMED,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            {result['id']: result['outcome'] for result in response.data['results']},
+            {self.booking.pk: 'updated', confirmed.pk: 'unchanged', foreign.pk: 'not_found'},
+        )
+        self.assertEqual(self.logged(), [(Status.PENDING, Status.CONFIRMED, self.provider.pk)])
+        self.assertEqual(self.logged(confirmed) + self.logged(foreign), [])
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0, BOOKING_SLOT_STEP_MINUTES=30)
+class AvailabilityTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service()  # 60 minutes
+        self.seeker = make_seeker()
+        today = timezone.now().astimezone(availability.booking_time_zone()).date()
+        self.monday = today + datetime.timedelta(days=7 - today.weekday())
+
+    def at(self, hour, minute=0, days=0):
+        """An aware datetime on self.monday (plus ``days``), in BOOKING_TIME_ZONE."""
+        day = self.monday + datetime.timedelta(days=days)
+        return datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=availability.booking_time_zone())
+
+    def add_window(self, start_hour, end_hour, weekday=0):
+        AvailabilityWindow.objects.create(
+            provider=self.provider, weekday=weekday, start_time=datetime.time(start_hour), end_time=datetime.time(end_hour),
+        )
+
+    def book(self, start, service=None, status=Status.PENDING):
+        return Booking.objects.create(service=service or self.service, seeker=self.seeker, booking_date=start, status=status)
+
+    def assertAvailable(self, start, end, exclude=None):
+        with self.assertNumQueries(1):
+            availability.check_booking(self.provider.pk, start, end, exclude)
+
+    def assertRefused(self, start, end, message):
+        with self.assertRaises(ValidationError) as raised:
+            availability.check_booking(self.provider.pk, start, end)
+        self.assertIn(message, str(raised.exception.detail['booking_date']))
+
+    def slot_starts(self, first_day, last_day=None, service=None):
+        slots = availability.free_slots(service or self.service, first_day, last_day or first_day, now=self.at(0, days=-1))
+        return [start for start, _end in slots]
+
+    def test_no_windows_means_any_time(self):
+        self.assertAvailable(self.at(3), self.at(4))
+        self.assertAvailable(self.at(23), self.at(1, days=1))  # across midnight
+        self.client.force_authenticate(self.seeker)
+        response = self.client.post('/api/bookings/', {
+            'service': self.service.pk, 'booking_date': self.at(21, 30).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_bookings_must_fit_in_a_window(self):
+        self.add_window(9, 12)
+        self.add_window(13, 17)
+        self.assertAvailable(self.at(9), self.at(10))
+        self.assertAvailable(self.at(16), self.at(17))
+        for start, end in (
+            (self.at(8, 30), self.at(9, 30)),   # starts before the window
+            (self.at(11, 30), self.at(12, 30)),  # runs over its end
+            (self.at(11), self.at(14)),          # spans two windows
+            (self.at(10, days=1), self.at(11, days=1)),  # no window on Tuesday
+            (self.at(23, 30), self.at(0, 30, days=1)),   # past midnight
+        ):
+            with self.subTest(start=start):
+                self.assertRefused(start, end, 'not available')
+
+    def test_overlapping_bookings(self):
+        booked = self.book(self.at(10))
+        other_service = self.make_service('Gate welding', duration_minutes=30)
+        for start, end in ((self.at(9, 30), self.at(10, 30)), (self.at(10, 30), self.at(11)), (self.at(9), self.at(12))):
+            with self.subTest(start=start, end=end):
+                self.assertRefused(start, end, 'already has a booking')
+        # Back to back, a booking's own time, and canceled bookings do not count
+        self.assertAvailable(self.at(9), self.at(10))
+        self.assertAvailable(self.at(11), self.at(12))
+        self.assertAvailable(self.at(10), self.at(11), exclude=booked.pk)
+        self.book(self.at(14), other_service, status=Status.CANCELED)
+        self.assertAvailable(self.at(14), self.at(15))
+        # Any of the provider's services holds their time
+        self.book(self.at(16), other_service)
+        self.assertRefused(self.at(15, 30), self.at(16, 30), 'already has a booking')
+
+    def test_booking_requests_are_checked(self):
+        self.add_window(9, 12)
+        self.book(self.at(10))
+        self.client.force_authenticate(self.seeker)
+        for start, message in ((self.at(10, 30), 'already has a booking'), (self.at(13), 'not available')):
+            with self.subTest(start=start):
+                response = self.client.post('/api/bookings/', {
+                    'service': self.service.pk, 'booking_date': start.isoformat(),
+                }, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, str(response.data['booking_date']))
+
+    def test_slots_skip_bookings(self):
+        self.add_window(9, 12)
+        self.add_window(14, 16)
+        self.book(self.at(10))
+        self.book(self.at(14, 30), self.make_service('Gate welding', duration_minutes=30))
+        self.book(self.at(15), status=Status.CANCELED)
+        self.assertEqual(self.slot_starts(self.monday), [self.at(9), self.at(11), self.at(15)])
+
+    def test_slots_without_windows_run_around_the_clock(self):
+        tuesday = self.monday + datetime.timedelta(days=1)
+        starts = self.slot_starts(self.monday, tuesday)
+        self.assertEqual(starts[0], self.at(0))
+        self.assertEqual(starts[-1], self.at(23, days=1))
+        self.assertIn(self.at(23, 30), starts)  # across midnight
+        self.assertEqual(len(starts), 2 * 48 - 1)
+
+    def test_slots_are_never_in_the_past(self):
+        self.add_window(9, 12)
+        slots = availability.free_slots(self.service, self.monday, self.monday, now=self.at(10, 10))
+        self.assertEqual([start for start, _end in slots], [self.at(10, 30), self.at(11)])
+
+    def test_slots_endpoint(self):
+        self.add_window(9, 11)
+        response = self.client.get(f'/api/services/{self.service.pk}/slots/', {
+            'from': self.monday.isoformat(), 'to': self.monday.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [slot['start'] for slot in response.data['slots']],
+            [self.at(9).isoformat(), self.at(9, 30).isoformat(), self.at(10).isoformat()],
+        )
+
+
+class SimilarServiceTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.solar, self.solar_repair, self.gate, self.gate_repair, self.pipes = (
+            self.make_service(title, description=description) for title, description in (
+                ('Solar panel install', 'Rooftop panels and inverter'),
+                ('Solar panel repair', 'Inverter and panels fixed'),
+                ('Gate welding', 'Steel gates welded'),
+                ('Gate repair', 'Steel gates and hinges welded'),
+                ('Pipe fitting', 'Plumbing'),
+            )
+        )
+
+    def similar(self, service):
+        response = self.client.get(f'/api/services/{service.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        return [entry['id'] for entry in response.json()]
+
+    def test_small_catalog(self):
+        similarity.rebuild()
+        self.assertEqual(self.similar(self.solar)[0], self.solar_repair.pk)
+        self.assertEqual(self.similar(self.gate)[0], self.gate_repair.pk)
+        self.assertNotIn(self.solar.pk, self.similar(self.solar))
+
+    def test_update_follows_changes(self):
+        similarity.rebuild()
+        self.gate.title = 'Solar panel cleaning'
+        self.gate.description = 'Panels washed'
+        self.gate.save()
+        self.assertTrue(SimilarServiceUpdate.objects.filter(service=self.gate).exists())
+        similarity.update()
+        self.assertIn(self.gate.pk, self.similar(self.solar))
+        self.assertNotEqual(self.similar(self.gate_repair)[:1], [self.gate.pk])
+        self.assertFalse(SimilarServiceUpdate.objects.exists())
+
+    def test_unknown_service(self):
+        self.assertEqual(self.client.get('/api/services/999999/similar/').status_code, 404)
+
+    def test_pruning(self):
+        # 40 services; word 0 is in one, word 1 in two, word 2 in every one
+        rows = [[1, 1, 1]] + [[0, 1, 1]] + [[0, 0, 1]] * 38
+        counts = sparse.csr_matrix(np.array(rows, dtype=np.float32))
+        self.assertEqual(similarity.tf_idf(counts).shape, (40, 2))
+        with mock.patch.object(similarity, 'COMMON_WORD_MIN_SERVICES', 10):
+            self.assertEqual(similarity.tf_idf(counts).shape, (40, 1))
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0)
+class BulkImportTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.provider)
+
+    def item(self, title='Solar install', **fields):
+        return {'title': title, 'description': 'Panels', 'price': '1000', 'category': self.category.pk, **fields}
+
+    def post(self, items, query=''):
+        return self.client.post(f'/api/services/bulk/{query}', items, format='json')
+
+    def post_ndjson(self, text):
+        return self.client.post('/api/services/bulk/', text, content_type='application/x-ndjson')
+
+    def test_json_array(self):
+        response = self.post([self.item(), self.item('Gate welding', latitude=-1.29, longitude=36.82)])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (2, 0, 0))
+        ids = [result['id'] for result in response.data['results']]
+        self.assertEqual([result['status'] for result in response.data['results']], ['created', 'created'])
+        self.assertEqual(list(Service.objects.filter(pk__in=ids).values_list('title', flat=True).order_by('id')),
+                         ['Solar install', 'Gate welding'])
+        self.assertEqual(Service.objects.get(pk=ids[1]).geohash, geo.encode(-1.29, 36.82))
+        # Written without signals, so indexed by the import itself
+        found = self.client.get('/api/services/search/', {'q': 'weld'}).data['results']
+        self.assertEqual([service['id'] for service in found], [ids[1]])
+
+    def test_ndjson(self):
+        text = '\n'.join([json.dumps(self.item()), '', json.dumps(self.item('Gate welding'))]) + '\n'
+        response = self.post_ndjson(text)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['created'], 2)
+
+    def test_ndjson_parse_error(self):
+        response = self.post_ndjson(json.dumps(self.item()) + '\n{"title": \n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', str(response.data['detail']))
+        self.assertFalse(Service.objects.exists())
+
+    def test_partial_failure(self):
+        existing = self.make_service('Pipe fitting')
+        foreign = self.make_service('Tiling', provider=make_provider('other@example.com'))
+        response = self.post([
+            self.item(),
+            {'description': 'No title', 'price': '10', 'category': self.category.pk},
+            self.item(category=999999),
+            'not an object',
+            {'id': foreign.pk, 'price': '1'},
+            {'id': existing.pk, 'price': '2500'},
+            {'id': existing.pk, 'title': 'Again'},
+            self.item(price='a lot'),
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 6))
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(8)))
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'invalid', 'invalid', 'invalid', 'invalid', 'updated', 'invalid', 'invalid'],
+        )
+        self.assertIn('title', results[1]['errors'])
+        self.assertIn('category', results[2]['errors'])
+        self.assertEqual(results[3]['errors'], {'non_field_errors': ['Expected an object.']})
+        self.assertEqual(results[4]['errors'], {'id': ['No service of yours has this id.']})
+        self.assertIn('more than once', results[6]['errors']['id'][0])
+        self.assertIn('price', results[7]['errors'])
+
+        # Updates change only the fields given
+        existing.refresh_from_db()
+        self.assertEqual((existing.title, existing.price), ('Pipe fitting', Decimal('2500')))
+        foreign.refresh_from_db()
+        self.assertEqual(foreign.price, Decimal('1000'))
+
+    def test_all_or_nothing(self):
+        response = self.post([self.item(), self.item(category=999999)], '?all_or_nothing=true')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], ['skipped', 'invalid'])
+        self.assertFalse(Service.objects.exists())
+
+    def test_nothing_valid(self):
+        response = self.post([self.item(category=999999)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed'], 1)
+
+    @override_settings(SERVICE_BULK_MAX_ITEMS=2)
+    def test_request_errors(self):
+        for body in ({'title': 'Not a list'}, [self.item()] * 3):
+            with self.subTest(body=body):
+                response = self.post(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('non_field_errors', response.data)
+        self.client.force_authenticate(make_seeker())
+        self.assertEqual(self.post([self.item()]).status_code, 403)
+        self.assertFalse(Service.objects.exists())
+
+
+@override_settings(RANKING_PRIOR_REVIEWS=4, RANKING_PRIOR_RATING=3.5, RANKING_BOOKING_WEIGHT=0.2, RANKING_RECENT_DAYS=30)
+class RankingTests(CatalogTestCase):
+
+    FIXTURE = [  # (review_count, rating_sum, recent_completed_bookings)
+        (0, 0, 0), (1, 5, 0), (1, 1, 3), (100, 480, 0), (100, 480, 250), (7, 22, 1), (3, 15, 1000),
+    ]
+
+    def test_sql_and_numpy_agree(self):
+        for count, total, recent in self.FIXTURE:
+            service = self.make_service()
+            Service.objects.filter(pk=service.pk).update(
+                review_count=count, rating_sum=total, recent_completed_bookings=recent,
+            )
+        for weight in (0.2, 0):
+            with self.subTest(booking_weight=weight), self.settings(RANKING_BOOKING_WEIGHT=weight):
+                rows = Service.objects.order_by('id').annotate(
+                    score=ranking.score_expression(F('review_count'), F('rating_sum'), F('recent_completed_bookings')),
+                ).values_list('score', flat=True)
+                expected = ranking.scores(*zip(*self.FIXTURE))
+                self.assertEqual(len(rows), len(expected))
+                for score, want in zip(rows, expected):
+                    self.assertAlmostEqual(score, want, places=9)
+        self.assertAlmostEqual(ranking.scores([0], [0], [0])[0], ranking.prior_score())
+
+    def test_incremental_updates_match_a_recount(self):
+        services = [self.make_service(f'Service {i}') for i in range(3)]
+        seekers = [make_seeker(f'seeker{i}@example.com') for i in range(4)]
+        now = timezone.now()
+
+        def book(service, seeker, days_ago, status=Status.COMPLETED):
+            return Booking.objects.create(
+                service=service, seeker=seeker, status=status, booking_date=now - datetime.timedelta(days=days_ago),
+            )
+
+        for i, seeker in enumerate(seekers):
+            Review.objects.create(service=services[i % 3], seeker=seeker, rating=i + 2)
+            book(services[0], seeker, days_ago=i)
+        book(services[1], seekers[0], days_ago=60)  # too old to count
+        pending = book(services[1], seekers[1], days_ago=2, status=Status.PENDING)
+        confirmed = book(services[2], seekers[2], days_ago=3, status=Status.CONFIRMED)
+
+        transitions.transition(confirmed, Status.COMPLETED)
+        transitions.transition(pending, Status.CANCELED)
+        transitions.transition_many([book(services[2], seekers[3], days_ago=1, status=Status.CONFIRMED).pk], Status.COMPLETED)
+        Booking.objects.filter(service=services[0], seeker=seekers[0]).get().delete()
+        moved = Booking.objects.get(service=services[0], seeker=seekers[1])
+        moved.service = services[1]
+        moved.save()
+        review = Review.objects.get(seeker=seekers[3])
+        review.rating = 1
+        review.save()
+        Review.objects.get(seeker=seekers[0]).delete()
+
+        ids, bookings, scores = ratings.ranking_mismatches()
+        self.assertEqual(ids.tolist(), [], f'stale: {dict(zip(ids.tolist(), zip(bookings.tolist(), scores.tolist())))}')
+        self.assertEqual(ratings.recompute_ranking(), 0)
+        recent = dict(Service.objects.values_list('pk', 'recent_completed_bookings'))
+        self.assertEqual([recent[service.pk] for service in services], [2, 1, 2])
+
+
+class FacetTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        plumbing = Category.objects.create(name='Plumbing', slug='plumbing')
+        # (category, price, review_count, rating_sum)
+        for number, (category, price, count, total) in enumerate([
+            (self.category, '300', 1, 5),   # 5 stars
+            (self.category, '800', 2, 8),   # 4
+            (self.category, '600', 1, 3),   # 3
+            (self.category, '400', 0, 0),   # unrated
+            (self.category, '3000', 1, 2),  # 2
+            (plumbing, '800', 2, 9),        # 4.5
+            (plumbing, '300', 0, 0),        # unrated
+            (plumbing, '12000', 1, 3),      # 3
+        ]):
+            service = self.make_service(f'Service {number}', price, category=category)
+            Service.objects.filter(pk=service.pk).update(review_count=count, rating_sum=total)
+
+    def facets(self, **params):
+        response = self.client.get('/api/services/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        facets = response.json()
+        return {
+            'count': facets['count'],
+            'categories': {entry['slug']: entry['count'] for entry in facets['categories']},
+            'price': {entry['min_price']: entry['count'] for entry in facets['price'] if entry['count']},
+            'rating': {entry['min_rating']: entry['count'] for entry in facets['rating']},
+            'unrated': facets['unrated'],
+        }
+
+    def test_without_filters(self):
+        self.assertEqual(self.facets(), {
+            'count': 8,
+            'categories': {'electrical': 5, 'plumbing': 3},
+            'price': {'0.00': 3, '500.00': 3, '2500.00': 1, '10000.00': 1},
+            'rating': {4: 3, 3: 5, 2: 6, 1: 6},
+            'unrated': 2,
+        })
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = self.facets(category='electrical', max_price='999.99', min_rating='4')
+        # The services matching all three filters: 300 at 5 stars and 800 at 4
+        self.assertEqual(facets['count'], 2)
+        # Price and rating apply, category does not: the plumbing 800 at 4.5 stars shows up
+        self.assertEqual(facets['categories'], {'electrical': 2, 'plumbing': 1})
+        # Category and rating apply, price does not: still only the two
+        self.assertEqual(facets['price'], {'0.00': 1, '500.00': 1})
+        # Category and price apply, rating does not: the 3-star and unrated services show up
+        self.assertEqual(facets['rating'], {4: 2, 3: 3, 2: 3, 1: 3})
+        self.assertEqual(facets['unrated'], 1)
+
+    def test_single_filter_keeps_its_own_facet_whole(self):
+        facets = self.facets(category='plumbing')
+        self.assertEqual(facets['count'], 3)
+        self.assertEqual(facets['categories'], {'electrical': 5, 'plumbing': 3})
+        self.assertEqual(facets['price'], {'0.00': 1, '500.00': 1, '10000.00': 1})
+        self.assertEqual(facets['rating'], {4: 1, 3: 2, 2: 2, 1: 2})
+        self.assertEqual(facets['unrated'], 1)
+
+        facets = self.facets(min_price='500', max_price='2499.99')
+        self.assertEqual(facets['count'], 3)
+        self.assertEqual(facets['categories'], {'electrical': 2, 'plumbing': 1})
+        self.assertEqual(facets['price'], {'0.00': 3, '500.00': 3, '2500.00': 1, '10000.00': 1})
+
+    def test_counts_match_the_service_list(self):
+        params = {'category': 'electrical', 'max_price': '999.99', 'min_rating': '3'}
+        listed = self.client.get('/api/services/', params).json()
+        self.assertEqual(self.facets(**params)['count'], len(listed['results']))
+
+    def test_three_queries(self):
+        with self.assertNumQueries(3):
+            self.facets(category='electrical', min_price='100', min_rating='2')
+
+
+@override_settings(BOOKING_TIME_ZONE='Africa/Nairobi', BOOKING_CALENDAR_MAX_DAYS=14)
+class BookingCalendarTests(CatalogTestCase):
+
+    FIRST_DAY = datetime.date(2030, 3, 4)
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.make_service()
+        self.seeker = make_seeker()
+        self.zone = availability.booking_time_zone()
+
+    def book(self, day, hour, minute=0, service=None, status=Status.PENDING):
+        start = datetime.datetime.combine(day, datetime.time(hour, minute), tzinfo=self.zone)
+        return Booking.objects.create(
+            service=service or self.service, seeker=self.seeker, status=status, booking_date=start,
+        )
+
+    def get(self, user=None, **params):
+        self.client.force_authenticate(user or self.provider)
+        return self.client.get('/api/bookings/calendar/', params)
+
+    def listed(self, response):
+        """{date: [booking ids]} for the days with bookings."""
+        self.assertEqual(response.status_code, 200, response.data)
+        return {day['date']: [booking['id'] for booking in day['bookings']] for day in response.data['days'] if day['bookings']}
+
+    def test_range_limits(self):
+        today = timezone.now().astimezone(self.zone).date()
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['from'], response.data['to']), (today.isoformat(), (today + datetime.timedelta(days=6)).isoformat()))
+        self.assertEqual(len(response.data['days']), 7)
+
+        last_allowed = self.FIRST_DAY + datetime.timedelta(days=13)
+        response = self.get(**{'from': self.FIRST_DAY, 'to': last_allowed})
+        self.assertEqual(len(response.data['days']), 14)
+        response = self.get(**{'from': self.FIRST_DAY, 'to': self.FIRST_DAY})
+        self.assertEqual([day['date'] for day in response.data['days']], [self.FIRST_DAY.isoformat()])
+
+        for params, field in (
+            ({'from': self.FIRST_DAY, 'to': last_allowed + datetime.timedelta(days=1)}, 'to'),
+            ({'from': self.FIRST_DAY, 'to': self.FIRST_DAY - datetime.timedelta(days=1)}, 'to'),
+            ({'from': '2030-02-30'}, 'from'),
+            ({'from': self.FIRST_DAY, 'to': 'next week'}, 'to'),
+            ({'service': 'solar'}, 'service'),
+        ):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+
+    def test_days_are_bucketed_in_the_booking_time_zone(self):
+        second_day = self.FIRST_DAY + datetime.timedelta(days=1)
+        first = self.book(self.FIRST_DAY, 0)              # 21:00 UTC the day before
+        late = self.book(self.FIRST_DAY, 23, 30)          # 20:30 UTC, still the first day
+        self.book(self.FIRST_DAY - datetime.timedelta(days=1), 23, 59)
+        self.book(self.FIRST_DAY + datetime.timedelta(days=2), 0)  # the day after the range
+        early = self.book(second_day, 1)                  # 22:00 UTC on the first day
+
+        response = self.get(**{'from': self.FIRST_DAY, 'to': second_day})
+        self.assertEqual(response.data['time_zone'], 'Africa/Nairobi')
+        self.assertEqual(self.listed(response), {
+            self.FIRST_DAY.isoformat(): [first.pk, late.pk],
+            second_day.isoformat(): [early.pk],
+        })
+        listed = response.data['days'][1]['bookings'][0]
+        self.assertEqual(listed['booking_date'], f'{second_day.isoformat()}T01:00:00+03:00')
+        self.assertEqual(listed['end_date'], f'{second_day.isoformat()}T02:00:00+03:00')
+        self.assertEqual(response.data['counts'][Status.PENDING], 3)
+
+    def test_canceled_bookings_are_counted_but_not_listed(self):
+        kept = self.book(self.FIRST_DAY, 9)
+        self.book(self.FIRST_DAY, 11, status=Status.CANCELED)
+        done = self.book(self.FIRST_DAY, 13, status=Status.COMPLETED)
+
+        response = self.get(**{'from': self.FIRST_DAY, 'to': self.FIRST_DAY})
+        self.assertEqual(self.listed(response), {self.FIRST_DAY.isoformat(): [kept.pk, done.pk]})
+        expected = {**dict.fromkeys(Status.values, 0), Status.PENDING: 1, Status.CANCELED: 1, Status.COMPLETED: 1}
+        self.assertEqual(response.data['counts'], expected)
+        self.assertEqual(response.data['days'][0]['counts'], expected)
+
+    def test_providers_only_see_their_own_bookings(self):
+        other_provider = make_provider('other@example.com')
+        other_service = self.make_service('Gate welding', provider=other_provider)
+        mine = self.book(self.FIRST_DAY, 9)
+        theirs = self.book(self.FIRST_DAY, 10, service=other_service)
+        params = {'from': self.FIRST_DAY, 'to': self.FIRST_DAY}
+
+        self.assertEqual(self.listed(self.get(**params)), {self.FIRST_DAY.isoformat(): [mine.pk]})
+        self.assertEqual(self.listed(self.get(other_provider, **params)), {self.FIRST_DAY.isoformat(): [theirs.pk]})
+        # Naming another provider's service does not reveal its bookings
+        self.assertEqual(self.listed(self.get(service=other_service.pk, **params)), {})
+        self.assertEqual(self.listed(self.get(service=self.service.pk, **params)), {self.FIRST_DAY.isoformat(): [mine.pk]})
+
+        # The calendar is for providers: seekers, even with bookings in the range, are refused
+        self.assertEqual(self.get(self.seeker, **params).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/bookings/calendar/', params).status_code, 403)
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0)
+class ProviderReviewFeedTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.services = [self.make_service(f'Service {i}') for i in range(3)]
+        other = self.make_service('Gate welding', provider=make_provider('other@example.com'))
+        self.base = timezone.now() - datetime.timedelta(days=10)
+        self.reviews = []
+        # Every second review shares its created_at with the one before, so the id breaks the tie
+        for i in range(7):
+            review = Review.objects.create(
+                service=self.services[i % 3], seeker=make_seeker(f'seeker{i}@example.com'), rating=i % 5 + 1,
+            )
+            self.set_times(review, created=self.base + datetime.timedelta(hours=i // 2))
+            self.reviews.append(review)
+        Review.objects.create(service=other, seeker=make_seeker('elsewhere@example.com'), rating=5)
+        self.client.force_authenticate(self.provider)
+
+    def set_times(self, review, created, updated=None):
+        Review.objects.filter(pk=review.pk).update(created_at=created, updated_at=updated or created)
+
+    def feed(self, path='/api/reviews/provider/', **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def newest_first(self, reviews):
+        return [review.pk for review in sorted(reviews, key=lambda review: (review.created_at, review.pk), reverse=True)]
+
+    def test_every_service_newest_first(self):
+        results = self.feed()['results']
+        for review in self.reviews:
+            review.refresh_from_db()
+        self.assertEqual([entry['id'] for entry in results], self.newest_first(self.reviews))
+        by_id = {review.pk: review for review in self.reviews}
+        for entry in results:
+            self.assertEqual(entry['service'], by_id[entry['id']].service_id)
+            self.assertEqual(entry['service_title'], by_id[entry['id']].service.title)
+
+    def test_cursor_paging(self):
+        for review in self.reviews:
+            review.refresh_from_db()
+        seen, path = [], '/api/reviews/provider/?page_size=2'
+        while path:
+            page = self.feed(path)
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend(entry['id'] for entry in page['results'])
+            path = page['next']
+            if len(seen) == 2:
+                # A review written while paging goes to the top and does not shift later pages
+                Review.objects.create(service=self.services[0], seeker=make_seeker('late@example.com'), rating=3)
+        self.assertEqual(seen, self.newest_first(self.reviews))
+
+    def test_since(self):
+        cutoff = self.base + datetime.timedelta(hours=2)
+        edited = self.reviews[0]  # created first, edited after the cutoff
+        self.set_times(edited, created=self.base, updated=cutoff + datetime.timedelta(minutes=5))
+        expected = [review.pk for review in reversed(self.reviews[4:])] + [edited.pk]
+        for since in (
+            cutoff.isoformat(),                                              # +00:00
+            cutoff.isoformat().replace('+', ' '),                            # an unescaped '+'
+            cutoff.astimezone(datetime.timezone(datetime.timedelta(hours=3))).isoformat(),
+            cutoff.replace(tzinfo=None).isoformat(),                         # naive: the current time zone
+        ):
+            with self.subTest(since=since):
+                self.assertEqual([entry['id'] for entry in self.feed(since=since)['results']], expected)
+        self.assertEqual(self.feed(since=timezone.now().isoformat())['results'], [])
+        response = self.client.get('/api/reviews/provider/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('since', response.data)
+
+    def test_queries_do_not_grow_with_services(self):
+        with self.assertNumQueries(2) as few:
+            self.feed()
+        for i in range(20):
+            Review.objects.create(
+                service=self.make_service(f'More {i}'), seeker=make_seeker(f'more{i}@example.com'), rating=4,
+            )
+        with self.assertNumQueries(len(few.captured_queries)):
+            self.feed()
+
+    def test_non_providers_get_404(self):
+        for user in (make_seeker(), CustomUser.objects.create(email='admin@example.com', role='ADMIN', firebase_uid='admin')):
+            with self.subTest(role=user.role):
+                self.client.force_authenticate(user)
+                self.assertEqual(self.client.get('/api/reviews/provider/').status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/reviews/provider/').status_code, 403)
+
+
+@override_settings(QUERY_BUDGET_SAMPLE_RATE=0, SERVICE_SEARCH_DEFAULT_RADIUS_KM=10, SERVICE_SEARCH_MAX_RADIUS_KM=500)
+class ServiceFilterTests(CatalogTestCase):
+
+    # Two spots about 3.8km apart in Nairobi, and one in Mombasa
+    CBD, WESTLANDS, MOMBASA = (-1.2864, 36.8172), (-1.2676, 36.8108), (-4.0435, 39.6682)
+
+    def setUp(self):
+        super().setUp()
+        plumbing = Category.objects.create(name='Plumbing', slug='plumbing')
+        base = timezone.now() - datetime.timedelta(days=1)
+        self.services = []
+        # Ties everywhere: groups of three share created_at, prices repeat, as
+        # do ratings, ranking scores and locations, so only the id decides
+        for i in range(12):
+            latitude, longitude = (self.CBD, self.WESTLANDS, self.MOMBASA)[i % 3]
+            service = self.make_service(
+                'Solar install' if i % 4 else 'Borehole pump', ('100', '250', '100', '400')[i % 4],
+                category=plumbing if i % 2 else self.category, latitude=latitude, longitude=longitude,
+            )
+            count, total = ((0, 0), (1, 5), (2, 6), (1, 3))[i % 4]
+            Service.objects.filter(pk=service.pk).update(
+                created_at=base + datetime.timedelta(minutes=i // 3), review_count=count, rating_sum=total,
+                ranking_score=(i % 3) / 2,
+            )
+            self.services.append(Service.objects.get(pk=service.pk))
+
+    def ids(self, **params):
+        response = self.client.get('/api/services/', {**params, 'paginate': 'false'})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [service['id'] for service in response.json()]
+
+    def where(self, predicate):
+        return sorted(service.pk for service in self.services if predicate(service))
+
+    def test_each_filter(self):
+        near = lambda point: lambda s: haversine_km(*point, s.latitude, s.longitude) <= 10
+        for params, predicate in (
+            ({'search': 'borehole'}, lambda s: s.title == 'Borehole pump'),
+            ({'category': 'plumbing'}, lambda s: s.category.slug == 'plumbing'),
+            ({'category': str(self.category.pk)}, lambda s: s.category_id == self.category.pk),
+            ({'min_price': '250'}, lambda s: s.price >= 250),
+            ({'max_price': '250.00'}, lambda s: s.price <= 250),
+            ({'min_price': '101', 'max_price': '399.99'}, lambda s: s.price == 250),
+            ({'min_rating': '3'}, lambda s: s.review_count and s.rating_sum / s.review_count >= 3),
+            ({'min_rating': '5'}, lambda s: s.rating_sum == 5),
+            ({'near': '%s,%s' % self.CBD}, near(self.CBD)),
+            ({'near': '%s,%s' % self.CBD, 'radius_km': '2'}, lambda s: (s.latitude, s.longitude) == self.CBD),
+            ({'near': '%s,%s' % self.CBD, 'radius_km': '500'}, lambda s: True),
+            ({'bbox': '-1.3,36.8,-1.28,36.82'}, lambda s: (s.latitude, s.longitude) == self.CBD),
+            ({'bbox': '-5,39,-4,40'}, lambda s: (s.latitude, s.longitude) == self.MOMBASA),
+            ({'category': 'electrical', 'max_price': '250', 'near': '%s,%s' % self.WESTLANDS},
+             lambda s: s.category == self.category and s.price <= 250 and near(self.WESTLANDS)(s)),
+            ({'category': 'no-such-category'}, lambda s: False),
+        ):
+            with self.subTest(params=params):
+                expected = self.where(predicate)
+                self.assertEqual(sorted(self.ids(**params)), expected)
+                if params.get('category') != 'no-such-category':
+                    self.assertTrue(expected)
+
+    def test_invalid_values(self):
+        for params, field in (
+            ({'min_price': 'cheap'}, 'min_price'),
+            ({'max_price': 'NaN'}, 'max_price'),
+            ({'max_price': 'Infinity'}, 'max_price'),
+            ({'min_rating': 'four'}, 'min_rating'),
+            ({'near': '-1.28'}, 'near'),
+            ({'near': '-1.28,36.8,5'}, 'near'),
+            ({'near': '91,36.8'}, 'near'),
+            ({'near': '-1.28,east'}, 'near'),
+            ({'near': '-1.28,36.8', 'radius_km': '0'}, 'radius_km'),
+            ({'near': '-1.28,36.8', 'radius_km': '501'}, 'radius_km'),
+            ({'bbox': '-1,36,-2,37'}, 'bbox'),
+            ({'bbox': '-2,36,-1'}, 'bbox'),
+            ({'bbox': '-2,36,-1,181'}, 'bbox'),
+            ({'ordering': 'cheapest'}, 'ordering'),
+            ({'ordering': 'distance'}, 'ordering'),
+            ({'ordering': 'relevance'}, 'ordering'),
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/services/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json())
+
+    def test_ties_are_broken_by_id_across_pages(self):
+        def rating(s):
+            return s.rating_sum / s.review_count if s.review_count else None
+
+        def distance(s):
+            return haversine_km(*self.CBD, s.latitude, s.longitude)
+
+        near = {'near': '%s,%s' % self.CBD, 'radius_km': '500'}
+        for params, key in (
+            ({}, lambda s: (-s.created_at.timestamp(), -s.pk)),
+            ({'ordering': 'oldest'}, lambda s: (s.created_at, s.pk)),
+            ({'ordering': 'price'}, lambda s: (s.price, s.pk)),
+            ({'ordering': '-price'}, lambda s: (-s.price, -s.pk)),
+            ({'ordering': 'rating'}, lambda s: (rating(s) is None, -(rating(s) or 0), -s.pk)),
+            ({'ordering': 'top_rated'}, lambda s: (-s.ranking_score, -s.pk)),
+            (near, lambda s: (round(distance(s), 6), s.pk)),
+            ({'search': 'solar'}, lambda s: -s.pk),  # the same text everywhere: equal relevance
+        ):
+            with self.subTest(params=params):
+                matching = [s for s in self.services if 'search' not in params or s.title == 'Solar install']
+                expected = [s.pk for s in sorted(matching, key=key)]
+                self.assertEqual(self.ids(**params), expected)
+                self.assertEqual(self.walk({**params, 'page_size': 5}), expected)
+                self.assertEqual(self.walk({**params, 'page_size': 5, 'page': 1}), expected)
+
+    def walk(self, params):
+        """Ids over every page, following the next links (cursors or page numbers)."""
+        ids = []
+        response = self.client.get('/api/services/', params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            data = response.json()
+            ids += [service['id'] for service in data['results']]
+            if not data['next']:
+                return ids
+            response = self.client.get(data['next'])
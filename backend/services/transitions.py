@@ -0,0 +1,163 @@
+"""
+Booking status transitions.
+
+A booking moves PENDING -> CONFIRMED -> COMPLETED and can be CANCELED
+while it is PENDING or CONFIRMED; CANCELED and COMPLETED are final.
+``TRANSITIONS`` also says who may make each change: the provider confirms
+and completes, either side cancels, and admins (or code running without a
+user, such as management commands) may make any allowed change.
+
+``transition`` applies a change as one conditional UPDATE::
+
+    UPDATE services_booking SET status = <new> WHERE id = <pk> AND status = <old>
+
+so when a seeker cancels while the provider confirms, exactly one of them
+wins and the other gets a TransitionConflict (409) instead of silently
+overwriting the first change. Each change is recorded as a
+BookingTransition row. ``transition_many`` changes a list of bookings the
+same way, with one UPDATE per status they move from. No change needs the
+overlap check of services/availability.py, since no transition makes a
+booking active again.
+
+``QuerySet.update()`` sends no signals, so both functions keep the
+recently completed booking counts (services/ratings.py) themselves.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import exceptions, serializers, status
+
+from . import ratings
+from .models import Booking, BookingTransition
+
+Status = Booking.BookingStatus
+
+# (from, to): the parties who may make the change; admins may make them all
+TRANSITIONS = {
+    (Status.PENDING, Status.CONFIRMED): {'PROVIDER'},
+    (Status.PENDING, Status.CANCELED): {'PROVIDER', 'SEEKER'},
+    (Status.CONFIRMED, Status.COMPLETED): {'PROVIDER'},
+    (Status.CONFIRMED, Status.CANCELED): {'PROVIDER', 'SEEKER'},
+}
+
+
+class TransitionConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The booking status was changed by someone else. Reload the booking and try again.'
+    default_code = 'conflict'
+
+
+def is_admin(user):
+    """Admins, and code running without a user, may change any booking."""
+    return user is None or user.role == 'ADMIN' or user.is_staff or user.is_superuser
+
+
+def actor_role(booking, user):
+    """'SEEKER', 'PROVIDER' or 'ADMIN': the part ``user`` plays in ``booking``."""
+    if is_admin(user):
+        return 'ADMIN'
+    if user.pk == booking.seeker_id:
+        return 'SEEKER'
+    if user.pk == booking.provider_id:
+        return 'PROVIDER'
+    return None
+
+
+def _refusal(booking, to_status, role):
+    """``(outcome, message)`` if ``role`` may not move ``booking`` to ``to_status``, else None."""
+    allowed = TRANSITIONS.get((booking.status, to_status))
+    if allowed is None:
+        return 'invalid', f'A {booking.status} booking cannot become {to_status}.'
+    if role != 'ADMIN' and role not in allowed:
+        return 'forbidden', f'Only the {" or the ".join(sorted(allowed)).lower()} can make a booking {to_status}.'
+    return None
+
+
+def check_transition(booking, to_status, actor=None):
+    """Raise unless ``actor`` may move ``booking`` from its current status to ``to_status``."""
+    refusal = _refusal(booking, to_status, actor_role(booking, actor))
+    if refusal is not None:
+        outcome, message = refusal
+        if outcome == 'invalid':
+            raise serializers.ValidationError({'status': message})
+        raise exceptions.PermissionDenied(message)
+
+
+def transition(booking, to_status, actor=None):
+    """
+    Move ``booking`` to ``to_status`` unless someone changed its status
+    since it was loaded, update it in place and return the new
+    BookingTransition.
+    """
+    check_transition(booking, to_status, actor)
+    from_status, now = booking.status, timezone.now()
+    with transaction.atomic(savepoint=False):
+        changed = Booking.objects.filter(pk=booking.pk, status=from_status).update(status=to_status, updated_at=now)
+        if not changed:
+            raise TransitionConflict()
+        event = BookingTransition.objects.create(
+            booking=booking, from_status=from_status, to_status=to_status, actor=actor,
+        )
+        booking.status, booking.updated_at = to_status, now
+        ratings.booking_saved(booking, created=False)
+    return event
+
+
+def transition_many(booking_ids, to_status, actor=None):
+    """
+    Move the bookings with ``booking_ids`` that ``actor`` may change to
+    ``to_status``, in one transaction. Returns ``(results, changed)``: an
+    ``{'id', 'outcome'[, 'detail']}`` entry per id, in order, where outcome
+    is 'updated', 'unchanged', 'not_found', 'invalid', 'forbidden' or
+    'conflict', and the changed bookings, with their service, provider and
+    seeker loaded for the notifications.
+    """
+    booking_ids = list(dict.fromkeys(booking_ids))
+    bookings = Booking.objects.select_related('seeker', 'service__provider', 'service__category').filter(pk__in=booking_ids)
+    if not is_admin(actor):
+        bookings = bookings.filter(Q(provider=actor) | Q(seeker=actor))
+    found = {booking.pk: booking for booking in bookings}
+
+    outcomes, groups = {}, {}
+    for pk in booking_ids:
+        booking = found.get(pk)
+        if booking is None:
+            outcomes[pk] = ('not_found', 'No booking of yours has this id.')
+        elif booking.status == to_status:
+            outcomes[pk] = ('unchanged', None)
+        else:
+            refusal = _refusal(booking, to_status, actor_role(booking, actor))
+            if refusal is not None:
+                outcomes[pk] = refusal
+            else:
+                groups.setdefault(booking.status, []).append(booking)
+
+    changed, now = [], timezone.now()
+    with transaction.atomic():
+        for from_status, group in groups.items():
+            pks = [booking.pk for booking in group]
+            count = Booking.objects.filter(pk__in=pks, status=from_status).update(status=to_status, updated_at=now)
+            if count < len(pks):
+                # Some changed status since they were read; the rest were updated
+                updated = set(Booking.objects.filter(pk__in=pks, status=to_status, updated_at=now).values_list('pk', flat=True))
+            else:
+                updated = set(pks)
+            for booking in group:
+                if booking.pk in updated:
+                    outcomes[booking.pk] = ('updated', None)
+                    changed.append((from_status, booking))
+                else:
+                    outcomes[booking.pk] = ('conflict', TransitionConflict.default_detail)
+        BookingTransition.objects.bulk_create([
+            BookingTransition(booking=booking, from_status=from_status, to_status=to_status, actor=actor)
+            for from_status, booking in changed
+        ])
+        for _from_status, booking in changed:
+            booking.status, booking.updated_at = to_status, now
+        ratings.bookings_saved([booking for _from_status, booking in changed])
+
+    results = []
+    for pk in booking_ids:
+        outcome, detail = outcomes[pk]
+        results.append({'id': pk, 'outcome': outcome, **({'detail': detail} if detail else {})})
+    return results, [booking for _from_status, booking in changed]
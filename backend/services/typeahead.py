@@ -0,0 +1,390 @@
+"""
+In-process typeahead index over service titles and category names
+(``GET /api/services/autocomplete/?q=...``).
+
+Each process keeps a PrefixIndex per kind of suggestion, loaded from the
+database on the first lookup and kept up to date from the Service and
+Category signals (services/signals.py) and by the bulk import. Writes that
+change what is indexed (a service created, renamed or deleted, a category
+saved or deleted) also replace the typeahead version in the catalog cache.
+At most once every TYPEAHEAD_MAX_STALENESS seconds a lookup compares it with
+the version its index was loaded at; if another process has written since,
+one background thread rebuilds the index while lookups keep using the old
+one. Changes made in this process during a rebuild are applied again to the
+new index. Review counts, which only order the suggestions, are refreshed by
+these rebuilds and are not tracked on their own.
+
+An index holds:
+
+- ``vocab``: the distinct words of all entries, sorted, so the words
+  starting with a prefix are one ``bisect`` range;
+- ``postings``: per word, the entries containing it as a sorted
+  ``array('Q')`` of keys packing the entry's weight (most popular first)
+  and its slot number, so merging the lists of a prefix range yields
+  entries in ranking order and the first ``limit`` are the answer;
+- ``trigrams``: per three-letter sequence, the words containing it, for
+  typo tolerance: when the prefixes match fewer than ``limit`` entries, a
+  query word that starts no indexed word also matches the words that
+  contain most of its trigrams.
+
+The best entries of the one- and two-letter prefixes, whose ranges span the
+most words, are kept precomputed; each entry also keeps its words as one
+string, so the other words of a multi-word query are substring checks.
+
+Memory grows linearly with the number of entries: titles are cut to
+MAX_TEXT_LENGTH characters and at most MAX_TOKENS words of each are indexed.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from .models import Category, Service
+
+MAX_TEXT_LENGTH = 120
+MAX_TOKENS = 12
+MAX_LIMIT = 20
+MAX_WEIGHT = 2 ** 31 - 1
+SLOT_MASK = 2 ** 32 - 1
+# Prefixes up to this long keep their best MAX_LIMIT entries precomputed
+SHORT_PREFIX = 2
+# Candidates checked against the other words of a multi-word query
+SCAN_LIMIT = 500
+# Typo tolerance: query words of at least this many letters, matched to the
+# FUZZY_WORDS words that contain the largest share (at least FUZZY_SHARE) of
+# the query word's trigrams
+FUZZY_MIN_LENGTH = 4
+FUZZY_WORDS = 8
+FUZZY_SHARE = 0.6
+VERSION_KEY = 'typeahead:version'
+
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    """Lower-cased, accent-free words of ``text``, in order."""
+    text = unicodedata.normalize('NFKD', text[:MAX_TEXT_LENGTH].lower())
+    return _WORD.findall(text.encode('ascii', 'ignore').decode('ascii'))
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def current_version():
+    return _cache().get_or_set(VERSION_KEY, lambda: uuid4().hex, timeout=None)
+
+
+def bump_version():
+    """Tell every process that its index is out of date; any new value will do."""
+    _cache().set(VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def trigrams(word):
+    padded = f' {word}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.vocab = []
+        self.postings = {}
+        self.trigrams = {}
+        # Per slot: the entry's pk (None once removed), display text, indexed
+        # words as ' word word ', and key
+        self.pks = []
+        self.texts = []
+        self.words = []
+        self.keys = array('Q')
+        self.slots = {}  # pk -> slot
+        self.free = []
+        # Best keys of the short prefixes, whose ranges span many words
+        self.top = {}
+
+    @classmethod
+    def build(cls, rows):
+        """An index of ``(pk, text, weight)`` rows, built in one pass."""
+        index = cls()
+        postings = {}
+        for pk, text, weight in rows:
+            words = tokenize(text)[:MAX_TOKENS]
+            key = index._new_entry(pk, text, weight, words)
+            for word in set(words):
+                postings.setdefault(word, []).append(key)
+        for word, keys in postings.items():
+            keys.sort()
+            index.postings[word] = array('Q', keys)
+            for trigram in trigrams(word):
+                index.trigrams.setdefault(trigram, set()).add(word)
+        index.vocab = sorted(postings)
+        return index
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _new_entry(self, pk, text, weight, words):
+        slot = self.free.pop() if self.free else len(self.pks)
+        key = (MAX_WEIGHT - min(max(weight, 0), MAX_WEIGHT)) << 32 | slot
+        entry = (pk, text[:MAX_TEXT_LENGTH], f' {" ".join(words)} ', key)
+        if slot == len(self.pks):
+            for column, value in zip((self.pks, self.texts, self.words, self.keys), entry):
+                column.append(value)
+        else:
+            self.pks[slot], self.texts[slot], self.words[slot], self.keys[slot] = entry
+        self.slots[pk] = slot
+        return key
+
+    def add(self, pk, text, weight=0):
+        """Add or replace the entry for ``pk``."""
+        self.remove(pk)
+        words = tokenize(text)[:MAX_TOKENS]
+        key = self._new_entry(pk, text, weight, words)
+        for word in set(words):
+            postings = self.postings.get(word)
+            if postings is None:
+                postings = self.postings[word] = array('Q')
+                insort(self.vocab, word)
+                for trigram in trigrams(word):
+                    self.trigrams.setdefault(trigram, set()).add(word)
+            postings.insert(bisect_left(postings, key), key)
+            self._forget_top(word)
+
+    def remove(self, pk):
+        slot = self.slots.pop(pk, None)
+        if slot is None:
+            return
+        key = self.keys[slot]
+        for word in set(self.words[slot].split()):
+            postings = self.postings[word]
+            del postings[bisect_left(postings, key)]
+            self._forget_top(word)
+            if not postings:
+                del self.postings[word]
+                del self.vocab[bisect_left(self.vocab, word)]
+                for trigram in trigrams(word):
+                    words = self.trigrams[trigram]
+                    words.discard(word)
+                    if not words:
+                        del self.trigrams[trigram]
+        self.pks[slot] = self.texts[slot] = self.words[slot] = None
+        self.free.append(slot)
+
+    def _forget_top(self, word):
+        for length in range(1, SHORT_PREFIX + 1):
+            self.top.pop(word[:length], None)
+
+    def text(self, pk):
+        return self.texts[self.slots[pk]]
+
+    def prefixed(self, prefix):
+        """Indexed words starting with ``prefix``."""
+        start = bisect_left(self.vocab, prefix)
+        end = bisect_left(self.vocab, prefix + '\x7f', start)  # after every [0-9a-z] continuation
+        return self.vocab[start:end]
+
+    def similar(self, word):
+        """Up to FUZZY_WORDS indexed words sharing most of the trigrams of ``word``."""
+        wanted = trigrams(word)
+        shared = Counter()
+        for trigram in wanted:
+            shared.update(self.trigrams.get(trigram, ()))
+        threshold = FUZZY_SHARE * len(wanted)
+        close = [
+            (-count, abs(len(candidate) - len(word)), candidate)
+            for candidate, count in shared.items()
+            if count >= threshold and len(candidate) >= len(word) - 2
+        ]
+        return [candidate for _count, _length, candidate in heapq.nsmallest(FUZZY_WORDS, close)]
+
+    def lookup(self, query, limit, fuzzy=True):
+        """
+        ``(pks, fuzzy_used)``: up to ``limit`` entries, most popular first,
+        having a word starting with each query word. A query word that
+        starts no indexed word also matches the words similar to it; entries
+        found that way come after the exact prefix matches.
+        """
+        words = tokenize(query)[:MAX_TOKENS]
+        if not words or limit <= 0:
+            return [], False
+        terms = [(word, self.prefixed(word), ()) for word in words]
+        found = self._search(terms, limit, ())
+        if len(found) >= limit or not fuzzy:
+            return found, False
+        # Only words that start no indexed word are taken for misspelled
+        fuzzy_terms = [
+            (word, matches, self.similar(word) if not matches and len(word) >= FUZZY_MIN_LENGTH else ())
+            for word, matches, _similar in terms
+        ]
+        if not any(similar for _word, _matches, similar in fuzzy_terms):
+            return found, False
+        more = self._search(fuzzy_terms, limit - len(found), found)
+        return found + more, bool(more)
+
+    def _ranked(self, words):
+        """Keys of the entries containing any of ``words``, best first, each once."""
+        last = None
+        for key in heapq.merge(*(self.postings[word] for word in words)):
+            if key != last:
+                yield key
+                last = key
+
+    def _search(self, terms, limit, exclude):
+        if len(terms) == 1 and not terms[0][2] and not exclude and len(terms[0][0]) <= SHORT_PREFIX:
+            word, matches, _similar = terms[0]
+            if word not in self.top:
+                self.top[word] = array('Q', islice(self._ranked(matches), MAX_LIMIT))
+            return [self.pks[key & SLOT_MASK] for key in self.top[word][:limit]]
+
+        # Drive the search with the query word matching the fewest entries
+        sizes = [sum(len(self.postings[w]) for w in (*matches, *similar)) for _word, matches, similar in terms]
+        driver = sizes.index(min(sizes))
+        word, matches, similar = terms[driver]
+        candidates = [*matches, *(w for w in similar if not w.startswith(word))]
+        others = [
+            (f' {other}', [f' {w} ' for w in other_similar])
+            for i, (other, _matches, other_similar) in enumerate(terms) if i != driver
+        ]
+        skip = set(exclude)
+        found = []
+        for scanned, key in enumerate(self._ranked(candidates)):
+            if others and scanned == SCAN_LIMIT:
+                break
+            slot = key & SLOT_MASK
+            if self.pks[slot] in skip:
+                continue
+            words = self.words[slot]
+            if all(prefix in words or any(w in words for w in other_similar) for prefix, other_similar in others):
+                found.append(self.pks[slot])
+                if len(found) == limit:
+                    break
+        return found
+
+
+class Typeahead:
+    """The service and category indexes of this process."""
+
+    def __init__(self):
+        self.lock = threading.RLock()  # held while the indexes are read or changed
+        self.load_lock = threading.Lock()  # held while deciding who (re)builds them
+        self.services = None
+        self.categories = None
+        self.category_slugs = {}
+        self.version = None
+        self.checked_at = 0.0
+        self.rebuilding = False
+        # Changes made while a load is reading the database, applied again to its result
+        self.replay = None
+
+    def load(self):
+        with self.lock:
+            self.replay = []
+        try:
+            # Read first: a write committed after this bumps it again and is rebuilt next time
+            version = current_version()
+            services = PrefixIndex.build(
+                Service.objects.values_list('id', 'title', 'review_count').iterator(chunk_size=5000)
+            )
+            rows = list(Category.objects.values_list('id', 'name', 'slug'))
+            categories = PrefixIndex.build((pk, name, 0) for pk, name, _slug in rows)
+            with self.lock:
+                self.services, self.categories = services, categories
+                self.category_slugs = {pk: slug for pk, _name, slug in rows}
+                for apply in self.replay:
+                    apply()
+                self.version, self.checked_at = version, time.monotonic()
+        finally:
+            with self.lock:
+                self.replay = None
+
+    def ensure_loaded(self):
+        if self.services is None:
+            with self.load_lock:  # the first lookups all wait for one load
+                if self.services is None:
+                    self.load()
+        elif time.monotonic() - self.checked_at > settings.TYPEAHEAD_MAX_STALENESS and self._claim_rebuild():
+            self._start_rebuild()
+
+    def _claim_rebuild(self):
+        """Whether this caller is the one to rebuild the index: it is due a check, out of date and not being rebuilt."""
+        with self.load_lock:
+            if self.rebuilding or time.monotonic() - self.checked_at <= settings.TYPEAHEAD_MAX_STALENESS:
+                return False
+            self.checked_at = time.monotonic()
+            if current_version() == self.version:
+                return False
+            self.rebuilding = True
+            return True
+
+    def _start_rebuild(self):
+        threading.Thread(target=self._rebuild, name='typeahead-rebuild', daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            self.load()
+        finally:
+            self.rebuilding = False
+            connection.close()  # this thread's own connection
+
+    def _change(self, apply):
+        """Run ``apply()`` on the loaded indexes, and again on those of a load in progress."""
+        with self.lock:
+            if self.services is not None:
+                apply()
+            if self.replay is not None:
+                self.replay.append(apply)
+
+    def suggest(self, query, limit):
+        """Matching categories and services, as dicts, and whether typo tolerance was needed."""
+        self.ensure_loaded()
+        with self.lock:
+            category_pks, fuzzy_categories = self.categories.lookup(query, limit)
+            service_pks, fuzzy_services = self.services.lookup(query, limit)
+            categories = [
+                {'id': pk, 'name': self.categories.text(pk), 'slug': self.category_slugs.get(pk)}
+                for pk in category_pks
+            ]
+            services = [{'id': pk, 'title': self.services.text(pk)} for pk in service_pks]
+        return categories, services, fuzzy_categories or fuzzy_services
+
+    # Incremental updates, called once the write is committed; nothing to do
+    # before the first load, which reads the database anyway.
+
+    def update_services(self, services, titles_changed=True):
+        """Add or update ``services``; ``titles_changed`` if other processes must rebuild."""
+        def apply():
+            for service in services:
+                self.services.add(service.pk, service.title, service.review_count)
+        self._change(apply)
+        if titles_changed:
+            bump_version()
+
+    def remove_service(self, pk):
+        self._change(lambda: self.services.remove(pk))
+        bump_version()
+
+    def update_category(self, category):
+        def apply():
+            self.categories.add(category.pk, category.name)
+            self.category_slugs[category.pk] = category.slug
+        self._change(apply)
+        bump_version()
+
+    def remove_category(self, pk):
+        def apply():
+            self.categories.remove(pk)
+            self.category_slugs.pop(pk, None)
+        self._change(apply)
+        bump_version()
+
+
+typeahead = Typeahead()
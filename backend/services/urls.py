@@ -11,12 +11,42 @@ urlpatterns = [
     # /api/services/
     path('services/', views.ServiceListCreateView.as_view(), name='service-list-create'),
 
+    # /api/services/bulk/
+    path('services/bulk/', views.ServiceBulkImportView.as_view(), name='service-bulk-import'),
+
+    # /api/services/search/
+    path('services/search/', views.ServiceSearchView.as_view(), name='service-search'),
+
+    # /api/services/autocomplete/
+    path('services/autocomplete/', views.ServiceAutocompleteView.as_view(), name='service-autocomplete'),
+
+    # /api/services/facets/
+    path('services/facets/', views.ServiceFacetsView.as_view(), name='service-facets'),
+
     # /api/services/<pk>/
     path('services/<int:pk>/', views.ServiceDetailView.as_view(), name='service-detail'),
     
+    # /api/services/<pk>/similar/
+    path('services/<int:pk>/similar/', views.ServiceSimilarView.as_view(), name='service-similar'),
+
+    # /api/services/<pk>/slots/
+    path('services/<int:pk>/slots/', views.ServiceSlotsView.as_view(), name='service-slots'),
+
+    # /api/availability/
+    path('availability/', views.AvailabilityWindowListCreateView.as_view(), name='availability-list-create'),
+
+    # /api/availability/<pk>/
+    path('availability/<int:pk>/', views.AvailabilityWindowDetailView.as_view(), name='availability-detail'),
+
     # /api/bookings/
     path('bookings/', views.BookingListCreateView.as_view(), name='booking-list-create'),
     
+    # /api/bookings/bulk-status/
+    path('bookings/bulk-status/', views.BookingBulkStatusView.as_view(), name='booking-bulk-status'),
+
+    # /api/bookings/calendar/
+    path('bookings/calendar/', views.BookingCalendarView.as_view(), name='booking-calendar'),
+
     # /api/bookings/<pk>/
     path('bookings/<int:pk>/', views.BookingDetailView.as_view(), name='booking-detail'),
     
@@ -26,6 +56,9 @@ urlpatterns = [
     # /api/reviews/
     path('reviews/', views.ReviewListCreateView.as_view(), name='review-list-create'),
     
+    # /api/reviews/provider/
+    path('reviews/provider/', views.ProviderReviewListView.as_view(), name='provider-review-list'),
+    
     # /api/reviews/<pk>/
     path('reviews/<int:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
     
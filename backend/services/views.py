@@ -1,14 +1,34 @@
-from rest_framework import generics, permissions
+from datetime import timedelta
+
+from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.authentication import SessionAuthentication
-from django.db.models import Q
-from .models import Service, Category, Booking, Review, Complaint
-from .serializers import ServiceSerializer, CategorySerializer, BookingSerializer, ReviewSerializer, ComplaintSerializer
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import AvailabilityWindow, Service, Category, Booking, Review, Complaint
+from .serializers import (
+    ServiceSerializer,
+    ServiceSearchResultSerializer,
+    ServiceNearbySerializer,
+    ServiceSimilarSerializer,
+    AvailabilityWindowSerializer,
+    CategorySerializer,
+    BookingSerializer,
+    BookingBulkStatusSerializer,
+    ReviewSerializer,
+    ProviderReviewSerializer,
+    ComplaintSerializer
+)
 from .permissions import (
     IsProviderOrReadOnly,
     IsOwnerOrReadOnly,
     IsSeeker,
+    IsProvider,
     IsBookingOwnerOrProvider,
     IsAdminOrOwnerOrReadOnly,
     IsAdminOrProviderOrReadOnly,
@@ -16,7 +36,22 @@ from .permissions import (
 )
 from api.permissions import IsAdminUser
 from api.authentication import FirebaseAuthentication
+from api.pagination import KeysetPagination, StandardPagination
+from api.parsers import NDJSONParser
+from api.sparse import SparseQuerysetMixin
+from api.row_mappers import FastListMixin
+from .availability import booking_time_zone, free_slots
+from .booking_calendar import provider_calendar
+from .bulk import import_services
+from .facets import facet_counts
+from .filters import filter_services
+from .search import SearchResults, search_terms
+from .transitions import actor_role, transition_many
+from .typeahead import MAX_LIMIT as TYPEAHEAD_MAX_LIMIT, typeahead
+from .response_cache import CachedResponseMixin
+from .conditional import ConditionalDetailMixin, ConditionalListMixin
 from core.email_utils import (
+    email_batch,
     send_booking_confirmation_email,
     send_booking_completed_email,
     send_booking_canceled_email,
@@ -24,9 +59,19 @@ from core.email_utils import (
     send_complaint_resolved_email
 )
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+def send_booking_status_email(booking, user):
+    """Notify the parties of a booking that ``user`` just moved to its current status."""
+    if booking.status == 'CONFIRMED':
+        send_booking_confirmation_email(booking)
+    elif booking.status == 'COMPLETED':
+        send_booking_completed_email(booking)
+    elif booking.status == 'CANCELED':
+        send_booking_canceled_email(booking, actor_role(booking, user))
+
+class CategoryListCreateView(CachedResponseMixin, SparseQuerysetMixin, generics.ListCreateAPIView):
     """
-    GET: Returns a list of all categories (public access).
+    GET: Returns a list of all categories (public access, served from the
+         catalog response cache; see services/response_cache.py).
     POST: Creates a new category (Provider or Admin only).
     """
     queryset = Category.objects.all()
@@ -42,7 +87,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated(), IsAdminOrProviderOrReadOnly()]
         return [permissions.AllowAny()]
 
-class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET: Returns a single category (public access).
     PUT/PATCH: Updates a category (Provider or Admin).
@@ -61,13 +106,41 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
             return [permissions.IsAuthenticated(), IsAdminOrProviderOrReadOnly()]
         return [permissions.AllowAny()]
 
-class ServiceListCreateView(generics.ListCreateAPIView):
+class ServiceListCreateView(CachedResponseMixin, ConditionalListMixin, SparseQuerysetMixin, FastListMixin, generics.ListCreateAPIView):
     """
-    GET: Returns a list of all services (public access).
+    GET: Returns a paginated list of services (public access).
+         Supports search, category, min_price, max_price, min_rating, near,
+         radius_km, bbox and ordering query parameters (see
+         services/filters.py); with near, results carry distance_km. Pages are
+         fetched with ?cursor= (keyset pagination); pass page=<n> instead to
+         get numbered pages with a total count. page_size sets the page
+         length; paginate=false returns the full unpaginated list.
+         Responses are served from the catalog response cache.
     POST: Creates a new service for the logged-in PROVIDER.
     """
-    queryset = Service.objects.all()
+    queryset = Service.objects.select_related('provider', 'category')
     serializer_class = ServiceSerializer
+    etag_per_user = False
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if 'page' in self.request.query_params:
+                self._paginator = StandardPagination()
+            else:
+                self._paginator = KeysetPagination()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = filter_services(queryset, self.request.query_params)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET' and self.request.query_params.get('near'):
+            return ServiceNearbySerializer
+        return super().get_serializer_class()
     
     def get_permissions(self):
         """
@@ -81,15 +154,173 @@ class ServiceListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
-class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ServiceBulkImportView(APIView):
+    """
+    POST: Creates and updates many of the current PROVIDER's services at once.
+          The body is a JSON array or NDJSON (application/x-ndjson) of up to
+          SERVICE_BULK_MAX_ITEMS objects with title, description, price,
+          category and optionally latitude/longitude; objects with an id update that service (only the fields
+          given). Valid items are written in one transaction and invalid ones
+          are reported per item; ?all_or_nothing=true writes nothing unless
+          every item is valid. See services/bulk.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProviderOrReadOnly]
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of services (a JSON array or NDJSON).']})
+        if len(items) > settings.SERVICE_BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'At most {settings.SERVICE_BULK_MAX_ITEMS} services can be imported per request.'
+            ]})
+        all_or_nothing = request.query_params.get('all_or_nothing', '').lower() in ('true', '1', 'yes')
+        result = import_services(request.user, items, all_or_nothing=all_or_nothing)
+        nothing_written = result.failed and not (result.created or result.updated)
+        return Response(
+            result.as_dict(),
+            status=status.HTTP_400_BAD_REQUEST if nothing_written else status.HTTP_200_OK,
+        )
+
+class ServiceAutocompleteView(APIView):
     """
-    GET: Returns a single service (public access).
+    GET: Typeahead suggestions for the search box (public access).
+         ?q=<text> matches categories and services having a word starting
+         with each word of the query, most reviewed services first; when
+         the prefixes find fewer than ?limit= (default 8, at most 20)
+         results, misspelled words are matched too and
+         "fuzzy" is true. Served from an in-process index without database
+         queries; see services/typeahead.py.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 8))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if not 1 <= limit <= TYPEAHEAD_MAX_LIMIT:
+            raise ValidationError({'limit': f'Must be between 1 and {TYPEAHEAD_MAX_LIMIT}.'})
+        categories, services, fuzzy = typeahead.suggest(query, limit)
+        return Response({'query': query, 'fuzzy': fuzzy, 'categories': categories, 'services': services})
+
+class ServiceFacetsView(CachedResponseMixin, generics.ListAPIView):
+    """
+    GET: Counts of the services matching the catalog filters per category,
+         price bucket and rating band (public access). Takes the same
+         search and filter parameters as the service list; each facet
+         ignores its own filter. Three queries, served from the catalog
+         response cache unless CATALOG_CACHE_FACETS is off. See
+         services/facets.py.
+    """
+    queryset = Service.objects.all()
+    permission_classes = [permissions.AllowAny]
+
+    def use_response_cache(self):
+        return settings.CATALOG_CACHE_FACETS
+
+    def list(self, request, *args, **kwargs):
+        return Response(facet_counts(self.get_queryset(), request.query_params))
+
+class ServiceSimilarView(CachedResponseMixin, FastListMixin, generics.ListAPIView):
+    """
+    GET: The services most similar to this one, most similar first, each
+         with its similarity score (public access, unpaginated). Precomputed
+         by manage.py build_similar_services, so a new or changed service
+         gets its list on the next run. See services/similarity.py.
+    """
+    serializer_class = ServiceSimilarSerializer
+    pagination_class = None
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        pk = self.kwargs['pk']
+        if not Service.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return (
+            Service.objects.select_related('provider', 'category')
+            .filter(similar_of__service_id=pk)
+            .annotate(similarity=F('similar_of__score'))
+            .order_by('similar_of__rank')
+        )
+
+class DateRangeMixin:
+    """?from= and ?to= dates (YYYY-MM-DD, in BOOKING_TIME_ZONE, both included)."""
+
+    def date_range(self, max_days):
+        """``(first_day, last_day)``, by default today and the following six days."""
+        today = timezone.now().astimezone(booking_time_zone()).date()
+        first_day = self.date_param('from', today)
+        last_day = self.date_param('to', first_day + timedelta(days=6))
+        if last_day < first_day:
+            raise ValidationError({'to': 'Must not be before from.'})
+        if (last_day - first_day).days >= max_days:
+            raise ValidationError({'to': f'At most {max_days} days can be requested at once.'})
+        return first_day, last_day
+
+    def date_param(self, name, default):
+        value = self.request.query_params.get(name, '').strip()
+        if not value:
+            return default
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({name: 'Expected a date as YYYY-MM-DD.'})
+        return day
+
+class ServiceSlotsView(DateRangeMixin, APIView):
+    """
+    GET: Free booking slots of a service (public access). ?from= and ?to=
+         are dates (YYYY-MM-DD, in BOOKING_TIME_ZONE; default today and the
+         following six days), at most BOOKING_SLOTS_MAX_DAYS days apart.
+         Slots last the service's duration_minutes and take the provider's
+         availability windows and bookings for all their services into
+         account. See services/availability.py.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        service = generics.get_object_or_404(Service.objects.only('id', 'provider_id', 'duration_minutes'), pk=pk)
+        first_day, last_day = self.date_range(settings.BOOKING_SLOTS_MAX_DAYS)
+        slots = free_slots(service, first_day, last_day)
+        return Response({
+            'service': service.pk,
+            'duration_minutes': service.duration_minutes,
+            'time_zone': settings.BOOKING_TIME_ZONE,
+            'slots': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots],
+        })
+
+class ServiceSearchView(generics.ListAPIView):
+    """
+    GET: Full-text search over service title, description and category name
+         (public access). ?q=<text> is required; results are ordered by
+         relevance, paginated, and carry search_rank and highlighted
+         search_highlight.title / search_highlight.description snippets.
+    """
+    serializer_class = ServiceSearchResultSerializer
+    pagination_class = StandardPagination
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        if not search_terms(query):
+            raise ValidationError({'q': 'A search term is required.'})
+        return SearchResults(query)
+
+class ServiceDetailView(CachedResponseMixin, ConditionalDetailMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
+    """
+    GET: Returns a single service (public access, cached like the list).
     PUT/PATCH: Updates a service (Owner or Admin).
     DELETE: Deletes a service (Owner or Admin).
     """
-    queryset = Service.objects.all()
+    queryset = Service.objects.select_related('provider', 'category')
     serializer_class = ServiceSerializer
     authentication_classes = [FirebaseAuthentication, SessionAuthentication]
+    etag_per_user = False
     
     def get_permissions(self):
         """
@@ -101,14 +332,17 @@ class ServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.AllowAny()]
     
 
-class BookingListCreateView(generics.ListCreateAPIView):
+class BookingListCreateView(ConditionalListMixin, SparseQuerysetMixin, FastListMixin, generics.ListCreateAPIView):
     """
     GET: Returns a list of bookings for the current user.
          - Seekers see bookings they made.
          - Providers see bookings for their services.
-    POST: Creates a new booking (Seekers only).
+    POST: Creates a new booking (Seekers only), always PENDING.
+    Newest first, keyset-paginated with ?cursor= and ?page_size=.
     """
     serializer_class = BookingSerializer
+    conditional_related = ('seeker', 'service')  # seeker_details and the embedded service
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         """
@@ -126,28 +360,79 @@ class BookingListCreateView(generics.ListCreateAPIView):
         - Admin can see all bookings.
         """
         user = self.request.user
+        bookings = Booking.objects.select_related('seeker', 'service__provider', 'service__category')
         if user.role == 'ADMIN':
-            return Booking.objects.all()
+            return bookings
         elif user.role == 'SEEKER':
-            return Booking.objects.filter(seeker=user)
+            return bookings.filter(seeker=user)
         elif user.role == 'PROVIDER':
-            return Booking.objects.filter(service__provider=user)
+            return bookings.filter(provider=user)
         return Booking.objects.none()
 
     def perform_create(self, serializer):
-        booking = serializer.save(seeker=self.request.user)
-        # If booking is created with CONFIRMED status, send confirmation email
-        if booking.status == 'CONFIRMED':
-            send_booking_confirmation_email(booking)
+        # New bookings are PENDING (see BookingSerializer.create); the
+        # provider's confirmation sends the email
+        serializer.save(seeker=self.request.user)
 
 
-class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BookingCalendarView(DateRangeMixin, APIView):
+    """
+    GET: The logged-in provider's bookings starting on the days from ?from=
+         to ?to= (YYYY-MM-DD, in BOOKING_TIME_ZONE; default today and the
+         following six days, at most BOOKING_CALENDAR_MAX_DAYS days), grouped
+         by day with per-status counts; canceled bookings are counted but
+         not listed. ?service=<id> limits it to one of their services. See
+         services/booking_calendar.py.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsProvider]
+
+    def get(self, request):
+        first_day, last_day = self.date_range(settings.BOOKING_CALENDAR_MAX_DAYS)
+        service_id = request.query_params.get('service')
+        if service_id is not None and not service_id.isdigit():
+            raise ValidationError({'service': 'Expected a service id.'})
+        calendar = provider_calendar(request.user.pk, first_day, last_day, int(service_id) if service_id else None)
+        return Response({
+            'from': first_day.isoformat(),
+            'to': last_day.isoformat(),
+            'time_zone': settings.BOOKING_TIME_ZONE,
+            **calendar,
+        })
+
+class BookingBulkStatusView(APIView):
+    """
+    POST: Moves many bookings to one status (Providers and Admin), e.g.
+          {"ids": [1, 2, 3], "status": "CONFIRMED"}, at most
+          BOOKING_BULK_MAX_IDS ids. The allowed changes are made in one
+          transaction (services/transitions.py) and the others skipped;
+          "results" gives the outcome for each id. The notification emails
+          are sent together, over one connection.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrProviderOrReadOnly]
+
+    def post(self, request):
+        serializer = BookingBulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results, changed = transition_many(
+            serializer.validated_data['ids'], serializer.validated_data['status'], request.user,
+        )
+        with email_batch():
+            for booking in changed:
+                send_booking_status_email(booking, request.user)
+        return Response({
+            'status': serializer.validated_data['status'],
+            'updated': len(changed),
+            'results': results,
+        })
+
+class BookingDetailView(ConditionalDetailMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET, PUT, PATCH, DELETE a specific booking.
     - Only the Seeker who made the booking or the Provider
       who owns the service can access it, or Admin.
     """
     serializer_class = BookingSerializer
+    conditional_related = ('seeker', 'service')  # seeker_details and the embedded service
     permission_classes = [permissions.IsAuthenticated, IsBookingOwnerOrProvider]
     authentication_classes = [FirebaseAuthentication, SessionAuthentication]
 
@@ -157,49 +442,64 @@ class BookingDetailView(generics.RetrieveUpdateDestroyAPIView):
         even in the detail view. Admin can access all bookings.
         """
         user = self.request.user
+        bookings = Booking.objects.select_related('seeker', 'service__provider', 'service__category')
         if user.role == 'ADMIN' or user.is_staff or user.is_superuser:
-            return Booking.objects.all()
+            return bookings
         elif user.role == 'SEEKER':
-            return Booking.objects.filter(seeker=user)
+            return bookings.filter(seeker=user)
         elif user.role == 'PROVIDER':
-            return Booking.objects.filter(service__provider=user)
+            return bookings.filter(provider=user)
         return Booking.objects.none()
     
     def update(self, request, *args, **kwargs):
-        """Handle booking updates and send email notifications."""
+        """
+        Handle booking updates and send email notifications.
+
+        Status changes are conditional UPDATEs (services/transitions.py): a
+        booking whose status changed since it was read gives 409 Conflict.
+        """
         instance = self.get_object()
         old_status = instance.status
-        
-        # Perform the update
-        response = super().update(request, *args, **kwargs)
-        
-        # Refresh instance to get updated status
-        instance.refresh_from_db()
-        new_status = instance.status
-        
-        # Send email notifications based on status changes
-        if old_status != new_status:
-            if new_status == 'CONFIRMED':
-                send_booking_confirmation_email(instance)
-            elif new_status == 'COMPLETED':
-                send_booking_completed_email(instance)
-            elif new_status == 'CANCELED':
-                # Determine who canceled the booking
-                if request.user == instance.seeker:
-                    canceled_by = 'SEEKER'
-                elif request.user == instance.service.provider:
-                    canceled_by = 'PROVIDER'
-                else:
-                    canceled_by = 'ADMIN'  # Admin canceled
-                send_booking_canceled_email(instance, canceled_by)
-        
-        return response
+        serializer = self.get_serializer(instance, data=request.data, partial=kwargs.pop('partial', False))
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        # The serializer updated the instance in place, with its relations loaded
+        if old_status != instance.status:
+            send_booking_status_email(instance, request.user)
+
+        return Response(serializer.data)
     
-class ProviderServiceListView(generics.ListAPIView):
+class AvailabilityWindowListCreateView(generics.ListCreateAPIView):
+    """
+    GET: The weekly availability windows of the logged-in provider.
+    POST: Adds a window (Provider only). Bookings must fit in a window;
+          providers without windows are available at any time.
+    """
+    serializer_class = AvailabilityWindowSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProviderOrReadOnly]
+    pagination_class = None
+
+    def get_queryset(self):
+        return AvailabilityWindow.objects.filter(provider=self.request.user)
+
+class AvailabilityWindowDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    GET, PUT, PATCH, DELETE one of the logged-in provider's availability windows.
+    """
+    serializer_class = AvailabilityWindowSerializer
+    permission_classes = [permissions.IsAuthenticated, IsProviderOrReadOnly]
+
+    def get_queryset(self):
+        return AvailabilityWindow.objects.filter(provider=self.request.user)
+
+class ProviderServiceListView(ConditionalListMixin, SparseQuerysetMixin, FastListMixin, generics.ListAPIView):
     """
     GET: Returns a list of services owned by the currently authenticated PROVIDER.
+    Newest first, keyset-paginated with ?cursor= and ?page_size=.
     """
     serializer_class = ServiceSerializer
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated, IsProviderOrReadOnly]
 
     def get_queryset(self):
@@ -208,15 +508,18 @@ class ProviderServiceListView(generics.ListAPIView):
         """
         user = self.request.user
         if user.role == 'PROVIDER':
-            return Service.objects.filter(provider=user)
+            return Service.objects.filter(provider=user).select_related('provider', 'category')
         return Service.objects.none()
 
-class ReviewListCreateView(generics.ListCreateAPIView):
+class ReviewListCreateView(ConditionalListMixin, SparseQuerysetMixin, FastListMixin, generics.ListCreateAPIView):
     """
     GET: List reviews for a service (public) or user's reviews (authenticated)
     POST: Create review (seekers only, one per service)
+    Newest first, keyset-paginated with ?cursor= and ?page_size=.
     """
     serializer_class = ReviewSerializer
+    conditional_related = ('seeker', 'service')  # seeker_details and the embedded service
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         """POST requires seeker, GET is public or authenticated."""
@@ -226,7 +529,7 @@ class ReviewListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter reviews based on query parameters."""
-        queryset = Review.objects.all()
+        queryset = Review.objects.select_related('seeker', 'service__provider', 'service__category')
         service_id = self.request.query_params.get('service', None)
         user = self.request.user
         
@@ -236,14 +539,50 @@ class ReviewListCreateView(generics.ListCreateAPIView):
             # Return user's own reviews
             queryset = queryset.filter(seeker=user)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
     
     def perform_create(self, serializer):
         review = serializer.save(seeker=self.request.user)
         # Send email notification to provider when a new review is posted
         send_new_review_email(review)
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProviderReviewListView(ConditionalListMixin, SparseQuerysetMixin, FastListMixin, generics.ListAPIView):
+    """
+    GET: Reviews across every service owned by the current PROVIDER, each
+         with its service id and title. ?since=<ISO 8601 timestamp> returns
+         only reviews created or edited at or after that time, for
+         incremental refreshes (pass the newest updated_at already seen).
+         Other users get 404.
+    Newest first, keyset-paginated with ?cursor= and ?page_size=. Two
+    queries per page however many services the provider has.
+    """
+    serializer_class = ProviderReviewSerializer
+    conditional_related = ('seeker', 'service')  # seeker_details and service_title
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated, IsProviderOrReadOnly]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role != 'PROVIDER':
+            raise NotFound()  # only providers have a review feed
+        reviews = Review.objects.filter(service__provider=user).select_related('service', 'seeker')
+        since = self.request.query_params.get('since')
+        if since:
+            reviews = reviews.filter(updated_at__gte=self.parse_since(since))
+        return reviews.order_by('-created_at', '-id')
+
+    def parse_since(self, value):
+        try:
+            since = parse_datetime(value.replace(' ', '+'))  # an unescaped '+' arrives as a space
+        except ValueError:
+            since = None
+        if since is None:
+            raise ValidationError({'since': 'Must be an ISO 8601 date and time.'})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+class ReviewDetailView(ConditionalDetailMixin, SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET: Get review details
     PUT/PATCH: Update own review (seeker) or any review (admin)
@@ -251,6 +590,7 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    conditional_related = ('seeker', 'service')  # seeker_details and the embedded service
     permission_classes = [IsAdminOrReviewOwnerOrReadOnly]
     authentication_classes = [FirebaseAuthentication, SessionAuthentication]
     
@@ -258,14 +598,16 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
         """Admin sees all reviews, regular users see all (for GET)."""
         user = self.request.user
         # Admin can see all, others can see all (read-only)
-        return Review.objects.all()
+        return Review.objects.select_related('seeker', 'service__provider', 'service__category')
 
-class ComplaintListCreateView(generics.ListCreateAPIView):
+class ComplaintListCreateView(SparseQuerysetMixin, FastListMixin, generics.ListCreateAPIView):
     """
     GET: List complaints (admin sees all, users see their own)
     POST: Create complaint (authenticated users)
+    Newest first, keyset-paginated with ?cursor= and ?page_size=.
     """
     serializer_class = ComplaintSerializer
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         """GET requires authentication, POST requires authentication."""
@@ -274,14 +616,15 @@ class ComplaintListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         """Admin sees all, users see their own."""
         user = self.request.user
+        complaints = Complaint.objects.select_related('user', 'service__provider', 'service__category')
         if user.role == 'ADMIN':
-            return Complaint.objects.all()
-        return Complaint.objects.filter(user=user)
+            return complaints
+        return complaints.filter(user=user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ComplaintDetailView(SparseQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     GET: Get complaint details
     PUT/PATCH: Update complaint (admin can update status and respond)
@@ -300,9 +643,10 @@ class ComplaintDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         """Admin sees all, users see their own."""
         user = self.request.user
+        complaints = Complaint.objects.select_related('user', 'service__provider', 'service__category')
         if user.role == 'ADMIN':
-            return Complaint.objects.all()
-        return Complaint.objects.filter(user=user)
+            return complaints
+        return complaints.filter(user=user)
     
     def update(self, request, *args, **kwargs):
         """Handle complaint updates, including resolving."""
@@ -11,6 +11,8 @@ class CustomUser(AbstractUser):
     role = models.CharField(max_length=50, choices=Role.choices, default=Role.SEEKER)
     firebase_uid = models.CharField(max_length=128, unique=True, blank=True, null=True)
     email_notifications = models.BooleanField(default=True, help_text="Enable email notifications for bookings and services")
+    # Moves the conditional GET validators of the bookings and reviews that embed the user
+    updated_at = models.DateTimeField(auto_now=True)
 
     # We don't need username/password, auth is handled by Firebase.
     # We can use email as the unique identifier.
@@ -18,4 +20,17 @@ class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
 
     USERNAME_FIELD = 'email'
-    REQUIRED_FIELDS = []
\ No newline at end of file
+    REQUIRED_FIELDS = []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored UID so caches keyed on it can be invalidated
+        # even after the UID has been changed and saved.
+        instance._loaded_firebase_uid = instance.__dict__.get('firebase_uid')
+        return instance
+
+    @property
+    def loaded_firebase_uid(self):
+        """The Firebase UID this instance had when it was loaded from the database."""
+        return getattr(self, '_loaded_firebase_uid', None)
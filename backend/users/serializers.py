@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from api.sparse import SparseFieldsMixin
 from .models import CustomUser
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = [
@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import {
@@ -90,7 +90,9 @@ export default function Home() {
   const { dbUser } = useAuth();
   const navigate = useNavigate();
   const [services, setServices] = useState([]);
+  const [totalCount, setTotalCount] = useState(0);
   const [categories, setCategories] = useState([]);
+  const [categoryCounts, setCategoryCounts] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -106,65 +108,107 @@ export default function Home() {
   const [selectedCategory, setSelectedCategory] = useState('');
   const [priceRange, setPriceRange] = useState({ min: '', max: '' });
   const debouncedSearchQuery = useDebounce(searchQuery, 300);
+  const suggestionQuery = useDebounce(searchQuery, 100);
+  const [suggestions, setSuggestions] = useState(null);
+  const debouncedPriceRange = useDebounce(priceRange, 300);
   
   // Pagination states
   const [currentPage, setCurrentPage] = useState(1);
   const [itemsPerPage, setItemsPerPage] = useState(12);
 
   useEffect(() => {
-    const loadData = async () => {
+    categoryService.getCategories()
+      .then(setCategories)
+      .catch((err) => console.error(err));
+  }, []);
+
+  // Search, filtering and pagination happen on the server; only the current page is downloaded
+  useEffect(() => {
+    let cancelled = false;
+    const loadServices = async () => {
       try {
         setLoading(true);
         setError(null);
-        const [servicesData, categoriesData] = await Promise.all([
-          serviceService.getAllServices(),
-          categoryService.getCategories()
-        ]);
-        setServices(servicesData);
-        setCategories(categoriesData);
+        const data = await serviceService.searchServices({
+          search: debouncedSearchQuery,
+          category: selectedCategory,
+          min_price: debouncedPriceRange.min,
+          max_price: debouncedPriceRange.max,
+          page: currentPage,
+          page_size: itemsPerPage,
+        });
+        if (!cancelled) {
+          setServices(data.results);
+          setTotalCount(data.count);
+        }
       } catch (err) {
-        setError('Failed to load services. Please try again later.');
-        console.error(err);
+        if (!cancelled) {
+          setError('Failed to load services. Please try again later.');
+          console.error(err);
+        }
       } finally {
-        setLoading(false);
+        if (!cancelled) {
+          setLoading(false);
+        }
       }
     };
-    loadData();
-  }, []);
-
-  // Filter services based on search, category, and price
-  const filteredServices = useMemo(() => {
-    return services.filter(service => {
-      // Search filter
-      const matchesSearch = debouncedSearchQuery === '' || 
-        service.title.toLowerCase().includes(debouncedSearchQuery.toLowerCase()) ||
-        service.description.toLowerCase().includes(debouncedSearchQuery.toLowerCase());
-
-      // Category filter
-      const matchesCategory = selectedCategory === '' || 
-        service.category === parseInt(selectedCategory);
+    loadServices();
+    return () => {
+      cancelled = true;
+    };
+  }, [debouncedSearchQuery, selectedCategory, debouncedPriceRange, currentPage, itemsPerPage]);
 
-      // Price filter
-      const servicePrice = parseFloat(service.price);
-      const matchesMinPrice = priceRange.min === '' || servicePrice >= parseFloat(priceRange.min);
-      const matchesMaxPrice = priceRange.max === '' || servicePrice <= parseFloat(priceRange.max);
+  // Typeahead suggestions come from an in-memory index on the server, so they can follow every keystroke
+  useEffect(() => {
+    if (!suggestionQuery.trim()) {
+      setSuggestions(null);
+      return undefined;
+    }
+    let cancelled = false;
+    serviceService.getSuggestions(suggestionQuery)
+      .then((data) => {
+        if (!cancelled) {
+          setSuggestions(data);
+        }
+      })
+      .catch((err) => console.error(err));
+    return () => {
+      cancelled = true;
+    };
+  }, [suggestionQuery]);
 
-      return matchesSearch && matchesCategory && matchesMinPrice && matchesMaxPrice;
-    });
-  }, [services, debouncedSearchQuery, selectedCategory, priceRange]);
+  const pickCategory = (category) => {
+    setSelectedCategory(String(category.id));
+    setSearchQuery('');
+    setSuggestions(null);
+  };
 
-  // Pagination for services
-  const paginatedServices = useMemo(() => {
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    return filteredServices.slice(startIndex, startIndex + itemsPerPage);
-  }, [filteredServices, currentPage, itemsPerPage]);
+  // Match counts for the category options, for the other current filters
+  useEffect(() => {
+    let cancelled = false;
+    serviceService.getServiceFacets({
+      search: debouncedSearchQuery,
+      category: selectedCategory,
+      min_price: debouncedPriceRange.min,
+      max_price: debouncedPriceRange.max,
+    })
+      .then((facets) => {
+        if (!cancelled) {
+          setCategoryCounts(Object.fromEntries(facets.categories.map((facet) => [facet.id, facet.count])));
+        }
+      })
+      .catch((err) => console.error(err));
+    return () => {
+      cancelled = true;
+    };
+  }, [debouncedSearchQuery, selectedCategory, debouncedPriceRange]);
 
-  const totalPages = Math.ceil(filteredServices.length / itemsPerPage);
+  const totalPages = Math.ceil(totalCount / itemsPerPage);
 
   // Reset to page 1 when filters change
   useEffect(() => {
     setCurrentPage(1);
-  }, [debouncedSearchQuery, selectedCategory, priceRange]);
+  }, [debouncedSearchQuery, selectedCategory, debouncedPriceRange]);
 
   // Don't render homepage if user is logged in (will redirect)
   if (dbUser) {
@@ -292,14 +336,45 @@ export default function Home() {
         <div className="container mx-auto px-4">
           <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
             {/* Search */}
-            <div className="md:col-span-2">
+            <div className="md:col-span-2 relative">
               <input
                 type="text"
                 placeholder="Search services..."
                 value={searchQuery}
                 onChange={(e) => setSearchQuery(e.target.value)}
+                onBlur={() => setTimeout(() => setSuggestions(null), 150)}
+                onKeyDown={(e) => e.key === 'Escape' && setSuggestions(null)}
                 className="w-full px-4 py-3 bg-gray-700 text-white rounded-lg border border-gray-600 focus:outline-none focus:border-blue-500 transition"
               />
+              {suggestions && (suggestions.categories.length > 0 || suggestions.services.length > 0) && (
+                <ul className="absolute z-20 mt-1 w-full bg-gray-700 border border-gray-600 rounded-lg shadow-lg overflow-hidden">
+                  {suggestions.fuzzy && (
+                    <li className="px-4 py-2 text-xs text-gray-400">Showing close matches</li>
+                  )}
+                  {suggestions.categories.map((category) => (
+                    <li key={`category-${category.id}`}>
+                      <button
+                        type="button"
+                        onMouseDown={() => pickCategory(category)}
+                        className="w-full text-left px-4 py-2 text-blue-300 hover:bg-gray-600"
+                      >
+                        {category.name} <span className="text-xs text-gray-400">category</span>
+                      </button>
+                    </li>
+                  ))}
+                  {suggestions.services.map((service) => (
+                    <li key={`service-${service.id}`}>
+                      <Link
+                        to={`/services/${service.id}`}
+                        onMouseDown={(e) => e.preventDefault()}
+                        className="block px-4 py-2 text-white hover:bg-gray-600"
+                      >
+                        {service.title}
+                      </Link>
+                    </li>
+                  ))}
+                </ul>
+              )}
             </div>
 
             {/* Category Filter */}
@@ -311,7 +386,7 @@ export default function Home() {
               >
                 <option value="">All Categories</option>
                 {categories.map(cat => (
-                  <option key={cat.id} value={cat.id}>{cat.name}</option>
+                  <option key={cat.id} value={cat.id}>{cat.name} ({categoryCounts[cat.id] || 0})</option>
                 ))}
               </select>
             </div>
@@ -342,7 +417,7 @@ export default function Home() {
             transition={{ delay: 0.5 }}
             className="mt-4 text-gray-300 text-sm"
           >
-            Showing {filteredServices.length} of {services.length} services
+            Showing {services.length} of {totalCount} services
           </motion.div>
         </div>
       </motion.section>
@@ -369,7 +444,7 @@ export default function Home() {
             >
               <p>{error}</p>
             </motion.div>
-          ) : filteredServices.length === 0 ? (
+          ) : services.length === 0 ? (
             <motion.div 
               initial={{ opacity: 0 }}
               animate={{ opacity: 1 }}
@@ -395,7 +470,7 @@ export default function Home() {
                   animate="visible"
                   className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6"
                 >
-                  {paginatedServices.map((service, index) => (
+                  {services.map((service, index) => (
                     <ServiceCard key={service.id} service={service} index={index} />
                   ))}
                 </motion.div>
@@ -405,7 +480,7 @@ export default function Home() {
                     totalPages={totalPages}
                     onPageChange={setCurrentPage}
                     itemsPerPage={itemsPerPage}
-                    totalItems={filteredServices.length}
+                    totalItems={totalCount}
                     onItemsPerPageChange={(newItemsPerPage) => {
                       setItemsPerPage(newItemsPerPage);
                       setCurrentPage(1);
@@ -391,6 +391,113 @@ function BookingCard({ booking, onUpdateStatus }) {
   );
 }
 
+// Booking Calendar Component: one week of the provider's bookings at a time
+function BookingCalendar() {
+  const toDay = (date) => {
+    const pad = (n) => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+  };
+  const [weekStart, setWeekStart] = useState(() => new Date());
+  const [calendar, setCalendar] = useState(null);
+  const [error, setError] = useState(null);
+  const [reloads, setReloads] = useState(0);
+  const { showToast } = useToast();
+  const statusColors = {
+    'PENDING': 'bg-yellow-900 text-yellow-300',
+    'CONFIRMED': 'bg-green-900 text-green-300',
+    'CANCELED': 'bg-red-900 text-red-300',
+    'COMPLETED': 'bg-blue-900 text-blue-300',
+  };
+
+  useEffect(() => {
+    const weekEnd = new Date(weekStart);
+    weekEnd.setDate(weekEnd.getDate() + 6);
+    bookingService.getBookingCalendar(toDay(weekStart), toDay(weekEnd))
+      .then((data) => {
+        setCalendar(data);
+        setError(null);
+      })
+      .catch(() => setError('Failed to load the calendar.'));
+  }, [weekStart, reloads]);
+
+  // Confirm every pending booking of a day, or complete every confirmed one, in one request
+  const updateDay = async (day, fromStatus, toStatus) => {
+    const ids = day.bookings.filter(b => b.status === fromStatus).map(b => b.id);
+    try {
+      const result = await bookingService.bulkUpdateStatus(ids, toStatus);
+      showToast(`${result.updated} booking(s) ${toStatus.toLowerCase()}.`, 'success');
+    } catch (err) {
+      showToast('Failed to update the bookings.', 'error');
+    }
+    setReloads(reloads + 1);
+  };
+
+  const moveWeek = (weeks) => {
+    const next = new Date(weekStart);
+    next.setDate(next.getDate() + weeks * 7);
+    setWeekStart(next);
+  };
+
+  return (
+    <div className="space-y-4">
+      <div className="flex items-center justify-between">
+        <button onClick={() => moveWeek(-1)} className="px-4 py-2 bg-gray-700 text-gray-200 rounded-lg hover:bg-gray-600">
+          Previous week
+        </button>
+        <h2 className="text-xl font-bold text-white">
+          {calendar ? `${calendar.from} – ${calendar.to}` : 'Loading...'}
+        </h2>
+        <button onClick={() => moveWeek(1)} className="px-4 py-2 bg-gray-700 text-gray-200 rounded-lg hover:bg-gray-600">
+          Next week
+        </button>
+      </div>
+      {error && <p className="text-red-400">{error}</p>}
+      {calendar && (
+        <>
+          <div className="flex flex-wrap gap-2">
+            {Object.entries(calendar.counts).map(([status, count]) => (
+              <span key={status} className={`px-3 py-1 rounded-full text-xs font-semibold ${statusColors[status]}`}>
+                {status}: {count}
+              </span>
+            ))}
+          </div>
+          <div className="grid grid-cols-1 md:grid-cols-7 gap-3">
+            {calendar.days.map((day) => (
+              <div key={day.date} className="bg-gray-700 border border-gray-600 rounded-lg p-3 min-h-[8rem]">
+                <p className="text-sm font-semibold text-gray-200 mb-2">
+                  {new Date(`${day.date}T00:00:00`).toLocaleDateString([], { weekday: 'short', day: 'numeric', month: 'short' })}
+                </p>
+                <div className="space-y-2">
+                  {day.bookings.map((booking) => (
+                    <div key={booking.id} className={`p-2 rounded text-xs ${statusColors[booking.status] || 'bg-gray-800'}`}>
+                      <p className="font-semibold">
+                        {new Date(booking.booking_date).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' })}
+                        {' '}{booking.service_title}
+                      </p>
+                      <p>{booking.seeker_name}</p>
+                    </div>
+                  ))}
+                  {day.bookings.length === 0 && <p className="text-xs text-gray-400">No bookings</p>}
+                  {day.counts.PENDING > 0 && (
+                    <button onClick={() => updateDay(day, 'PENDING', 'CONFIRMED')} className="w-full px-2 py-1 text-xs bg-green-700 text-white rounded hover:bg-green-600">
+                      Confirm {day.counts.PENDING} pending
+                    </button>
+                  )}
+                  {day.counts.CONFIRMED > 0 && (
+                    <button onClick={() => updateDay(day, 'CONFIRMED', 'COMPLETED')} className="w-full px-2 py-1 text-xs bg-blue-700 text-white rounded hover:bg-blue-600">
+                      Complete {day.counts.CONFIRMED} confirmed
+                    </button>
+                  )}
+                </div>
+              </div>
+            ))}
+          </div>
+        </>
+      )}
+    </div>
+  );
+}
+
 // Main Provider Dashboard Component
 export default function ProviderDashboard() {
   const { dbUser } = useAuth();
@@ -414,7 +521,7 @@ export default function ProviderDashboard() {
   const [deleteCategoryId, setDeleteCategoryId] = useState(null);
   const [categoryFormData, setCategoryFormData] = useState({ name: '' });
   const [categoryLoading, setCategoryLoading] = useState(false);
-  const [activeSection, setActiveSection] = useState('services'); // 'services', 'categories', or 'reviews'
+  const [activeSection, setActiveSection] = useState('services'); // 'services', 'categories', 'calendar' or 'reviews'
 
   useEffect(() => {
     const fetchData = async () => {
@@ -443,16 +550,14 @@ export default function ProviderDashboard() {
     const loadReviews = async () => {
       if (activeSection === 'reviews' && myServices.length > 0) {
         try {
-          const allReviews = [];
-          for (const service of myServices) {
-            try {
-              const serviceReviews = await reviewService.getServiceReviews(service.id);
-              allReviews.push(...serviceReviews.map(r => ({ ...r, serviceTitle: service.title, serviceId: service.id })));
-            } catch (err) {
-              console.error(`Failed to load reviews for service ${service.id}:`, err);
-            }
-          }
-          setReviews(allReviews);
+          // After the first load, only fetch reviews added or edited since then
+          const newest = reviews.reduce(
+            (latest, r) => (!latest || Date.parse(r.updated_at) > Date.parse(latest) ? r.updated_at : latest), null
+          );
+          const changed = await reviewService.getProviderReviews(newest || undefined);
+          const fresh = changed.map(r => ({ ...r, serviceTitle: r.service_title, serviceId: r.service }));
+          const freshIds = new Set(fresh.map(r => r.id));
+          setReviews([...fresh, ...reviews.filter(r => !freshIds.has(r.id))]);
         } catch (err) {
           console.error('Failed to load reviews:', err);
         }
@@ -705,6 +810,7 @@ export default function ProviderDashboard() {
             {[
               { id: 'services', label: 'Services', Icon: Cog6ToothIcon },
               { id: 'categories', label: 'Categories', Icon: FolderIcon },
+              { id: 'calendar', label: 'Calendar', Icon: CalendarIcon },
               { id: 'reviews', label: 'Reviews', Icon: StarIcon }
             ].map((section) => (
               <button
@@ -983,6 +1089,17 @@ export default function ProviderDashboard() {
             </motion.div>
           )}
 
+          {/* Calendar Section */}
+          {activeSection === 'calendar' && (
+            <motion.div
+              initial={{ opacity: 0 }}
+              animate={{ opacity: 1 }}
+              transition={{ duration: 0.3 }}
+            >
+              <BookingCalendar />
+            </motion.div>
+          )}
+
           {/* Reviews Section */}
           {activeSection === 'reviews' && (
             <motion.div
@@ -26,6 +26,8 @@ export default function ServiceDetail() {
   const [reviews, setReviews] = useState([]);
   const [showReviewForm, setShowReviewForm] = useState(false);
   const [userReview, setUserReview] = useState(null);
+  const [similarServices, setSimilarServices] = useState([]);
+  const [freeSlots, setFreeSlots] = useState(null);
 
   useEffect(() => {
     const loadService = async () => {
@@ -48,6 +50,13 @@ export default function ServiceDetail() {
         } catch (err) {
           console.error('Failed to load reviews:', err);
         }
+
+        // Load similar services
+        try {
+          setSimilarServices(await serviceService.getSimilarServices(id));
+        } catch (err) {
+          console.error('Failed to load similar services:', err);
+        }
       } catch (err) {
         setError('Failed to load service details.');
         console.error(err);
@@ -58,6 +67,24 @@ export default function ServiceDetail() {
     loadService();
   }, [id, dbUser]);
   
+  // Free slots of the chosen day, so seekers pick a time the provider is available
+  useEffect(() => {
+    if (!bookingDate) {
+      setFreeSlots(null);
+      return;
+    }
+    let ignore = false;
+    serviceService.getServiceSlots(id, bookingDate)
+      .then((data) => { if (!ignore) setFreeSlots(data.slots); })
+      .catch(() => { if (!ignore) setFreeSlots(null); });
+    return () => { ignore = true; };
+  }, [id, bookingDate]);
+
+  const slotTime = (slot) => {
+    const start = new Date(slot.start);
+    return `${String(start.getHours()).padStart(2, '0')}:${String(start.getMinutes()).padStart(2, '0')}`;
+  };
+
   const handleReviewUpdate = async () => {
     try {
       const reviewsData = await reviewService.getServiceReviews(id);
@@ -98,10 +125,9 @@ export default function ServiceDetail() {
       return;
     }
 
-    // Validate time is between 8am and 5pm
-    const selectedHour = bookingDateTime.getHours();
-    if (selectedHour < 8 || selectedHour >= 17) {
-      showToast('Booking time must be between 8:00 AM and 5:00 PM.', 'error');
+    // The server checks the provider's availability; catch the obvious misses here
+    if (freeSlots && !freeSlots.some((slot) => slotTime(slot) === bookingTime)) {
+      showToast('The provider is not free at this time. Please pick one of the available times.', 'error');
       return;
     }
 
@@ -291,22 +317,46 @@ export default function ServiceDetail() {
                   </div>
                   <div>
                     <label className="block text-sm font-medium text-gray-300 mb-2">
-                      Select Time (8:00 AM - 5:00 PM)
+                      Select Time
                     </label>
                     <input
                       type="time"
                       value={bookingTime}
                       onChange={(e) => setBookingTime(e.target.value)}
-                      min="08:00"
-                      max="17:00"
                       required
                       disabled={bookingLoading}
                       className="w-full px-4 py-2 bg-gray-800 text-white rounded-lg border border-gray-600 focus:outline-none focus:border-blue-500"
                     />
-                    <p className="text-xs text-gray-400 mt-1">Available hours: 8:00 AM - 5:00 PM</p>
+                    <p className="text-xs text-gray-400 mt-1">
+                      {service.duration_minutes ? `Takes ${service.duration_minutes} minutes` : 'Available hours: 8:00 AM - 5:00 PM'}
+                    </p>
                   </div>
                 </div>
 
+                {freeSlots && (
+                  <div className="mb-4">
+                    <p className="block text-sm font-medium text-gray-300 mb-2">Available times</p>
+                    {freeSlots.length === 0 ? (
+                      <p className="text-sm text-gray-400">No free times on this day. Please pick another date.</p>
+                    ) : (
+                      <div className="flex flex-wrap gap-2">
+                        {freeSlots.map((slot) => (
+                          <button
+                            key={slot.start}
+                            type="button"
+                            onClick={() => setBookingTime(slotTime(slot))}
+                            className={`px-3 py-1 rounded text-sm transition ${
+                              bookingTime === slotTime(slot) ? 'bg-blue-600 text-white' : 'bg-gray-800 text-gray-300 hover:bg-gray-600'
+                            }`}
+                          >
+                            {slotTime(slot)}
+                          </button>
+                        ))}
+                      </div>
+                    )}
+                  </div>
+                )}
+
                 <div className="flex gap-4">
                   <LoadingButton
                     type="submit"
@@ -368,6 +418,28 @@ export default function ServiceDetail() {
             canEdit={canBook}
           />
         </div>
+
+        {/* Similar Services */}
+        {similarServices.length > 0 && (
+          <div className="p-8 border-t border-gray-700">
+            <h2 className="text-2xl font-semibold text-white mb-4">Similar Services</h2>
+            <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
+              {similarServices.slice(0, 6).map((similar) => (
+                <Link
+                  key={similar.id}
+                  to={`/services/${similar.id}`}
+                  className="block bg-gray-700 hover:bg-gray-600 rounded-lg p-4 transition"
+                >
+                  <p className="text-white font-semibold">{similar.title}</p>
+                  <div className="flex justify-between text-sm mt-1">
+                    <span className="text-gray-400">{similar.category_details?.name || 'Uncategorized'}</span>
+                    <span className="text-blue-400">KES {parseFloat(similar.price).toLocaleString()}</span>
+                  </div>
+                </Link>
+              ))}
+            </div>
+          </div>
+        )}
       </motion.div>
     </motion.div>
   );
@@ -6,7 +6,7 @@ import apiClient from '../api/apiClient';
  */
 const getAllUsers = async () => {
   try {
-    const { data } = await apiClient.get('/admin/users/');
+    const { data } = await apiClient.get('/admin/users/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching users:", error.response?.data || error.message);
@@ -70,7 +70,7 @@ const activateUser = async (userId) => {
  */
 const getAllBookings = async () => {
   try {
-    const { data } = await apiClient.get('/bookings/');
+    const { data } = await apiClient.get('/bookings/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching bookings:", error.response?.data || error.message);
@@ -134,7 +134,7 @@ const getReports = async (reportType = 'activity') => {
  */
 const getActionLogs = async (filters = {}) => {
   try {
-    const params = new URLSearchParams(filters);
+    const params = new URLSearchParams({ ...filters, paginate: 'false' });
     const { data } = await apiClient.get(`/admin/action-logs/?${params.toString()}`);
     return data;
   } catch (error) {
@@ -148,7 +148,7 @@ const getActionLogs = async (filters = {}) => {
  */
 const getAllComplaints = async () => {
   try {
-    const { data } = await apiClient.get('/complaints/');
+    const { data } = await apiClient.get('/complaints/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching complaints:", error.response?.data || error.message);
@@ -26,7 +26,7 @@ const createBooking = async (bookingData) => {
  */
 const getMyBookings = async () => {
   try {
-    const { data } = await apiClient.get('/bookings/');
+    const { data } = await apiClient.get('/bookings/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching bookings:", error.response?.data || error.message);
@@ -51,6 +51,39 @@ const updateBooking = async (bookingId, updateData) => {
   }
 };
 
+/**
+ * Moves many bookings to one status in a single request (Provider/Admin).
+ * Bookings that cannot make the change are skipped; `results` gives the
+ * outcome for each id.
+ * @param {Array<number>} ids - The IDs of the bookings to update.
+ * @param {string} status - The new status (e.g., "CONFIRMED").
+ */
+const bulkUpdateStatus = async (ids, status) => {
+  try {
+    const { data } = await apiClient.post('/bookings/bulk-status/', { ids, status });
+    return data;
+  } catch (error) {
+    console.error("Error updating bookings:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
+/**
+ * Fetches the logged-in provider's bookings from one day to another (both
+ * included, YYYY-MM-DD), grouped by day with per-status counts.
+ * @param {string} from - First day.
+ * @param {string} to - Last day; at most 42 days after `from`.
+ */
+const getBookingCalendar = async (from, to) => {
+  try {
+    const { data } = await apiClient.get('/bookings/calendar/', { params: { from, to } });
+    return data;
+  } catch (error) {
+    console.error("Error fetching booking calendar:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
 /**
  * Deletes a booking.
  * This can typically only be done by the SEEKER who made it.
@@ -70,5 +103,7 @@ export const bookingService = {
   createBooking,
   getMyBookings,
   updateBooking,
+  bulkUpdateStatus,
+  getBookingCalendar,
   deleteBooking,
 };
\ No newline at end of file
@@ -15,7 +15,7 @@ const createComplaint = async (complaintData) => {
 
 const getAllComplaints = async () => {
   try {
-    const { data } = await apiClient.get('/complaints/');
+    const { data } = await apiClient.get('/complaints/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error('Error fetching complaints:', error.response?.data || error.message);
@@ -65,7 +65,7 @@ const checkSession = async () => {
  */
 const getAllUsers = async () => {
   try {
-    const { data } = await djangoAdminApiClient.get('/admin/users/');
+    const { data } = await djangoAdminApiClient.get('/admin/users/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching users:", error.response?.data || error.message);
@@ -114,7 +114,7 @@ const activateUser = async (userId) => {
 
 const getAllBookings = async () => {
   try {
-    const { data } = await djangoAdminApiClient.get('/bookings/');
+    const { data } = await djangoAdminApiClient.get('/bookings/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching bookings:", error.response?.data || error.message);
@@ -163,7 +163,7 @@ const getReports = async (reportType = 'activity') => {
 
 const getActionLogs = async (filters = {}) => {
   try {
-    const params = new URLSearchParams(filters);
+    const params = new URLSearchParams({ ...filters, paginate: 'false' });
     const { data } = await djangoAdminApiClient.get(`/admin/action-logs/?${params.toString()}`);
     return data;
   } catch (error) {
@@ -174,7 +174,7 @@ const getActionLogs = async (filters = {}) => {
 
 const getAllComplaints = async () => {
   try {
-    const { data } = await djangoAdminApiClient.get('/complaints/');
+    const { data } = await djangoAdminApiClient.get('/complaints/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching complaints:", error.response?.data || error.message);
@@ -265,7 +265,7 @@ const deleteBooking = async (bookingId) => {
 // Review CRUD operations
 const getAllReviews = async () => {
   try {
-    const { data } = await djangoAdminApiClient.get('/reviews/');
+    const { data } = await djangoAdminApiClient.get('/reviews/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching reviews:", error.response?.data || error.message);
@@ -302,6 +302,20 @@ const deleteReview = async (reviewId) => {
   }
 };
 
+/**
+ * URL of a streaming dataset export; open it (e.g. as a link with `download`)
+ * so the browser saves the file directly instead of holding it in memory.
+ * @param {string} dataset - users, services, bookings, reviews, complaints or action-logs
+ * @param {string} format - 'csv' or 'ndjson'
+ * @param {object} params - optional filters, plus `from` / `to` ISO dates
+ */
+const getExportUrl = (dataset, format = 'csv', params = {}) => {
+  const query = new URLSearchParams(
+    Object.entries(params).filter(([, value]) => value !== '' && value !== null && value !== undefined)
+  ).toString();
+  return `${djangoAdminApiClient.defaults.baseURL}/admin/exports/${dataset}.${format}${query ? `?${query}` : ''}`;
+};
+
 const logout = async () => {
   try {
     console.log('Calling logout endpoint: /django-admin/logout/');
@@ -344,6 +358,7 @@ export const djangoAdminService = {
   getAnalytics,
   getReports,
   getActionLogs,
+  getExportUrl,
   getAllComplaints,
   updateComplaint,
   getCategories,
@@ -18,7 +18,7 @@ const createReview = async (reviewData) => {
  */
 const getServiceReviews = async (serviceId) => {
   try {
-    const { data } = await apiClient.get(`/reviews/?service=${serviceId}`);
+    const { data } = await apiClient.get('/reviews/', { params: { service: serviceId, paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching reviews:", error.response?.data || error.message);
@@ -26,12 +26,36 @@ const getServiceReviews = async (serviceId) => {
   }
 };
 
+/**
+ * Get the reviews on all of the logged-in provider's services, newest first.
+ * Each review carries `service` (id) and `service_title`.
+ * @param {string} [since] - ISO timestamp; only reviews created or edited at or after it
+ */
+const getProviderReviews = async (since) => {
+  try {
+    const reviews = [];
+    let url = '/reviews/provider/';
+    let params = { page_size: 100, ...(since ? { since } : {}) };
+    while (url) {
+      const { data } = await apiClient.get(url, { params });
+      reviews.push(...data.results);
+      // The next link already carries the cursor and the other parameters
+      url = data.next;
+      params = undefined;
+    }
+    return reviews;
+  } catch (error) {
+    console.error("Error fetching provider reviews:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
 /**
  * Get user's reviews
  */
 const getMyReviews = async () => {
   try {
-    const { data } = await apiClient.get('/reviews/');
+    const { data } = await apiClient.get('/reviews/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching my reviews:", error.response?.data || error.message);
@@ -80,6 +104,7 @@ const deleteReview = async (reviewId) => {
 export const reviewService = {
   createReview,
   getServiceReviews,
+  getProviderReviews,
   getMyReviews,
   getReview,
   updateReview,
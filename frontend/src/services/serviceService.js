@@ -1,11 +1,11 @@
 import apiClient from '../api/apiClient';
 
 /**
- * Fetches all services.
+ * Fetches all services as a plain (unpaginated) list.
  */
 const getAllServices = async () => {
   try {
-    const { data } = await apiClient.get('/services/');
+    const { data } = await apiClient.get('/services/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching services:", error.response?.data || error.message);
@@ -13,12 +13,94 @@ const getAllServices = async () => {
   }
 };
 
+/**
+ * Searches the catalog on the server and returns one page of results.
+ * @param {object} params - { search, category, min_price, max_price, min_rating, near, radius_km, bbox, ordering, page, page_size }
+ * Empty values are left out of the query string.
+ * @returns {Promise<{count: number, next: string|null, previous: string|null, results: object[]}>}
+ */
+const searchServices = async (params = {}) => {
+  try {
+    const query = Object.fromEntries(
+      Object.entries(params).filter(([, value]) => value !== '' && value !== null && value !== undefined)
+    );
+    const { data } = await apiClient.get('/services/', { params: query });
+    return data;
+  } catch (error) {
+    console.error("Error searching services:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
+/**
+ * Fetches the filter sidebar counts for the same params as searchServices
+ * (ordering and paging are ignored).
+ * @returns {Promise<{count: number, categories: object[], price: object[], rating: object[], unrated: number}>}
+ */
+const getServiceFacets = async (params = {}) => {
+  try {
+    const query = Object.fromEntries(
+      Object.entries(params).filter(
+        ([name, value]) => !['ordering', 'page', 'page_size'].includes(name) && value !== '' && value !== null && value !== undefined
+      )
+    );
+    const { data } = await apiClient.get('/services/facets/', { params: query });
+    return data;
+  } catch (error) {
+    console.error("Error fetching service facets:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
+/**
+ * Fetches typeahead suggestions for the search box.
+ * @returns {Promise<{query: string, fuzzy: boolean, categories: object[], services: object[]}>}
+ */
+const getSuggestions = async (q, limit = 8) => {
+  try {
+    const { data } = await apiClient.get('/services/autocomplete/', { params: { q, limit } });
+    return data;
+  } catch (error) {
+    console.error("Error fetching suggestions:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
+/**
+ * Fetches the services most similar to a service, most similar first.
+ * @param {string|number} serviceId - The ID of the service.
+ * @returns {Promise<object[]>} Services, each with a similarity score.
+ */
+const getSimilarServices = async (serviceId) => {
+  try {
+    const { data } = await apiClient.get(`/services/${serviceId}/similar/`);
+    return data;
+  } catch (error) {
+    console.error("Error fetching similar services:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
+/**
+ * Fetches the free booking slots of a service between two dates (YYYY-MM-DD, inclusive).
+ * @returns {Promise<{service: number, duration_minutes: number, time_zone: string, slots: {start: string, end: string}[]}>}
+ */
+const getServiceSlots = async (serviceId, from, to = from) => {
+  try {
+    const { data } = await apiClient.get(`/services/${serviceId}/slots/`, { params: { from, to } });
+    return data;
+  } catch (error) {
+    console.error("Error fetching free slots:", error.response?.data || error.message);
+    throw error;
+  }
+};
+
 /**
  * Fetches only the services for the currently logged-in provider.
  */
 const getMyServices = async () => {
   try {
-    const { data } = await apiClient.get('/services/my-services/');
+    const { data } = await apiClient.get('/services/my-services/', { params: { paginate: 'false' } });
     return data;
   } catch (error) {
     console.error("Error fetching my services:", error.response?.data || error.message);
@@ -92,6 +174,11 @@ const deleteService = async (serviceId) => {
 
 export const serviceService = {
   getAllServices,
+  searchServices,
+  getServiceFacets,
+  getSuggestions,
+  getSimilarServices,
+  getServiceSlots,
   getServiceById,
   createService,
   updateService,